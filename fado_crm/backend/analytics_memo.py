@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Analytics memo
+Ket qua con cua analytics (sales overview, trend, top san pham, rollup theo ngay...) duoc nho
+theo (ham, tham so, data-version) de bao cao tong hop (dashboard, insights, ml_engine) dung lai
+thay vi query lai:
+- trong 1 request (memo_scope): giu den het request, ke ca khi ANALYTICS_MEMO_TTL=0
+- giua cac request: cua so ngan ANALYTICS_MEMO_TTL giay trong process
+data-version = version cac bang ma ham doc, tang sau moi commit ghi vao bang do (tag
+"table:<ten>" cua cache_invalidation) -> worker nay khong tra ket qua tinh truoc commit.
+Worker khac thay thay doi sau toi da ANALYTICS_MEMO_TTL giay.
+"""
+
+import contextvars
+import inspect
+import itertools
+import json
+import logging
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+try:
+    from cache import LRUCache
+    from cache_invalidation import SESSION_TAGS_KEY, register_cache, table_tag
+except ModuleNotFoundError:
+    from backend.cache import LRUCache
+    from backend.cache_invalidation import SESSION_TAGS_KEY, register_cache, table_tag
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_MEMO_TTL = int(os.getenv("ANALYTICS_MEMO_TTL", "30"))
+ANALYTICS_MEMO_MAX_ENTRIES = int(os.getenv("ANALYTICS_MEMO_MAX_ENTRIES", "512"))
+
+_scope: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "analytics_memo_scope", default=None
+)
+
+
+class DataVersions:
+    """Version cua moi bang, tang khi invalidate_tags nhan tag "table:<ten>" (sau commit)"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def of(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def invalidate_tags(self, tags: Iterable[str]) -> list:
+        prefix = table_tag("")
+        self.bump(tag[len(prefix) :] for tag in tags if tag.startswith(prefix))
+        # Khong xoa key nao: entry cu tu het hieu luc vi key moi mang version moi
+        return []
+
+
+class AnalyticsMemo:
+    """Kho memo dung chung trong process + scope theo request"""
+
+    def __init__(
+        self,
+        ttl: int = ANALYTICS_MEMO_TTL,
+        max_entries: int = ANALYTICS_MEMO_MAX_ENTRIES,
+        versions: Optional[DataVersions] = None,
+    ):
+        self.ttl = ttl
+        self.versions = versions or DataVersions()
+        self.store = LRUCache(max_entries=max_entries, default_ttl=ttl or None)
+        self.hits = 0
+        self.misses = 0
+        # Engine/registry -> so thu tu: DB khac nhau (vd 2 sqlite :memory:) khong dung chung key
+        self._sources: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _source(self, db: Session) -> Optional[int]:
+        """None -> khong memo: session co ghi chua commit hoac bind vao Connection"""
+        if db.new or db.dirty or db.deleted or db.info.get(SESSION_TAGS_KEY):
+            return None
+        # Cac replica cua registry cung du lieu -> chung 1 nguon
+        source = db.info.get("registry")
+        if source is None:
+            source = db.get_bind()
+            if not isinstance(source, Engine):
+                return None
+        with self._lock:
+            if source not in self._sources:
+                self._sources[source] = next(self._counter)
+            return self._sources[source]
+
+    def key(self, name: str, db: Session, tables: Tuple[str, ...], params: Dict) -> Optional[str]:
+        source = self._source(db)
+        if source is None:
+            return None
+        versions = ",".join(map(str, self.versions.of(tables)))
+        args = json.dumps(params, sort_keys=True, default=str)
+        return f"{name}:{source}:{versions}:{args}"
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        scope = _scope.get()
+        if scope is not None and key in scope:
+            self.hits += 1
+            return scope[key]
+        value = self.store.get(key) if self.ttl > 0 else None
+        if value is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            value = compute()
+            if self.ttl > 0 and value is not None:
+                self.store.set(key, value)
+        if scope is not None:
+            scope[key] = value
+        return value
+
+    def clear(self):
+        self.store.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0,
+            "entries": self.store.stats()["entries"],
+            "ttl": self.ttl,
+        }
+
+
+analytics_memo = AnalyticsMemo()
+register_cache(analytics_memo.versions)
+
+
+@contextmanager
+def memo_scope():
+    """Ket qua memo dung chung trong khoi with (1 request/bao cao); long nhau dung scope ngoai"""
+    if _scope.get() is not None:
+        yield
+        return
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def memoized(*tables: str, session: Optional[Callable[[Any], Session]] = None):
+    """
+    Memo ket qua theo (ham, tham so, version cua tables). Tham so dau tien la Session, hoac
+    method voi session=lambda self: self.db_session. Tham so con lai phai dua duoc vao json.
+    Ket qua dung chung giua cac caller -> khong sua tai cho.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+        first = next(iter(signature.parameters))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            owner = params.pop(first)
+            db = session(owner) if session else owner
+            key = analytics_memo.key(name, db, tables, params) if db is not None else None
+            if key is None:
+                return func(*args, **kwargs)
+            return analytics_memo.get_or_compute(key, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "ANALYTICS_MEMO_MAX_ENTRIES",
+    "ANALYTICS_MEMO_TTL",
+    "AnalyticsMemo",
+    "DataVersions",
+    "analytics_memo",
+    "memo_scope",
+    "memoized",
+]
@@ -1 +1,666 @@
-# FADO CRM - Advanced Analytics Service # He thong phan tich du lieu thong minh nhu Data Scientist! from sqlalchemy.orm import Session from sqlalchemy import func, text, extract, case, and_, or_ from datetime import datetime, timedelta, date from typing import Dict, List, Any, Optional, Tuple from decimal import Decimal import json from collections import defaultdict from database import get_db from models import KhachHang, SanPham, DonHang, ChiTietDonHang, LichSuLienHe, TrangThaiDonHang, LoaiKhachHang from logging_config import app_logger class AdvancedAnalytics: def __init__(self): self.db_session = None app_logger.info("Advanced Analytics service initialized") def set_session(self, db: Session): """ Set database session""" self.db_session = db # SALES ANALYTICS def get_sales_overview(self, date_range: int = 30) -> Dict[str, Any]: """ Tong quan doanh so ban hang""" try: end_date = datetime.utcnow() start_date = end_date - timedelta(days=date_range) # Total revenue total_revenue = self.db_session.query( func.sum(DonHang.tong_tien) ).filter( DonHang.ngay_tao >= start_date, DonHang.trang_thai != TrangThaiDonHang.HUY ).scalar() or 0 # Total orders total_orders = self.db_session.query(DonHang).filter( DonHang.ngay_tao >= start_date ).count() # Completed orders completed_orders = self.db_session.query(DonHang).filter( DonHang.ngay_tao >= start_date, DonHang.trang_thai == TrangThaiDonHang.DA_NHAN ).count() # Average order value avg_order_value = total_revenue / total_orders if total_orders > 0 else 0 # Previous period comparison prev_start = start_date - timedelta(days=date_range) prev_revenue = self.db_session.query( func.sum(DonHang.tong_tien) ).filter( DonHang.ngay_tao >= prev_start, DonHang.ngay_tao < start_date, DonHang.trang_thai != TrangThaiDonHang.HUY ).scalar() or 0 revenue_growth = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0 return { "total_revenue": float(total_revenue), "total_orders": total_orders, "completed_orders": completed_orders, "avg_order_value": float(avg_order_value), "completion_rate": (completed_orders / total_orders * 100) if total_orders > 0 else 0, "revenue_growth": round(revenue_growth, 2), "date_range": date_range } except Exception as e: app_logger.error(f" Error in get_sales_overview: {str(e)}") return {} def get_daily_revenue_trend(self, days: int = 30) -> List[Dict[str, Any]]: """ Xu huong doanh thu theo ngay""" try: end_date = datetime.utcnow().date() start_date = end_date - timedelta(days=days) # Query daily revenue daily_data = self.db_session.query( func.date(DonHang.ngay_tao).label('date'), func.sum(DonHang.tong_tien).label('revenue'), func.count(DonHang.id).label('orders') ).filter( func.date(DonHang.ngay_tao) >= start_date, DonHang.trang_thai != TrangThaiDonHang.HUY ).group_by( func.date(DonHang.ngay_tao) ).order_by( func.date(DonHang.ngay_tao) ).all() # Create complete date range result = [] current_date = start_date # Convert query results to dict for easy lookup data_dict = {row.date: {"revenue": float(row.revenue or 0), "orders": row.orders} for row in daily_data} while current_date <= end_date: day_data = data_dict.get(current_date, {"revenue": 0, "orders": 0}) result.append({ "date": current_date.strftime("%Y-%m-%d"), "revenue": day_data["revenue"], "orders": day_data["orders"], "avg_order_value": day_data["revenue"] / day_data["orders"] if day_data["orders"] > 0 else 0 }) current_date += timedelta(days=1) return result except Exception as e: app_logger.error(f" Error in get_daily_revenue_trend: {str(e)}") return [] def get_monthly_comparison(self, months: int = 12) -> List[Dict[str, Any]]: """ So sanh doanh thu theo thang""" try: end_date = datetime.utcnow() start_date = end_date - timedelta(days=months * 30) monthly_data = self.db_session.query( extract('year', DonHang.ngay_tao).label('year'), extract('month', DonHang.ngay_tao).label('month'), func.sum(DonHang.tong_tien).label('revenue'), func.count(DonHang.id).label('orders'), func.count(func.distinct(DonHang.khach_hang_id)).label('unique_customers') ).filter( DonHang.ngay_tao >= start_date, DonHang.trang_thai != TrangThaiDonHang.HUY ).group_by( extract('year', DonHang.ngay_tao), extract('month', DonHang.ngay_tao) ).order_by( extract('year', DonHang.ngay_tao), extract('month', DonHang.ngay_tao) ).all() result = [] for row in monthly_data: month_name = datetime(int(row.year), int(row.month), 1).strftime("%B %Y") result.append({ "year": int(row.year), "month": int(row.month), "month_name": month_name, "revenue": float(row.revenue or 0), "orders": row.orders, "unique_customers": row.unique_customers, "avg_order_value": float(row.revenue or 0) / row.orders if row.orders > 0 else 0 }) return result except Exception as e: app_logger.error(f" Error in get_monthly_comparison: {str(e)}") return [] # CUSTOMER ANALYTICS def get_customer_analytics(self) -> Dict[str, Any]: """ Phan tich khach hang chi tiet""" try: total_customers = self.db_session.query(KhachHang).count() # Customer by type distribution customer_types = self.db_session.query( KhachHang.loai_khach, func.count(KhachHang.id).label('count') ).group_by(KhachHang.loai_khach).all() type_distribution = { "moi": 0, "than_thiet": 0, "vip": 0, "blacklist": 0 } for row in customer_types: type_distribution[row.loai_khach.value] = row.count # Top customers by revenue top_customers = self.db_session.query( KhachHang.id, KhachHang.ho_ten, KhachHang.email, KhachHang.loai_khach, func.sum(DonHang.tong_tien).label('total_spent'), func.count(DonHang.id).label('order_count') ).join( DonHang, KhachHang.id == DonHang.khach_hang_id ).filter( DonHang.trang_thai != TrangThaiDonHang.HUY ).group_by( KhachHang.id, KhachHang.ho_ten, KhachHang.email, KhachHang.loai_khach ).order_by( func.sum(DonHang.tong_tien).desc() ).limit(10).all() top_customers_list = [] for row in top_customers: top_customers_list.append({ "id": row.id, "name": row.ho_ten, "email": row.email, "type": row.loai_khach.value, "total_spent": float(row.total_spent or 0), "order_count": row.order_count }) # New customers this month start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0) new_customers_this_month = self.db_session.query(KhachHang).filter( KhachHang.ngay_tao >= start_of_month ).count() # Customer lifetime value avg_customer_value = self.db_session.query( func.avg(KhachHang.tong_tien_da_mua) ).scalar() or 0 return { "total_customers": total_customers, "new_customers_this_month": new_customers_this_month, "type_distribution": type_distribution, "top_customers": top_customers_list, "avg_customer_value": float(avg_customer_value) } except Exception as e: app_logger.error(f" Error in get_customer_analytics: {str(e)}") return {} def get_product_performance(self, limit: int = 20) -> Dict[str, Any]: """ Hieu suat san pham""" try: # Top selling products top_products = self.db_session.query( SanPham.id, SanPham.ten_san_pham, SanPham.danh_muc, SanPham.quoc_gia_nguon, func.sum(ChiTietDonHang.so_luong).label('total_sold'), func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).label('total_revenue'), func.count(func.distinct(ChiTietDonHang.don_hang_id)).label('order_count') ).join( ChiTietDonHang, SanPham.id == ChiTietDonHang.san_pham_id ).join( DonHang, ChiTietDonHang.don_hang_id == DonHang.id ).filter( DonHang.trang_thai != TrangThaiDonHang.HUY ).group_by( SanPham.id, SanPham.ten_san_pham, SanPham.danh_muc, SanPham.quoc_gia_nguon ).order_by( func.sum(ChiTietDonHang.so_luong).desc() ).limit(limit).all() product_list = [] for row in top_products: avg_order_value = float(row.total_revenue or 0) / row.order_count if row.order_count > 0 else 0 product_list.append({ "id": row.id, "name": row.ten_san_pham, "category": row.danh_muc, "country": row.quoc_gia_nguon, "total_sold": row.total_sold, "total_revenue": float(row.total_revenue or 0), "order_count": row.order_count, "avg_order_value": avg_order_value }) # Category performance category_performance = self.db_session.query( SanPham.danh_muc, func.sum(ChiTietDonHang.so_luong).label('total_sold'), func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).label('total_revenue') ).join( ChiTietDonHang, SanPham.id == ChiTietDonHang.san_pham_id ).join( DonHang, ChiTietDonHang.don_hang_id == DonHang.id ).filter( DonHang.trang_thai != TrangThaiDonHang.HUY, SanPham.danh_muc.isnot(None) ).group_by( SanPham.danh_muc ).order_by( func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).desc() ).all() categories = [] for row in category_performance: categories.append({ "category": row.danh_muc, "total_sold": row.total_sold, "total_revenue": float(row.total_revenue or 0) }) return { "top_products": product_list, "category_performance": categories } except Exception as e: app_logger.error(f" Error in get_product_performance: {str(e)}") return {} def get_order_status_analytics(self) -> Dict[str, Any]: """ Phan tich trang thai don hang""" try: # Order status distribution status_distribution = self.db_session.query( DonHang.trang_thai, func.count(DonHang.id).label('count'), func.sum(DonHang.tong_tien).label('total_value') ).group_by(DonHang.trang_thai).all() status_data = {} total_orders = 0 total_value = 0 for row in status_distribution: count = row.count value = float(row.total_value or 0) total_orders += count total_value += value status_data[row.trang_thai.value] = { "count": count, "total_value": value, "percentage": 0 # Will calculate after getting total } # Calculate percentages for status in status_data: status_data[status]["percentage"] = ( status_data[status]["count"] / total_orders * 100 ) if total_orders > 0 else 0 # Average processing time by status processing_times = self.db_session.query( DonHang.trang_thai, func.avg( func.extract('epoch', DonHang.ngay_cap_nhat - DonHang.ngay_tao) / 86400 ).label('avg_days') ).filter( DonHang.ngay_cap_nhat.isnot(None) ).group_by(DonHang.trang_thai).all() processing_time_data = {} for row in processing_times: processing_time_data[row.trang_thai.value] = round(float(row.avg_days or 0), 2) return { "status_distribution": status_data, "processing_times": processing_time_data, "total_orders": total_orders, "total_value": total_value } except Exception as e: app_logger.error(f" Error in get_order_status_analytics: {str(e)}") return {} def get_advanced_dashboard_data(self, date_range: int = 30) -> Dict[str, Any]: """ Du lieu dashboard nang cao tong hop""" try: return { "sales_overview": self.get_sales_overview(date_range), "daily_trends": self.get_daily_revenue_trend(date_range), "monthly_comparison": self.get_monthly_comparison(12), "customer_analytics": self.get_customer_analytics(), "product_performance": self.get_product_performance(15), "order_status": self.get_order_status_analytics(), "generated_at": datetime.utcnow().isoformat(), "date_range": date_range } except Exception as e: app_logger.error(f" Error in get_advanced_dashboard_data: {str(e)}") return {} # BUSINESS INTELLIGENCE def get_business_insights(self) -> Dict[str, Any]: """ Business Intelligence va Insights""" try: insights = [] # Revenue trend analysis recent_revenue = self.get_daily_revenue_trend(7) if len(recent_revenue) >= 7: last_week_avg = sum(day['revenue'] for day in recent_revenue[-7:]) / 7 prev_week_avg = sum(day['revenue'] for day in recent_revenue[-14:-7]) / 7 if len(recent_revenue) >= 14 else 0 if last_week_avg > prev_week_avg * 1.1: insights.append({ "type": "positive", "title": " Doanh thu tang truong manh", "description": f"Doanh thu tuan nay tang {((last_week_avg - prev_week_avg) / prev_week_avg * 100):.1f}% so voi tuan truoc", "action": "Tang cuong marketing de duy tri momentum" }) elif last_week_avg < prev_week_avg * 0.9: insights.append({ "type": "warning", "title": " Doanh thu giam", "description": f"Doanh thu tuan nay giam {((prev_week_avg - last_week_avg) / prev_week_avg * 100):.1f}% so voi tuan truoc", "action": "Can xem xet lai chien luoc marketing va khuyen mai" }) # Customer insights customer_data = self.get_customer_analytics() vip_percentage = (customer_data.get('type_distribution', {}).get('vip', 0) / customer_data.get('total_customers', 1)) * 100 if vip_percentage > 20: insights.append({ "type": "positive", "title": " Nhieu khach hang VIP", "description": f"{vip_percentage:.1f}% khach hang la VIP", "action": "Tao chuong trinh loyalty dac biet cho VIP" }) # Product performance insights product_data = self.get_product_performance(10) if product_data.get('top_products'): top_product = product_data['top_products'][0] insights.append({ "type": "info", "title": " San pham ban chay nhat", "description": f"{top_product['name']} voi {top_product['total_sold']} san pham da ban", "action": f"Tang stock cho danh muc {top_product['category']}" }) return { "insights": insights, "generated_at": datetime.utcnow().isoformat() } except Exception as e: app_logger.error(f" Error in get_business_insights: {str(e)}") return {"insights": []} # Global analytics service analytics_service = AdvancedAnalytics() # Helper functions def get_analytics_data(db: Session, date_range: int = 30) -> Dict[str, Any]: """ Get comprehensive analytics data""" analytics_service.set_session(db) return analytics_service.get_advanced_dashboard_data(date_range) def get_business_insights(db: Session) -> Dict[str, Any]: """ Get AI-powered business insights""" analytics_service.set_session(db) return analytics_service.get_business_insights() print("Advanced Analytics service loaded successfully!")
+# -*- coding: utf-8 -*-
+# FADO CRM - Advanced Analytics Service
+# He thong phan tich du lieu thong minh nhu Data Scientist!
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextvars import copy_context
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from analytics_memo import memo_scope, memoized
+from cache_warmup import register_warmup
+from customer_rfm import RFM_AT_RISK_DAYS, RFM_LOYAL_ORDERS, read_customer_rfm, read_rfm_segments
+from database_pool import cached_query
+from models import (
+    ChiTietDonHang,
+    DonHang,
+    KhachHang,
+    LichSuLienHe,
+    LoaiKhachHang,
+    SanPham,
+    TrangThaiDonHang,
+)
+from sales_rollup import read_daily_sales
+from sqlalchemy import and_, case, extract, func, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+try:
+    from logging_config import app_logger
+except ImportError:
+    app_logger = logging.getLogger(__name__)
+
+# Ket qua analytics chi thay doi theo don hang moi -> cache ngan, warm-up lam moi truoc khi het han
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "900"))
+# Tham so bao cao con cua dashboard; insights dung cung tham so -> dung lai ket qua memo
+DASHBOARD_TREND_DAYS = 30
+DASHBOARD_MONTHS = 12
+DASHBOARD_TOP_PRODUCTS = 15
+# Section dashboard chay song song: so thread (0 = tuan tu) va han chung cho ca dashboard (giay)
+ANALYTICS_SECTION_WORKERS = int(os.getenv("ANALYTICS_SECTION_WORKERS", "6"))
+ANALYTICS_SECTION_TIMEOUT = float(os.getenv("ANALYTICS_SECTION_TIMEOUT", "15"))
+
+
+def supports_aggregate_filter(dialect) -> bool:
+    """Aggregate FILTER (WHERE ...) co tren Postgres va SQLite >= 3.30; con lai dung CASE"""
+    if dialect.name == "postgresql":
+        return True
+    if dialect.name == "sqlite":
+        return getattr(dialect.dbapi, "sqlite_version_info", (0,)) >= (3, 30, 0)
+    return False
+
+
+def _report_errors(default: Callable[[], Any]):
+    """Bao cao con loi -> log va tra default() (strict: raise de executor ghi section_errors)"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                if self.strict:
+                    raise
+                app_logger.error(f" Error in {method.__name__}: {str(e)}")
+                return default()
+
+        return wrapper
+
+    return decorator
+
+
+def _session_of(analytics: "AdvancedAnalytics") -> Optional[Session]:
+    return analytics.db_session
+
+
+class AdvancedAnalytics:
+    def __init__(self, db: Optional[Session] = None, strict: bool = False):
+        self.db_session = db
+        # strict: section loi thi raise (executor dashboard ghi nhan loi) thay vi tra {} / []
+        self.strict = strict
+
+    def set_session(self, db: Session):
+        """Set database session"""
+        self.db_session = db
+
+    def _dialect(self):
+        return self.db_session.get_bind().dialect
+
+    def _when(self, aggregate, expr, condition):
+        """aggregate(expr) chi tren cac dong thoa condition - nhieu chi so trong 1 lan quet"""
+        if supports_aggregate_filter(self._dialect()):
+            return aggregate(expr).filter(condition)
+        return aggregate(case((condition, expr)))
+
+    def _days_between(self, later, earlier):
+        """So ngay giua 2 cot DateTime (SQLite luu datetime dang text, khong tru truc tiep duoc)"""
+        if self._dialect().name == "sqlite":
+            return func.julianday(later) - func.julianday(earlier)
+        return func.extract("epoch", later - earlier) / 86400
+
+    # SALES ANALYTICS
+    @_report_errors(dict)
+    @memoized("don_hang", session=_session_of)
+    def get_sales_overview(self, date_range: int = 30) -> Dict[str, Any]:
+        """Tong quan doanh so ban hang"""
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=date_range)
+
+        prev_start = start_date - timedelta(days=date_range)
+
+        # 1 lan quet [prev_start, now): ky nay va ky truoc tach bang conditional aggregate
+        current = DonHang.ngay_tao >= start_date
+        not_cancelled = DonHang.trang_thai != TrangThaiDonHang.HUY
+        overview = (
+            self.db_session.query(
+                self._when(func.sum, DonHang.tong_tien, and_(current, not_cancelled)).label(
+                    "revenue"
+                ),
+                self._when(func.count, DonHang.id, current).label("orders"),
+                self._when(
+                    func.count,
+                    DonHang.id,
+                    and_(current, DonHang.trang_thai == TrangThaiDonHang.DA_NHAN),
+                ).label("completed"),
+                self._when(
+                    func.sum,
+                    DonHang.tong_tien,
+                    and_(DonHang.ngay_tao < start_date, not_cancelled),
+                ).label("prev_revenue"),
+            )
+            .filter(DonHang.ngay_tao >= prev_start)
+            .one()
+        )
+
+        total_revenue = overview.revenue or 0
+        total_orders = overview.orders or 0
+        completed_orders = overview.completed or 0
+        prev_revenue = overview.prev_revenue or 0
+
+        # Average order value
+        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+
+        revenue_growth = (
+            ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
+        )
+
+        return {
+            "total_revenue": float(total_revenue),
+            "total_orders": total_orders,
+            "completed_orders": completed_orders,
+            "avg_order_value": float(avg_order_value),
+            "completion_rate": ((completed_orders / total_orders * 100) if total_orders > 0 else 0),
+            "revenue_growth": round(revenue_growth, 2),
+            "date_range": date_range,
+        }
+
+    @_report_errors(list)
+    def get_daily_revenue_trend(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Xu huong doanh thu theo ngay"""
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days)
+
+        # Doc tu daily_sales_rollup thay vi GROUP BY date(ngay_tao) tren don_hang
+        daily_data = read_daily_sales(self.db_session, start_date)
+
+        # Create complete date range
+        result = []
+        current_date = start_date
+
+        # Convert query results to dict for easy lookup
+        data_dict = {
+            row.ngay: {"revenue": float(row.revenue or 0), "orders": row.orders}
+            for row in daily_data
+        }
+
+        while current_date <= end_date:
+            day_data = data_dict.get(current_date, {"revenue": 0, "orders": 0})
+            result.append(
+                {
+                    "date": current_date.strftime("%Y-%m-%d"),
+                    "revenue": day_data["revenue"],
+                    "orders": day_data["orders"],
+                    "avg_order_value": (
+                        day_data["revenue"] / day_data["orders"] if day_data["orders"] > 0 else 0
+                    ),
+                }
+            )
+            current_date += timedelta(days=1)
+
+        return result
+
+    @_report_errors(list)
+    def get_monthly_comparison(self, months: int = 12) -> List[Dict[str, Any]]:
+        """So sanh doanh thu theo thang"""
+        start_date = (datetime.utcnow() - timedelta(days=months * 30)).date()
+
+        # Gop cac dong rollup theo ngay thanh thang (toi da ~365 dong)
+        # unique_customers = tong khach theo ngay (khach mua nhieu ngay tinh nhieu lan)
+        monthly = defaultdict(lambda: {"revenue": 0.0, "orders": 0, "unique_customers": 0})
+        for row in read_daily_sales(self.db_session, start_date):
+            bucket = monthly[(row.ngay.year, row.ngay.month)]
+            bucket["revenue"] += float(row.revenue or 0)
+            bucket["orders"] += row.orders or 0
+            bucket["unique_customers"] += row.unique_customers or 0
+
+        result = []
+        for (year, month), data in sorted(monthly.items()):
+            month_name = datetime(year, month, 1).strftime("%B %Y")
+            result.append(
+                {
+                    "year": year,
+                    "month": month,
+                    "month_name": month_name,
+                    "revenue": data["revenue"],
+                    "orders": data["orders"],
+                    "unique_customers": data["unique_customers"],
+                    "avg_order_value": (
+                        data["revenue"] / data["orders"] if data["orders"] > 0 else 0
+                    ),
+                }
+            )
+
+        return result
+
+    # CUSTOMER ANALYTICS
+    @_report_errors(dict)
+    @memoized("khach_hang", "don_hang", "customer_rfm", session=_session_of)
+    def get_customer_analytics(self) -> Dict[str, Any]:
+        """Phan tich khach hang chi tiet"""
+        start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0)
+
+        # Tong so, phan bo theo loai, khach moi thang nay va CLV trong 1 lan quet khach_hang
+        totals = self.db_session.query(
+            func.count(KhachHang.id).label("total"),
+            func.avg(KhachHang.tong_tien_da_mua).label("avg_value"),
+            self._when(func.count, KhachHang.id, KhachHang.ngay_tao >= start_of_month).label(
+                "new_this_month"
+            ),
+            *[
+                self._when(func.count, KhachHang.id, KhachHang.loai_khach == loai).label(loai.value)
+                for loai in LoaiKhachHang
+            ],
+        ).one()
+
+        total_customers = totals.total
+        type_distribution = {loai.value: getattr(totals, loai.value) or 0 for loai in LoaiKhachHang}
+
+        # Top khach, phan khuc RFM va khach co nguy co roi bo doc tu customer_rfm (khong quet don_hang)
+        top_customers_list = [
+            {
+                "id": row.id,
+                "name": row.ho_ten,
+                "email": row.email,
+                "type": row.loai_khach.value,
+                "total_spent": float(row.monetary),
+                "order_count": row.order_count,
+            }
+            for row in read_customer_rfm(self.db_session, limit=10)
+        ]
+        churn_risk = [
+            {
+                "id": row.id,
+                "name": row.ho_ten,
+                "type": row.loai_khach.value,
+                "days_inactive": row.recency_days,
+                "order_count": row.order_count,
+                "lifetime_value": float(row.monetary),
+            }
+            for row in read_customer_rfm(
+                self.db_session,
+                inactive_days=RFM_AT_RISK_DAYS,
+                min_orders=RFM_LOYAL_ORDERS,
+                limit=5,
+            )
+        ]
+
+        new_customers_this_month = totals.new_this_month or 0
+        avg_customer_value = totals.avg_value or 0
+
+        return {
+            "total_customers": total_customers,
+            "new_customers_this_month": new_customers_this_month,
+            "type_distribution": type_distribution,
+            "top_customers": top_customers_list,
+            "avg_customer_value": float(avg_customer_value),
+            "rfm_segments": read_rfm_segments(self.db_session),
+            "churn_risk": churn_risk,
+        }
+
+    @_report_errors(dict)
+    @memoized("san_pham", "chi_tiet_don_hang", "don_hang", session=_session_of)
+    def get_product_performance(self, limit: int = 20) -> Dict[str, Any]:
+        """Hieu suat san pham"""
+        # Top selling products
+        top_products = (
+            self.db_session.query(
+                SanPham.id,
+                SanPham.ten_san_pham,
+                SanPham.danh_muc,
+                SanPham.quoc_gia_nguon,
+                func.sum(ChiTietDonHang.so_luong).label("total_sold"),
+                func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).label("total_revenue"),
+                func.count(func.distinct(ChiTietDonHang.don_hang_id)).label("order_count"),
+            )
+            .join(ChiTietDonHang, SanPham.id == ChiTietDonHang.san_pham_id)
+            .join(DonHang, ChiTietDonHang.don_hang_id == DonHang.id)
+            .filter(DonHang.trang_thai != TrangThaiDonHang.HUY)
+            .group_by(SanPham.id, SanPham.ten_san_pham, SanPham.danh_muc, SanPham.quoc_gia_nguon)
+            .order_by(func.sum(ChiTietDonHang.so_luong).desc())
+            .limit(limit)
+            .all()
+        )
+
+        product_list = []
+        for row in top_products:
+            avg_order_value = (
+                float(row.total_revenue or 0) / row.order_count if row.order_count > 0 else 0
+            )
+            product_list.append(
+                {
+                    "id": row.id,
+                    "name": row.ten_san_pham,
+                    "category": row.danh_muc,
+                    "country": row.quoc_gia_nguon,
+                    "total_sold": row.total_sold,
+                    "total_revenue": float(row.total_revenue or 0),
+                    "order_count": row.order_count,
+                    "avg_order_value": avg_order_value,
+                }
+            )
+
+        # Category performance
+        category_performance = (
+            self.db_session.query(
+                SanPham.danh_muc,
+                func.sum(ChiTietDonHang.so_luong).label("total_sold"),
+                func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).label("total_revenue"),
+            )
+            .join(ChiTietDonHang, SanPham.id == ChiTietDonHang.san_pham_id)
+            .join(DonHang, ChiTietDonHang.don_hang_id == DonHang.id)
+            .filter(DonHang.trang_thai != TrangThaiDonHang.HUY, SanPham.danh_muc.isnot(None))
+            .group_by(SanPham.danh_muc)
+            .order_by(func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua).desc())
+            .all()
+        )
+
+        categories = []
+        for row in category_performance:
+            categories.append(
+                {
+                    "category": row.danh_muc,
+                    "total_sold": row.total_sold,
+                    "total_revenue": float(row.total_revenue or 0),
+                }
+            )
+
+        return {"top_products": product_list, "category_performance": categories}
+
+    @_report_errors(dict)
+    @memoized("don_hang", session=_session_of)
+    def get_order_status_analytics(self) -> Dict[str, Any]:
+        """Phan tich trang thai don hang"""
+        # Phan bo trang thai va thoi gian xu ly trung binh trong cung 1 GROUP BY
+        status_distribution = (
+            self.db_session.query(
+                DonHang.trang_thai,
+                func.count(DonHang.id).label("count"),
+                func.sum(DonHang.tong_tien).label("total_value"),
+                self._when(
+                    func.avg,
+                    self._days_between(DonHang.ngay_cap_nhat, DonHang.ngay_tao),
+                    DonHang.ngay_cap_nhat.isnot(None),
+                ).label("avg_days"),
+            )
+            .group_by(DonHang.trang_thai)
+            .all()
+        )
+
+        status_data = {}
+        processing_time_data = {}
+        total_orders = 0
+        total_value = 0
+
+        for row in status_distribution:
+            count = row.count
+            value = float(row.total_value or 0)
+            total_orders += count
+            total_value += value
+
+            status_data[row.trang_thai.value] = {
+                "count": count,
+                "total_value": value,
+                "percentage": 0,  # Will calculate after getting total
+            }
+            if row.avg_days is not None:
+                processing_time_data[row.trang_thai.value] = round(float(row.avg_days), 2)
+
+        # Calculate percentages
+        for status in status_data:
+            status_data[status]["percentage"] = (
+                (status_data[status]["count"] / total_orders * 100) if total_orders > 0 else 0
+            )
+
+        return {
+            "status_distribution": status_data,
+            "processing_times": processing_time_data,
+            "total_orders": total_orders,
+            "total_value": total_value,
+        }
+
+    def get_advanced_dashboard_data(self, date_range: int = 30) -> Dict[str, Any]:
+        """Du lieu dashboard nang cao tong hop"""
+        try:
+            # Cac section doc lap -> chay song song, section loi/qua han tra None + section_errors
+            results, errors, timings = run_dashboard_sections(self.db_session, date_range)
+            data = {
+                **results,
+                "generated_at": datetime.utcnow().isoformat(),
+                "date_range": date_range,
+                "section_timings_ms": timings,
+            }
+            if errors:
+                data["section_errors"] = errors
+            return data
+        except Exception as e:
+            app_logger.error(f" Error in get_advanced_dashboard_data: {str(e)}")
+            return {}
+
+    # BUSINESS INTELLIGENCE
+    def get_business_insights(self) -> Dict[str, Any]:
+        """Business Intelligence va Insights"""
+        try:
+            insights = []
+
+            # Revenue trend analysis - cung tham so voi dashboard de dung lai ket qua da tinh
+            recent_revenue = self.get_daily_revenue_trend(DASHBOARD_TREND_DAYS)
+            if len(recent_revenue) >= 14:
+                last_week_avg = sum(day["revenue"] for day in recent_revenue[-7:]) / 7
+                prev_week_avg = sum(day["revenue"] for day in recent_revenue[-14:-7]) / 7
+
+                # Tuan truoc khong co doanh thu -> khong tinh duoc % thay doi
+                if prev_week_avg and last_week_avg > prev_week_avg * 1.1:
+                    insights.append(
+                        {
+                            "type": "positive",
+                            "title": " Doanh thu tang truong manh",
+                            "description": f"Doanh thu tuan nay tang {((last_week_avg - prev_week_avg) / prev_week_avg * 100):.1f}% so voi tuan truoc",
+                            "action": "Tang cuong marketing de duy tri momentum",
+                        }
+                    )
+                elif last_week_avg < prev_week_avg * 0.9:
+                    insights.append(
+                        {
+                            "type": "warning",
+                            "title": " Doanh thu giam",
+                            "description": f"Doanh thu tuan nay giam {((prev_week_avg - last_week_avg) / prev_week_avg * 100):.1f}% so voi tuan truoc",
+                            "action": "Can xem xet lai chien luoc marketing va khuyen mai",
+                        }
+                    )
+
+            # Customer insights
+            customer_data = self.get_customer_analytics()
+            vip_percentage = (
+                customer_data.get("type_distribution", {}).get("vip", 0)
+                / (customer_data.get("total_customers") or 1)
+            ) * 100
+
+            if vip_percentage > 20:
+                insights.append(
+                    {
+                        "type": "positive",
+                        "title": " Nhieu khach hang VIP",
+                        "description": f"{vip_percentage:.1f}% khach hang la VIP",
+                        "action": "Tao chuong trinh loyalty dac biet cho VIP",
+                    }
+                )
+
+            churn_risk = customer_data.get("churn_risk")
+            if churn_risk:
+                insights.append(
+                    {
+                        "type": "warning",
+                        "title": f" {len(churn_risk)} khach hang co nguy co roi bo",
+                        "description": f"Khach mua tu {RFM_LOYAL_ORDERS} don tro len nhung khong mua hang >{RFM_AT_RISK_DAYS} ngay",
+                        "action": "Lien he, gui uu dai de tai kich hoat",
+                    }
+                )
+
+            # Product performance insights
+            product_data = self.get_product_performance(DASHBOARD_TOP_PRODUCTS)
+            if product_data.get("top_products"):
+                top_product = product_data["top_products"][0]
+                insights.append(
+                    {
+                        "type": "info",
+                        "title": " San pham ban chay nhat",
+                        "description": f"{top_product['name']} voi {top_product['total_sold']} san pham da ban",
+                        "action": f"Tang stock cho danh muc {top_product['category']}",
+                    }
+                )
+
+            return {"insights": insights, "generated_at": datetime.utcnow().isoformat()}
+        except Exception as e:
+            app_logger.error(f" Error in get_business_insights: {str(e)}")
+            return {"insights": []}
+
+
+# DASHBOARD SECTIONS
+# Moi section: (analytics, date_range) -> ket qua, chay tren 1 session rieng lay tu pool
+DASHBOARD_SECTIONS: Dict[str, Callable[[AdvancedAnalytics, int], Any]] = {
+    "sales_overview": lambda analytics, date_range: analytics.get_sales_overview(date_range),
+    "daily_trends": lambda analytics, date_range: analytics.get_daily_revenue_trend(date_range),
+    "monthly_comparison": lambda analytics, date_range: analytics.get_monthly_comparison(
+        DASHBOARD_MONTHS
+    ),
+    "customer_analytics": lambda analytics, date_range: analytics.get_customer_analytics(),
+    "product_performance": lambda analytics, date_range: analytics.get_product_performance(
+        DASHBOARD_TOP_PRODUCTS
+    ),
+    "order_status": lambda analytics, date_range: analytics.get_order_status_analytics(),
+}
+
+_section_executor: Optional[ThreadPoolExecutor] = None
+_section_executor_lock = threading.Lock()
+
+
+def _get_section_executor() -> ThreadPoolExecutor:
+    """Pool thread dung chung cho moi dashboard (tao khi can)"""
+    global _section_executor
+    with _section_executor_lock:
+        if _section_executor is None:
+            _section_executor = ThreadPoolExecutor(
+                max_workers=ANALYTICS_SECTION_WORKERS, thread_name_prefix="analytics-section"
+            )
+        return _section_executor
+
+
+def section_session_factory(db: Session) -> Optional[Callable[[], Session]]:
+    """
+    Factory session cung database voi db cho tung section. None -> chay tuan tu tren db:
+    pool chi co 1 connection (SQLite :memory:), db bind vao Connection, hoac db co thay doi
+    chua commit ma session khac khong thay.
+    """
+    if db.new or db.dirty or db.deleted or db.info.get("wrote"):
+        return None
+    registry = db.info.get("registry")
+    if registry is not None:
+        # Session cua AsyncSession (run_sync) cung dung sessionmaker dong bo cua registry
+        purpose = db.info.get("purpose", "analytics")
+        engine, factory = registry.engine_for(purpose), registry.sessionmaker(purpose)
+    else:
+        engine = db.get_bind()
+        if not isinstance(engine, Engine):
+            return None
+        factory = sessionmaker(bind=engine)
+    if isinstance(engine.pool, (StaticPool, SingletonThreadPool)):
+        return None
+    return factory
+
+
+def _run_section(session_factory, section, date_range: int) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    with session_factory() as db:
+        result = section(AdvancedAnalytics(db, strict=True), date_range)
+    return result, time.perf_counter() - start
+
+
+def _sections_sequential(db: Session, sections, date_range: int):
+    analytics = AdvancedAnalytics(db, strict=True)
+    results, errors, timings = {}, {}, {}
+    for name, section in sections.items():
+        start = time.perf_counter()
+        try:
+            results[name] = section(analytics, date_range)
+        except Exception as e:
+            app_logger.error(f" Error in dashboard section {name}: {str(e)}")
+            db.rollback()
+            results[name], errors[name] = None, str(e)
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return results, errors, timings
+
+
+def run_dashboard_sections(
+    db: Session,
+    date_range: int = 30,
+    sections: Optional[Dict[str, Callable[[AdvancedAnalytics, int], Any]]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float]]:
+    """
+    Chay cac section dashboard song song, moi section 1 session tu pool, chung 1 han
+    timeout (giay). Tra ve (results, errors, timings_ms); section loi/qua han co ket qua None.
+    Section qua han van chay tiep tren thread cua no den khi query xong (khong huy duoc).
+    """
+    sections = DASHBOARD_SECTIONS if sections is None else sections
+    timeout = ANALYTICS_SECTION_TIMEOUT if timeout is None else timeout
+    session_factory = section_session_factory(db)
+    if session_factory is None or ANALYTICS_SECTION_WORKERS <= 0:
+        return _sections_sequential(db, sections, date_range)
+
+    executor = _get_section_executor()
+    deadline = time.monotonic() + timeout
+    # Moi section 1 ban sao context -> dung chung memo_scope cua request
+    futures = {
+        name: executor.submit(
+            copy_context().run, _run_section, session_factory, section, date_range
+        )
+        for name, section in sections.items()
+    }
+    results, errors, timings = {}, {}, {}
+    for name, future in futures.items():
+        try:
+            results[name], elapsed = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            timings[name] = round(elapsed * 1000, 1)
+        except FuturesTimeoutError:
+            future.cancel()
+            app_logger.warning(f" Dashboard section {name} timed out after {timeout}s")
+            results[name], errors[name] = None, f"timeout after {timeout}s"
+        except Exception as e:
+            app_logger.error(f" Error in dashboard section {name}: {str(e)}")
+            results[name], errors[name] = None, str(e)
+    return results, errors, timings
+
+
+def _complete_dashboard(data: Dict[str, Any]) -> bool:
+    """Dashboard thieu section (loi/qua han) khong cache -> lan sau tinh lai"""
+    return bool(data) and not data.get("section_errors")
+
+
+# Global analytics service
+analytics_service = AdvancedAnalytics()
+app_logger.info("Advanced Analytics service initialized")
+
+
+# Helper functions - moi lan goi 1 instance rieng: request va warm-up chay song song tren
+# cac thread khac nhau, dung chung analytics_service.set_session() se tranh nhau session
+@cached_query(
+    ttl=ANALYTICS_CACHE_TTL, cache_key_params=["date_range"], cache_if=_complete_dashboard
+)
+def get_analytics_data(db: Session, date_range: int = 30) -> Dict[str, Any]:
+    """Get comprehensive analytics data"""
+    with memo_scope():
+        return AdvancedAnalytics(db).get_advanced_dashboard_data(date_range)
+
+
+@cached_query(ttl=ANALYTICS_CACHE_TTL)
+def get_business_insights(db: Session) -> Dict[str, Any]:
+    """Get AI-powered business insights"""
+    with memo_scope():
+        return AdvancedAnalytics(db).get_business_insights()
+
+
+# Warm-up sau deploy/flush cache: dashboard mac dinh (30 ngay) va insights
+register_warmup("analytics_dashboard", lambda db: get_analytics_data.refresh(db, date_range=30))
+register_warmup("business_insights", lambda db: get_business_insights.refresh(db))
+
+print("Advanced Analytics service loaded successfully!")
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Analytics NDJSON streaming
+Chuoi thoi gian dai (nhieu nam theo ngay x danh muc) tra ve dang NDJSON: moi dong 1 object JSON,
+doc tu server-side cursor (yield_per/stream_results) va gui ngay -> bo nho co dinh du khoang ngay
+lon den dau. Dong xep tang theo (date[, category]); bi ngat giua chung thi client gui lai
+after=<date cua dong cuoi> (+ after_category=<category cua dong cuoi> khi by_category) de doc tiep
+ma khong nhan trung dong nao.
+"""
+
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+try:
+    from models import DailySalesRollup
+    from sales_rollup import daily_sales_select
+except ModuleNotFoundError:
+    from backend.models import DailySalesRollup
+    from backend.sales_rollup import daily_sales_select
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# So dong moi lan fetch tu cursor
+ANALYTICS_STREAM_BATCH = int(os.getenv("ANALYTICS_STREAM_BATCH", "1000"))
+
+_rollup = DailySalesRollup.__table__
+
+
+def _zero(day: date) -> Dict[str, Any]:
+    return {"date": day.isoformat(), "revenue": 0.0, "orders": 0, "units": 0, "unique_customers": 0}
+
+
+def iter_daily_sales(
+    session_factory: Callable[[], Session],
+    since: date,
+    until: Optional[date] = None,
+    by_category: bool = False,
+    after: Optional[date] = None,
+    after_category: Optional[str] = None,
+    exclude_cancelled: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Dong theo ngay[, danh muc] tu daily_sales_rollup trong [since, until], sau vi tri (after,
+    after_category). Khong theo danh muc thi ngay khong co don van co dong 0 (nhu revenue-trend).
+    Tham so sai -> ValueError ngay khi goi (truoc khi gui header); doc DB khi bat dau lap, tren
+    session rieng vi generator chay sau khi endpoint da tra response.
+    """
+    if after_category is not None and (after is None or not by_category):
+        raise ValueError("after_category requires after and by_category")
+    stmt = daily_sales_select(since, until, by_category, exclude_cancelled)
+    if after is not None and after_category is not None:
+        stmt = stmt.where(
+            or_(
+                _rollup.c.ngay > after,
+                and_(_rollup.c.ngay == after, _rollup.c.danh_muc > after_category),
+            )
+        )
+    elif after is not None:
+        stmt = stmt.where(_rollup.c.ngay > after)
+
+    # Ngay tiep theo can co dong (lap ngay trong); None = khong lap (theo danh muc)
+    expected = None if by_category else max(since, after + timedelta(days=1) if after else since)
+    return _stream(session_factory, stmt, by_category, expected, until)
+
+
+def _stream(session_factory, stmt, by_category: bool, expected: Optional[date], until):
+    with session_factory() as db:
+        for row in db.execute(stmt.execution_options(yield_per=ANALYTICS_STREAM_BATCH)):
+            while expected is not None and expected < row.ngay:
+                yield _zero(expected)
+                expected += timedelta(days=1)
+            item = {"date": row.ngay.isoformat()}
+            if by_category:
+                item["category"] = row.danh_muc
+            item.update(
+                revenue=round(float(row.revenue or 0), 2),
+                orders=int(row.orders or 0),
+                units=int(row.units or 0),
+                unique_customers=int(row.unique_customers or 0),
+            )
+            yield item
+            if expected is not None:
+                expected = row.ngay + timedelta(days=1)
+    while expected is not None and until is not None and expected <= until:
+        yield _zero(expected)
+        expected += timedelta(days=1)
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    try:
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+    except Exception as e:
+        # Header 200 da gui: ngat ket noi, client thay stream dut va doc tiep bang after=...
+        logger.error(f"NDJSON stream aborted: {e}")
+        raise
+
+
+def ndjson_response(rows: Iterable[Dict[str, Any]]) -> StreamingResponse:
+    """StreamingResponse NDJSON; generator dong bo chay tren threadpool cua Starlette"""
+    return StreamingResponse(
+        ndjson_lines(rows),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+__all__ = [
+    "ANALYTICS_STREAM_BATCH",
+    "NDJSON_MEDIA_TYPE",
+    "iter_daily_sales",
+    "ndjson_lines",
+    "ndjson_response",
+]
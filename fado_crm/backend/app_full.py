@@ -22,14 +22,24 @@ import urllib.parse
 from typing import Any, Dict, List, Optional
 
 # ===== Advanced Modules: Minimal Payments (VNPay) =====
-from fastapi import Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi import Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
 
 EXCLUDED_FIELDS = {"vnp_SecureHash", "vnp_SecureHashType"}
 
 # Auth & models for permission checks
 from auth import get_admin_user, get_current_active_user, get_manager_user
+from http_cache import conditional_response, content_etag
+from models import AuditLog as AuditLogModel
 from models import NguoiDung
 from models import SystemSetting as SystemSettingModel
+from pagination import (
+    InvalidCursorError,
+    apply_keyset,
+    apply_offset,
+    build_page,
+    set_cursor_headers,
+)
+from settings_snapshot import settings_snapshot
 
 # File service (optional); provide graceful fallback if unavailable
 try:
@@ -282,40 +292,80 @@ async def delete_uploaded_file(
 
 
 from database import get_db
+from database_pool import get_request_db
 
 # ===== System Settings (Admin) =====
 from sqlalchemy.orm import Session
 
 
-@app.get("/admin/system-settings")
-async def list_settings(
-    current_user: NguoiDung = Depends(get_admin_user), db: Session = Depends(get_db)
+# ===== Audit Logs (Admin) =====
+@app.get("/admin/audit-logs")
+async def list_audit_logs(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor tu header X-Next-Cursor/X-Prev-Cursor"),
+    current_user: NguoiDung = Depends(get_admin_user),
+    db: Session = Depends(get_request_db),
 ):
-    rows = db.query(SystemSettingModel).order_by(SystemSettingModel.key.asc()).all()
+    query = db.query(AuditLogModel)
+    try:
+        if cursor:
+            page_query, direction = apply_keyset(
+                query, AuditLogModel.created_at, AuditLogModel.id, cursor, limit
+            )
+        else:
+            page_query, direction = apply_offset(
+                query, AuditLogModel.created_at, AuditLogModel.id, skip, limit
+            )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page = build_page(
+        page_query.all(),
+        "created_at",
+        "id",
+        limit,
+        direction,
+        has_previous=bool(cursor) or skip > 0,
+    )
+    set_cursor_headers(response, page)
     return [
         {
-            "key": r.key,
-            "value": r.value,
-            "description": getattr(r, "description", None),
-            "updated_at": getattr(r, "updated_at", None),
+            "id": r.id,
+            "action": r.action,
+            "resource": r.resource,
+            "resource_id": r.resource_id,
+            "user_id": r.user_id,
+            "ip_address": r.ip_address,
+            "user_agent": r.user_agent,
+            "details": r.details,
+            "created_at": r.created_at,
         }
-        for r in rows
+        for r in page["items"]
     ]
 
 
+# Doc tu snapshot trong process (settings_snapshot), chi upsert moi cham DB
+@app.get("/settings/public")
+async def get_public_settings(request: Request, response: Response):
+    """Cau hinh cong khai cho frontend (khong can xac thuc)"""
+    settings = settings_snapshot.public()
+    etag = content_etag(settings)
+    return conditional_response(request, response, etag, "settings_public") or settings
+
+
+@app.get("/admin/system-settings")
+async def list_settings(current_user: NguoiDung = Depends(get_admin_user)):
+    return settings_snapshot.rows()
+
+
 @app.get("/admin/system-settings/{key}")
-async def get_setting(
-    key: str, current_user: NguoiDung = Depends(get_admin_user), db: Session = Depends(get_db)
-):
-    r = db.query(SystemSettingModel).filter(SystemSettingModel.key == key).first()
+async def get_setting(key: str, current_user: NguoiDung = Depends(get_admin_user)):
+    r = settings_snapshot.row(key)
     if not r:
         raise HTTPException(status_code=404, detail="Khong tim thay cau hinh")
-    return {
-        "key": r.key,
-        "value": r.value,
-        "description": getattr(r, "description", None),
-        "updated_at": getattr(r, "updated_at", None),
-    }
+    return r
 
 
 @app.put("/admin/system-settings/{key}")
@@ -343,6 +393,7 @@ async def upsert_setting(
         pass
     db.commit()
     db.refresh(r)
+    settings_snapshot.apply(r)
     return {
         "key": r.key,
         "value": r.value,
@@ -1,16 +1,25 @@
 # FADO CRM - JWT Authentication System
+import asyncio
+import json
+import logging
 import os
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Optional
 
-from database import get_db
+from cache import cache
+from cache_invalidation import entity_tag, invalidate_tags
+from database import get_async_db
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from models import NguoiDung, VaiTro
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from password_hasher import HasherBusyError, PasswordHasher, build_context
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+logger = logging.getLogger(__name__)
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "fado_crm_super_secret_key_2024_vietnam_rocks")
@@ -18,8 +27,26 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Cache user dang nhap theo email (sub cua JWT) de bo 1 query moi request; 0 = tat.
+# Ghi NguoiDung qua ORM (doi thong tin, doi mat khau, khoa tai khoan) chi xoa entry cua user do
+# ngay sau commit; login (chi ghi lan_dang_nhap_cuoi) khong xoa -> gia tri nay co the cu toi da TTL.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_KEY_PREFIX = "principal:"
+# Khong cache mat_khau_hash
+_PRINCIPAL_FIELDS = (
+    "id",
+    "email",
+    "ho_ten",
+    "is_active",
+    "so_dien_thoai",
+    "ghi_chu",
+)
+_PRINCIPAL_DATETIMES = ("ngay_tao", "lan_dang_nhap_cuoi")
+
 # Password hashing: support both pbkdf2_sha256 (default) and bcrypt for backward compatibility
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+pwd_context = build_context()
+# Async path: hash/verify tren thread pool gioi han, khong chan event loop
+password_hasher = PasswordHasher(pwd_context)
 
 # HTTP Bearer for token extraction
 security = HTTPBearer()
@@ -36,6 +63,17 @@ class AuthenticationError(HTTPException):
         )
 
 
+class ServiceBusyError(HTTPException):
+    """Password hashing pool is saturated"""
+
+    def __init__(self, detail: str = "Server busy, please retry"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "1"},
+        )
+
+
 class AuthorizationError(HTTPException):
     """Custom authorization error"""
 
@@ -58,8 +96,114 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[NguoiD
     """Authenticate user with email and password"""
     user = db.query(NguoiDung).filter(NguoiDung.email == email, NguoiDung.is_active == True).first()
 
-    if not user or not verify_password(password, user.mat_khau_hash):
+    if not user:
         return None
+    valid, new_hash = pwd_context.verify_and_update(password, user.mat_khau_hash)
+    if not valid:
+        return None
+    if new_hash:
+        # Hash cu (bcrypt / so vong khac PASSWORD_HASH_ROUNDS) -> luu hash moi cung commit login
+        user.mat_khau_hash = new_hash
+    return user
+
+
+async def get_active_user_by_email(db: AsyncSession, email: str) -> Optional[NguoiDung]:
+    """Load an active user by email using the async session"""
+    result = await db.execute(
+        select(NguoiDung).where(NguoiDung.email == email, NguoiDung.is_active == True)
+    )
+    return result.scalars().first()
+
+
+def _principal_key(email: str) -> str:
+    return f"{PRINCIPAL_KEY_PREFIX}{email}"
+
+
+def _principal_guard(email: str) -> list:
+    # Tag biet truoc khi doc DB (chua co id): ghi qua ORM tag theo email, bulk UPDATE tag "user:*"
+    return [entity_tag("user_email", email), entity_tag("user", "*")]
+
+
+def _read_principal(key: str, guard: list):
+    # Entry + moc version tag (lay truoc khi doc DB) trong 1 lan chuyen sang thread
+    return cache.get(key), cache.tag_stamp(guard)
+
+
+def _dump_principal(user: NguoiDung) -> str:
+    data = {field: getattr(user, field) for field in _PRINCIPAL_FIELDS}
+    data["vai_tro"] = user.vai_tro.value if user.vai_tro else None
+    for field in _PRINCIPAL_DATETIMES:
+        value = getattr(user, field)
+        data[field] = value.isoformat() if value else None
+    return json.dumps(data)
+
+
+def _load_principal(raw: str) -> NguoiDung:
+    """Tao lai NguoiDung detached (nhu object cua session da dong) tu entry cache"""
+    data = json.loads(raw)
+    data["vai_tro"] = VaiTro(data["vai_tro"]) if data.get("vai_tro") else None
+    for field in _PRINCIPAL_DATETIMES:
+        data[field] = datetime.fromisoformat(data[field]) if data.get(field) else None
+    user = NguoiDung(**data)
+    make_transient_to_detached(user)
+    return user
+
+
+def invalidate_principal(email: str):
+    """Xoa principal khi doi user ngoai ORM (raw SQL); ghi qua ORM da tu xoa theo tag"""
+    # Qua tag (khong chi DEL key): fill dang chay cho email nay cung khong ghi lai duoc
+    invalidate_tags([entity_tag("user_email", email)])
+
+
+async def get_principal(db: AsyncSession, email: str) -> Optional[NguoiDung]:
+    """User active theo email, qua principal cache (TTL PRINCIPAL_CACHE_TTL)"""
+    if PRINCIPAL_CACHE_TTL <= 0:
+        return await get_active_user_by_email(db, email)
+
+    key = _principal_key(email)
+    guard = _principal_guard(email)
+    stamp = None
+    try:
+        # Cache co the la Redis (I/O dong bo) -> khong chay tren event loop
+        raw, stamp = await asyncio.to_thread(_read_principal, key, guard)
+        if raw:
+            return _load_principal(raw)
+    except Exception as e:
+        logger.warning(f"Principal cache read failed: {e}")
+
+    user = await get_active_user_by_email(db, email)
+    if user is not None and stamp is not None:
+        try:
+            # User bi sua/khoa sau khi lay moc -> cache tu choi ghi ban cu
+            await asyncio.to_thread(
+                cache.set,
+                key,
+                _dump_principal(user),
+                ex=PRINCIPAL_CACHE_TTL,
+                tags=[entity_tag("user", user.id), *guard],
+                stamp=stamp,
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {e}")
+    return user
+
+
+async def authenticate_user_async(
+    db: AsyncSession, email: str, password: str
+) -> Optional[NguoiDung]:
+    """Authenticate user with email and password (async session)"""
+    user = await get_active_user_by_email(db, email)
+
+    if not user:
+        return None
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password, user.mat_khau_hash)
+    except HasherBusyError:
+        raise ServiceBusyError()
+    if not valid:
+        return None
+    if new_hash:
+        user.mat_khau_hash = new_hash
     return user
 
 
@@ -97,8 +241,9 @@ def verify_token(token: str) -> dict:
         raise AuthenticationError()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
 ) -> NguoiDung:
     """Get current authenticated user"""
     payload = verify_token(credentials.credentials)
@@ -108,7 +253,7 @@ def get_current_user(
         raise AuthenticationError("Invalid token type")
 
     email = payload.get("sub")
-    user = db.query(NguoiDung).filter(NguoiDung.email == email, NguoiDung.is_active == True).first()
+    user = await get_principal(db, email)
 
     if user is None:
         raise AuthenticationError()
@@ -138,24 +283,14 @@ def get_manager_user(current_user: NguoiDung = Depends(get_current_active_user))
     return current_user
 
 
-# Login function
-def login_user(db: Session, email: str, password: str) -> dict:
-    """Login user and return tokens"""
-    user = authenticate_user(db, email, password)
-    if not user:
-        raise AuthenticationError("Incorrect email or password")
-
-    # Create tokens
+def _build_login_response(user: NguoiDung) -> dict:
+    """Create access/refresh tokens and the login payload for a user"""
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email, "role": user.vai_tro.value}, expires_delta=access_token_expires
     )
     refresh_token = create_refresh_token(data={"sub": user.email, "role": user.vai_tro.value})
 
-    # Update last login
-    user.lan_dang_nhap_cuoi = datetime.utcnow()
-    db.commit()
-
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -171,3 +306,51 @@ def login_user(db: Session, email: str, password: str) -> dict:
             "lan_dang_nhap_cuoi": user.lan_dang_nhap_cuoi,
         },
     }
+
+
+# Login function
+def login_user(db: Session, email: str, password: str) -> dict:
+    """Login user and return tokens"""
+    user = authenticate_user(db, email, password)
+    if not user:
+        raise AuthenticationError("Incorrect email or password")
+
+    # Update last login
+    user.lan_dang_nhap_cuoi = datetime.utcnow()
+    db.commit()
+
+    return _build_login_response(user)
+
+
+async def login_user_async(db: AsyncSession, email: str, password: str) -> dict:
+    """Login user and return tokens (async session)"""
+    user = await authenticate_user_async(db, email, password)
+    if not user:
+        raise AuthenticationError("Incorrect email or password")
+
+    # Update last login
+    user.lan_dang_nhap_cuoi = datetime.utcnow()
+    await db.commit()
+
+    return _build_login_response(user)
+
+
+async def refresh_access_token(refresh_token: str, db: AsyncSession) -> dict:
+    """Issue a new access token from a valid refresh token"""
+    payload = verify_token(refresh_token)
+    if payload.get("type") != "refresh":
+        raise AuthenticationError("Invalid token type")
+
+    user = await get_active_user_by_email(db, payload.get("sub"))
+    if user is None:
+        raise AuthenticationError()
+
+    access_token = create_access_token(
+        data={"sub": user.email, "role": user.vai_tro.value},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
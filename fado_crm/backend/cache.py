@@ -1 +1,588 @@
-# Simple Redis Cache Wrapper for FADO CRM # Uses Redis if REDIS_URL is provided, otherwise falls back to in-memory cache import os import json import time from typing import Any, Optional, Dict try: import redis except Exception: redis = None class NullCache: def __init__(self): self._store: Dict[str, Any] = {} self._ttl: Dict[str, float] = {} def get(self, key: str) -> Optional[str]: now = time.time() if key in self._ttl and self._ttl[key] < now: self._store.pop(key, None) self._ttl.pop(key, None) return None return self._store.get(key) def set(self, key: str, value: str, ex: Optional[int] = None): self._store[key] = value if ex: self._ttl[key] = time.time() + ex def delete(self, key: str): self._store.pop(key, None) self._ttl.pop(key, None) def flush(self): self._store.clear() self._ttl.clear() def health(self) -> Dict[str, Any]: return {"backend": "memory", "entries": len(self._store)} def incr(self, key: str, ex: Optional[int] = None) -> int: current = self.get(key) try: val = int(current) if current is not None else 0 except ValueError: val = 0 val += 1 self.set(key, str(val), ex=ex) return val class RedisCache: def __init__(self, url: str): self._client = redis.Redis.from_url(url, decode_responses=True) def get(self, key: str) -> Optional[str]: return self._client.get(key) def set(self, key: str, value: str, ex: Optional[int] = None): self._client.set(name=key, value=value, ex=ex) def delete(self, key: str): self._client.delete(key) def flush(self): self._client.flushdb() def incr(self, key: str, ex: Optional[int] = None) -> int: val = int(self._client.incr(key)) if ex: self._client.expire(key, ex) return val def health(self) -> Dict[str, Any]: try: pong = self._client.ping() info = self._client.info() return { "backend": "redis", "pong": pong, "used_memory_human": info.get("used_memory_human"), "connected_clients": info.get("connected_clients"), "dbsize": self._client.dbsize(), } except Exception as e: return {"backend": "redis", "status": "error", "error": str(e)} # Factory REDIS_URL = os.getenv("REDIS_URL") if redis and REDIS_URL: cache = RedisCache(REDIS_URL) else: cache = NullCache()
+# Simple Redis Cache Wrapper for FADO CRM
+# Two-tier cache: L1 = LRU trong process (gioi han so entry + TTL), L2 = Redis (neu co REDIS_URL).
+# Ghi/xoa o 1 worker duoc bao cho cac worker khac qua Redis pub/sub de xoa ban sao L1.
+import fnmatch
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import redis
+except Exception:
+    redis = None
+
+try:
+    from cache_metrics import cache_metrics, key_prefix
+except ModuleNotFoundError:
+    from backend.cache_metrics import cache_metrics, key_prefix
+
+logger = logging.getLogger(__name__)
+
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "10000"))
+CACHE_L1_TTL = int(os.getenv("CACHE_L1_TTL", "30"))
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "fado:cache:invalidate")
+# Tag set trong Redis song it nhat bang entry lau nhat (member het han thi vo hai)
+CACHE_TAG_TTL = int(os.getenv("CACHE_TAG_TTL", "86400"))
+TAG_KEY_PREFIX = "cache_tag:"
+# Version cua tag, tang moi lan invalidate: fill bat dau truoc do khong duoc ghi de du lieu cu
+TAG_VERSION_PREFIX = "cache_tag_version:"
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# SET + SADD tag chi khi version cac tag van bang moc lay truoc khi doc DB (check-and-set nguyen tu)
+# KEYS: key, <n version key>, <tag set key...>; ARGV: value, ex (0 = khong TTL), tag ttl, n, <n version>
+_SET_IF_FRESH_SCRIPT = """
+local n = tonumber(ARGV[4])
+for i = 1, n do
+    if tonumber(redis.call('get', KEYS[1 + i]) or '0') ~= tonumber(ARGV[4 + i]) then
+        return 0
+    end
+end
+if tonumber(ARGV[2]) > 0 then
+    redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+else
+    redis.call('set', KEYS[1], ARGV[1])
+end
+for i = 2 + n, #KEYS do
+    redis.call('sadd', KEYS[i], KEYS[1])
+    redis.call('expire', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+
+class LRUCache:
+    """Cache trong process: LRU gioi han so entry, moi entry co TTL (het han thi bi bo)"""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_L1_MAX_ENTRIES,
+        default_ttl: Optional[int] = None,
+        track: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        # track=True: ghi hit/miss theo prefix (cache dung truc tiep, khong phai L1 ben trong)
+        self.track = track
+        self._store: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        # tag -> cac key dang gan tag, key -> tag cua no (de don khi key bi xoa)
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        # Epoch tang moi lan invalidate; tag -> epoch lan invalidate cuoi (gioi han so tag,
+        # tag bi bo ra thi coi nhu invalidate o _epoch_floor -> chi tu choi fill thua, khong sai)
+        self._epoch = 0
+        self._epoch_floor = 0
+        self._tag_epochs: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # So lan set tu lan quet het han gan nhat (quet toan bo chi 1 lan moi max_entries set)
+        self._sets_since_sweep = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None and entry[1] is not None and entry[1] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                if self.track:
+                    cache_metrics.record_miss(key_prefix(key))
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            if self.track:
+                cache_metrics.record_hit(key_prefix(key))
+            return entry[0]
+
+    def tag_stamp(self, tags: Optional[Iterable[str]] = None) -> int:
+        """Moc lay truoc khi doc DB de fill; set(..., stamp=) bo qua neu tag da bi invalidate sau do"""
+        with self._lock:
+            return self._epoch
+
+    def _invalidated_since(self, tags: Iterable[str], stamp: int) -> bool:
+        tags = list(tags)
+        if not tags:
+            # Entry khong tag (ban sao L1 cua L2): invalidation bat ky sau moc deu co the lien quan
+            return self._epoch > stamp
+        return any(self._tag_epochs.get(tag, self._epoch_floor) > stamp for tag in tags)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        stamp: Optional[int] = None,
+    ) -> bool:
+        ttl = ex or self.default_ttl
+        expires_at = time.time() + ttl if ttl else None
+        tags = list(tags or ())
+        with self._lock:
+            if stamp is not None and self._invalidated_since(tags, stamp):
+                return False
+            self._store[key] = (value, expires_at)
+            self._store.move_to_end(key)
+            self._sets_since_sweep += 1
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+                self._key_tags.setdefault(key, set()).add(tag)
+            if len(self._store) > self.max_entries:
+                self._evict()
+            return True
+
+    def _remove(self, key: str):
+        self._store.pop(key, None)
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def _evict(self):
+        # Quet het han O(n) chi sau moi max_entries lan set (khau hao O(1)/set); con lai bo
+        # entry it dung nhat o dau LRU, entry het han thi bo luon khong tinh la eviction
+        now = time.time()
+        if self._sets_since_sweep >= self.max_entries:
+            self._sets_since_sweep = 0
+            expired = [k for k, (_, exp) in self._store.items() if exp is not None and exp < now]
+            for key in expired:
+                self._remove(key)
+        while len(self._store) > self.max_entries:
+            key, (_, expires_at) = next(iter(self._store.items()))
+            self._remove(key)
+            if expires_at is None or expires_at >= now:
+                self.evictions += 1
+                cache_metrics.record_eviction(key_prefix(key))
+
+    def ttl(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None or entry[1] is None:
+                return None
+            return max(entry[1] - time.time(), 0.0)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def delete_many(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def delete_pattern(self, pattern: str) -> int:
+        with self._lock:
+            keys = [k for k in self._store if fnmatch.fnmatchcase(k, pattern)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> Set[str]:
+        """Xoa moi key gan 1 trong cac tag - O(so key duoc gan tag)"""
+        with self._lock:
+            self._epoch += 1
+            keys: Set[str] = set()
+            for tag in tags:
+                self._tag_epochs[tag] = self._epoch
+                self._tag_epochs.move_to_end(tag)
+                keys |= self._tag_keys.get(tag, set())
+            while len(self._tag_epochs) > max(self.max_entries, 1024):
+                _, epoch = self._tag_epochs.popitem(last=False)
+                self._epoch_floor = max(self._epoch_floor, epoch)
+            for key in keys:
+                self._remove(key)
+            return keys
+
+    def flush(self):
+        with self._lock:
+            self._store.clear()
+            self._tag_keys.clear()
+            self._key_tags.clear()
+            # Fill dang chay truoc flush khong duoc ghi lai
+            self._epoch += 1
+            self._epoch_floor = self._epoch
+
+    def add(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        """Chi ghi neu key chua ton tai (SET NX) - dung lam lease"""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                return False
+            self.set(key, value, ex=ex)
+            return True
+
+    def release(self, key: str, value: Any) -> bool:
+        """Xoa key neu van giu gia tri cua minh (khong xoa lease cua nguoi khac)"""
+        with self._lock:
+            if key in self._store and self._store[key][0] == value:
+                self._remove(key)
+                return True
+            return False
+
+    def incr(self, key: str, ex: Optional[int] = None) -> int:
+        with self._lock:
+            current = self.get(key)
+            try:
+                val = int(current) if current is not None else 0
+            except ValueError:
+                val = 0
+            val += 1
+            self.set(key, str(val), ex=ex)
+            return val
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "max_entries": self.max_entries,
+            "tags": len(self._tag_keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total * 100, 2) if total else 0.0,
+        }
+
+    def health(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self.stats()}
+
+
+# Ten cu: backend in-memory khi khong co Redis (truoc day la dict khong gioi han)
+NullCache = LRUCache
+
+
+class RedisCache:
+    def __init__(self, url: Optional[str] = None, client=None):
+        self._client = client or redis.Redis.from_url(url, decode_responses=True)
+
+    @property
+    def client(self):
+        return self._client
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[int]]:
+        """Lay gia tri va TTL con lai trong 1 round trip"""
+        pipe = self._client.pipeline()
+        pipe.get(key)
+        pipe.ttl(key)
+        value, ttl = pipe.execute()
+        return value, (ttl if ttl and ttl > 0 else None)
+
+    def tag_stamp(self, tags: Optional[Iterable[str]] = None) -> Tuple[Tuple[str, int], ...]:
+        """Version hien tai cua cac tag (1 MGET), truyen lai cho set(..., stamp=)"""
+        tags = sorted(set(tags or ()))
+        if not tags:
+            return ()
+        versions = self._client.mget([f"{TAG_VERSION_PREFIX}{tag}" for tag in tags])
+        return tuple((tag, int(version or 0)) for tag, version in zip(tags, versions))
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        ex: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        stamp: Optional[Tuple[Tuple[str, int], ...]] = None,
+    ) -> bool:
+        tags = list(tags or ())
+        if stamp is not None:
+            keys = [key, *(f"{TAG_VERSION_PREFIX}{tag}" for tag, _ in stamp)]
+            keys += [f"{TAG_KEY_PREFIX}{tag}" for tag in tags]
+            args = [value, int(ex or 0), max(CACHE_TAG_TTL, ex or 0), len(stamp)]
+            args += [version for _, version in stamp]
+            return bool(self._client.eval(_SET_IF_FRESH_SCRIPT, len(keys), *keys, *args))
+        if not tags:
+            self._client.set(name=key, value=value, ex=ex)
+            return True
+        pipe = self._client.pipeline()
+        pipe.set(name=key, value=value, ex=ex)
+        for tag in tags:
+            pipe.sadd(f"{TAG_KEY_PREFIX}{tag}", key)
+            pipe.expire(f"{TAG_KEY_PREFIX}{tag}", max(CACHE_TAG_TTL, ex or 0))
+        pipe.execute()
+        return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> Set[str]:
+        """
+        Tang version tag roi xoa cac key da dang ky tag (SMEMBERS + DEL) thay vi quet KEYS.
+        Chi SREM cac member da doc, key moi gan tag trong luc do van duoc theo doi.
+        """
+        tags = list(tags)
+        if not tags:
+            return set()
+        read = self._client.pipeline(transaction=False)
+        for tag in tags:
+            read.incr(f"{TAG_VERSION_PREFIX}{tag}")
+            read.expire(f"{TAG_VERSION_PREFIX}{tag}", CACHE_TAG_TTL)
+        for tag in tags:
+            read.smembers(f"{TAG_KEY_PREFIX}{tag}")
+        members = read.execute()[2 * len(tags) :]
+
+        keys: Set[str] = set()
+        write = self._client.pipeline()
+        for tag, tag_keys in zip(tags, members):
+            if tag_keys:
+                # Client nhi phan tra ve bytes -> chuan hoa ve str (de publish qua JSON)
+                tag_keys = {k.decode() if isinstance(k, bytes) else k for k in tag_keys}
+                keys |= tag_keys
+                write.srem(f"{TAG_KEY_PREFIX}{tag}", *tag_keys)
+        if keys:
+            write.delete(*keys)
+            write.execute()
+        return keys
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def delete_many(self, keys: Iterable[str]):
+        keys = list(keys)
+        if keys:
+            self._client.delete(*keys)
+
+    def delete_pattern(self, pattern: str) -> int:
+        # SCAN theo lo thay vi KEYS (KEYS chan Redis khi keyspace lon)
+        keys = list(self._client.scan_iter(match=pattern, count=500))
+        self.delete_many(keys)
+        return len(keys)
+
+    def flush(self):
+        self._client.flushdb()
+
+    def add(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        return bool(self._client.set(name=key, value=value, ex=ex, nx=True))
+
+    def release(self, key: str, value: str) -> bool:
+        # So sanh va xoa nguyen tu, lease het han roi bi nguoi khac lay thi khong xoa nham
+        return bool(self._client.eval(_RELEASE_SCRIPT, 1, key, value))
+
+    def incr(self, key: str, ex: Optional[int] = None) -> int:
+        val = int(self._client.incr(key))
+        if ex:
+            self._client.expire(key, ex)
+        return val
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            pong = self._client.ping()
+            info = self._client.info()
+            return {
+                "backend": "redis",
+                "pong": pong,
+                "used_memory_human": info.get("used_memory_human"),
+                "connected_clients": info.get("connected_clients"),
+                "dbsize": self._client.dbsize(),
+            }
+        except Exception as e:
+            return {"backend": "redis", "status": "error", "error": str(e)}
+
+
+class TwoTierCache:
+    """L1 (LRU trong process) truoc L2 (Redis); ghi/xoa thi bao worker khac xoa L1"""
+
+    def __init__(
+        self,
+        l2: RedisCache,
+        l1: Optional[LRUCache] = None,
+        l1_ttl: int = CACHE_L1_TTL,
+        channel: str = CACHE_INVALIDATION_CHANNEL,
+        listen: bool = True,
+        track: bool = False,
+    ):
+        self.l1 = l1 or LRUCache()
+        self.l2 = l2
+        self.track = track
+        self.l1_ttl = l1_ttl
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[threading.Thread] = None
+        if listen:
+            self.start_invalidation_listener()
+
+    def _l1_ttl(self, ex: Optional[float]) -> int:
+        # L1 khong giu lau hon L2 va khong qua l1_ttl (gioi han do cu khi mat tin invalidation)
+        if ex is None:
+            return self.l1_ttl
+        return max(1, min(int(ex), self.l1_ttl))
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is None:
+            # Invalidation den trong luc doc L2 -> khong chep gia tri co the da cu vao L1
+            stamp = self.l1.tag_stamp()
+            value, ttl = self.l2.get_with_ttl(key)
+            if value is not None:
+                self.l1.set(key, value, ex=self._l1_ttl(ttl), stamp=stamp)
+        if self.track:
+            if value is None:
+                cache_metrics.record_miss(key_prefix(key))
+            else:
+                cache_metrics.record_hit(key_prefix(key))
+        return value
+
+    def tag_stamp(self, tags: Optional[Iterable[str]] = None) -> Tuple[int, Any]:
+        tags = list(tags or ())
+        return self.l1.tag_stamp(tags), self.l2.tag_stamp(tags)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        stamp: Optional[Tuple[int, Any]] = None,
+    ) -> bool:
+        tags = list(tags or ())
+        l1_stamp, l2_stamp = stamp if stamp is not None else (None, None)
+        if self.track and isinstance(value, (str, bytes)):
+            cache_metrics.record_payload(key_prefix(key), len(value))
+        if not self.l2.set(key, value, ex=ex, tags=tags, stamp=l2_stamp):
+            return False
+        self.l1.set(key, value, ex=self._l1_ttl(ex), tags=tags, stamp=l1_stamp)
+        self._publish({"keys": [key]})
+        return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> Set[str]:
+        tags = list(tags)
+        if not tags:
+            return set()
+        keys = self.l2.invalidate_tags(tags) | self.l1.invalidate_tags(tags)
+        self._publish({"tags": tags, "keys": sorted(keys)})
+        return keys
+
+    def invalidate_local_tags(self, tags: Iterable[str]) -> Set[str]:
+        """Chi L1 (khong I/O) - phan chay ngay tren event loop, L2 de invalidate_tags tren thread"""
+        return self.l1.invalidate_tags(tags)
+
+    def delete(self, key: str):
+        self.delete_many([key])
+
+    def delete_many(self, keys: Iterable[str]):
+        keys = list(keys)
+        if not keys:
+            return
+        self.l2.delete_many(keys)
+        self.l1.delete_many(keys)
+        self._publish({"keys": keys})
+
+    def delete_pattern(self, pattern: str) -> int:
+        removed = self.l2.delete_pattern(pattern)
+        self.l1.delete_pattern(pattern)
+        self._publish({"pattern": pattern})
+        return removed
+
+    def flush(self):
+        self.l2.flush()
+        self.l1.flush()
+        self._publish({"flush": True})
+
+    def add(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        # Lease phai dung chung giua cac worker -> chi o L2
+        return self.l2.add(key, value, ex=ex)
+
+    def release(self, key: str, value: Any) -> bool:
+        return self.l2.release(key, value)
+
+    def incr(self, key: str, ex: Optional[int] = None) -> int:
+        # Bo dem phai dung chung giua cac worker -> chi o L2, worker khac bo ban sao L1 cu
+        self.l1.delete(key)
+        value = self.l2.incr(key, ex=ex)
+        self._publish({"keys": [key]})
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "l1": self.l1.stats(),
+            "listener_alive": bool(self._listener and self._listener.is_alive()),
+        }
+
+    def health(self) -> Dict[str, Any]:
+        return {**self.l2.health(), "backend": "redis+memory", "l1": self.l1.stats()}
+
+    # Cross-worker invalidation
+    def _publish(self, message: Dict[str, Any]):
+        try:
+            payload = json.dumps({"origin": self.instance_id, **message})
+            self.l2.client.publish(self.channel, payload)
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+
+    def handle_invalidation(self, payload: str):
+        """Xu ly 1 tin invalidation tu worker khac (bo qua tin do chinh minh gui)"""
+        try:
+            message = json.loads(payload)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.instance_id:
+            return
+        if message.get("flush"):
+            self.l1.flush()
+        if message.get("pattern"):
+            self.l1.delete_pattern(message["pattern"])
+        if message.get("tags"):
+            self.l1.invalidate_tags(message["tags"])
+        if message.get("keys"):
+            self.l1.delete_many(message["keys"])
+
+    def start_invalidation_listener(self):
+        if self._listener and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(
+            target=self._listen, name="cache-invalidation", daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self.l2.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_invalidation(message.get("data"))
+            except Exception as e:
+                # Mat ket noi: L1 co the cu -> xoa het roi thu ket noi lai
+                logger.warning(f"Cache invalidation listener error: {e}; retrying in {backoff}s")
+                self.l1.flush()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+def build_cache(url: Optional[str] = None, client=None, listen: bool = True, track: bool = False):
+    """
+    Tao cache 2 tang neu co Redis, nguoc lai chi dung LRU trong process.
+    track=True ghi hit/miss/payload theo prefix key vao cache_metrics.
+    """
+    if client is None and (redis is None or not url):
+        return LRUCache(track=track)
+    return TwoTierCache(RedisCache(url=url, client=client), listen=listen, track=track)
+
+
+# Factory
+REDIS_URL = os.getenv("REDIS_URL")
+cache = build_cache(REDIS_URL, track=True)
+
+__all__ = [
+    "LRUCache",
+    "NullCache",
+    "RedisCache",
+    "TwoTierCache",
+    "build_cache",
+    "cache",
+]
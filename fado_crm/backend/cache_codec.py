@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Cache payload codec
+Ma hoa gia tri cache thanh bytes gon (msgpack > orjson > json), nen zstd/lz4/zlib khi payload
+lon hon nguong. datetime/date/Decimal/Enum/UUID duoc giu nguyen kieu khi doc lai
+(json.dumps(default=str) cu bien chung thanh chuoi).
+"""
+
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import date, datetime
+from datetime import time as dt_time
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except Exception:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_CODEC = os.getenv("CACHE_CODEC", "auto")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto")
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+TYPE_KEY = "__fado__"
+
+# Header 2 byte: [serializer][compression | co tag can revive]. Doi CACHE_CODEC khong lam hong
+# entry cu vi moi payload tu mo ta cach giai ma.
+_SERIALIZER_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+_COMPRESSION_IDS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+_REVIVE_FLAG = 0x80
+_SERIALIZER_NAMES = {v: k for k, v in _SERIALIZER_IDS.items()}
+_COMPRESSION_NAMES = {v: k for k, v in _COMPRESSION_IDS.items()}
+
+
+# Kieu JSON thuan - khong can duyet/doi khi ma hoa
+_PLAIN_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+# Giu kieu du lieu qua vong ma hoa
+@lru_cache(maxsize=256)
+def _enum_path(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+@lru_cache(maxsize=256)
+def _enum_class(path: str) -> type:
+    module, _, qualname = path.partition(":")
+    target: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    if not (isinstance(target, type) and issubclass(target, Enum)):
+        raise ValueError(f"{path} is not an Enum")
+    return target
+
+
+def _tagged(obj: Any) -> Optional[Dict[str, Any]]:
+    """Kieu khong co san trong JSON/msgpack -> dict co danh dau, None neu khong can"""
+    if isinstance(obj, datetime):
+        return {TYPE_KEY: "dt", "v": obj.isoformat()}
+    if isinstance(obj, date):
+        return {TYPE_KEY: "d", "v": obj.isoformat()}
+    if isinstance(obj, dt_time):
+        return {TYPE_KEY: "t", "v": obj.isoformat()}
+    if isinstance(obj, Decimal):
+        return {TYPE_KEY: "dec", "v": str(obj)}
+    if isinstance(obj, Enum):
+        return {TYPE_KEY: "enum", "c": _enum_path(type(obj)), "v": obj.value}
+    if isinstance(obj, uuid.UUID):
+        return {TYPE_KEY: "uuid", "v": str(obj)}
+    return None
+
+
+_REVIVERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "dt": lambda d: datetime.fromisoformat(d["v"]),
+    "d": lambda d: date.fromisoformat(d["v"]),
+    "t": lambda d: dt_time.fromisoformat(d["v"]),
+    "dec": lambda d: Decimal(d["v"]),
+    "enum": lambda d: _enum_class(d["c"])(d["v"]),
+    "uuid": lambda d: uuid.UUID(d["v"]),
+}
+
+
+def _default(obj: Any) -> Any:
+    tagged = _tagged(obj)
+    if tagged is not None:
+        return tagged
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Giong hanh vi cu default=str cho kieu la
+    return str(obj)
+
+
+def _object_hook(obj: Dict[str, Any]) -> Any:
+    kind = obj.get(TYPE_KEY)
+    if kind is None or len(obj) > 3:
+        return obj
+    return _REVIVERS[kind](obj)
+
+
+def _tag_tree(obj: Any, found: list) -> Any:
+    """orjson tu ma hoa datetime/Enum theo kieu rieng -> doi truoc sang dict co danh dau"""
+    kind = type(obj)
+    if kind is dict:
+        return {k: v if type(v) in _PLAIN_TYPES else _tag_tree(v, found) for k, v in obj.items()}
+    if kind is list or kind is tuple:
+        return [v if type(v) in _PLAIN_TYPES else _tag_tree(v, found) for v in obj]
+    tagged = _tagged(obj)
+    if tagged is not None:
+        found.append(True)
+        return tagged
+    return obj
+
+
+def _revive_tree(obj: Any) -> Any:
+    kind = type(obj)
+    if kind is dict:
+        if TYPE_KEY in obj and len(obj) <= 3:
+            return _object_hook(obj)
+        return {k: v if type(v) in _PLAIN_TYPES else _revive_tree(v) for k, v in obj.items()}
+    if kind is list:
+        return [v if type(v) in _PLAIN_TYPES else _revive_tree(v) for v in obj]
+    return obj
+
+
+# Serializer: (dumps, loads) -> tra ve (bytes, co tag hay khong)
+def _json_dumps(obj: Any) -> Tuple[bytes, bool]:
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode(), False
+
+
+def _json_loads(data: bytes, revive: bool) -> Any:
+    return json.loads(data, object_hook=_object_hook)
+
+
+def _orjson_dumps(obj: Any) -> Tuple[bytes, bool]:
+    found: list = []
+    return orjson.dumps(_tag_tree(obj, found), default=_default), bool(found)
+
+
+def _orjson_loads(data: bytes, revive: bool) -> Any:
+    value = orjson.loads(data)
+    return _revive_tree(value) if revive else value
+
+
+def _msgpack_dumps(obj: Any) -> Tuple[bytes, bool]:
+    return msgpack.packb(obj, default=_default, use_bin_type=True), False
+
+
+def _msgpack_loads(data: bytes, revive: bool) -> Any:
+    return msgpack.unpackb(data, object_hook=_object_hook, raw=False, strict_map_key=False)
+
+
+_SERIALIZERS = {
+    "json": (_json_dumps, _json_loads),
+    "orjson": (_orjson_dumps, _orjson_loads),
+    "msgpack": (_msgpack_dumps, _msgpack_loads),
+}
+
+_COMPRESSORS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda b: zlib.compress(b, 1), zlib.decompress),
+}
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = (
+        lambda b: zstandard.ZstdCompressor(level=3).compress(b),
+        lambda b: zstandard.ZstdDecompressor().decompress(b),
+    )
+if lz4_frame is not None:
+    _COMPRESSORS["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+
+
+def _available_serializer(name: str) -> str:
+    if name == "auto":
+        return "msgpack" if msgpack else "orjson" if orjson else "json"
+    if name == "msgpack" and msgpack is None or name == "orjson" and orjson is None:
+        logger.warning(f"Cache codec {name} not installed, falling back to json")
+        return "json"
+    return name
+
+
+def _available_compression(name: str) -> str:
+    if name == "auto":
+        return next((c for c in ("zstd", "lz4") if c in _COMPRESSORS), "zlib")
+    if name != "none" and name not in _COMPRESSORS:
+        logger.warning(f"Cache compression {name} not installed, falling back to zlib")
+        return "zlib"
+    return name
+
+
+class CodecStats:
+    """Kich thuoc va thoi gian ma hoa/giai ma theo tung codec (vd 'orjson+zstd')"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, codec: str, op: str, seconds: float, raw: int = 0, stored: int = 0):
+        with self._lock:
+            row = self._data.setdefault(
+                codec,
+                {
+                    "encodes": 0,
+                    "decodes": 0,
+                    "encode_seconds": 0.0,
+                    "decode_seconds": 0.0,
+                    "raw_bytes": 0,
+                    "stored_bytes": 0,
+                },
+            )
+            row[f"{op}s"] += 1
+            row[f"{op}_seconds"] += seconds
+            row["raw_bytes"] += raw
+            row["stored_bytes"] += stored
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for codec, row in self._data.items():
+                result[codec] = {
+                    "encodes": row["encodes"],
+                    "decodes": row["decodes"],
+                    "avg_raw_bytes": round(row["raw_bytes"] / row["encodes"])
+                    if row["encodes"]
+                    else 0,
+                    "avg_stored_bytes": (
+                        round(row["stored_bytes"] / row["encodes"]) if row["encodes"] else 0
+                    ),
+                    "compression_ratio": (
+                        round(row["raw_bytes"] / row["stored_bytes"], 2)
+                        if row["stored_bytes"]
+                        else None
+                    ),
+                    "avg_encode_ms": (
+                        round(row["encode_seconds"] / row["encodes"] * 1000, 3)
+                        if row["encodes"]
+                        else 0.0
+                    ),
+                    "avg_decode_ms": (
+                        round(row["decode_seconds"] / row["decodes"] * 1000, 3)
+                        if row["decodes"]
+                        else 0.0
+                    ),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CacheCodec:
+    """dumps(): gia tri -> bytes (header + payload, nen neu lon); loads(): nguoc lai"""
+
+    def __init__(
+        self,
+        serializer: str = CACHE_CODEC,
+        compression: str = CACHE_COMPRESSION,
+        compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES,
+        stats: Optional[CodecStats] = None,
+    ):
+        self.serializer = _available_serializer(serializer)
+        self.compression = _available_compression(compression)
+        self.compress_min_bytes = compress_min_bytes
+        self.stats = stats or CodecStats()
+
+    @property
+    def name(self) -> str:
+        return (
+            self.serializer
+            if self.compression == "none"
+            else f"{self.serializer}+{self.compression}"
+        )
+
+    def dumps(self, value: Any) -> bytes:
+        start = time.perf_counter()
+        payload, revive = _SERIALIZERS[self.serializer][0](value)
+        raw_size = len(payload)
+        compression = "none"
+        if self.compression != "none" and raw_size >= self.compress_min_bytes:
+            compressed = _COMPRESSORS[self.compression][0](payload)
+            # Du lieu kho nen (vd da nen san) thi giu nguyen
+            if len(compressed) < raw_size:
+                payload, compression = compressed, self.compression
+        flags = _COMPRESSION_IDS[compression] | (_REVIVE_FLAG if revive else 0)
+        data = bytes((_SERIALIZER_IDS[self.serializer], flags)) + payload
+        codec = self.serializer if compression == "none" else f"{self.serializer}+{compression}"
+        self.stats.record(codec, "encode", time.perf_counter() - start, raw_size, len(data))
+        return data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        start = time.perf_counter()
+        if isinstance(data, str):
+            data = data.encode()
+        if data[:1] in (b"{", b"["):
+            # Entry JSON tu truoc khi co codec
+            self.stats.record("legacy-json", "decode", 0.0)
+            return json.loads(data)
+
+        serializer = _SERIALIZER_NAMES[data[0]]
+        compression = _COMPRESSION_NAMES[data[1] & ~_REVIVE_FLAG]
+        payload = data[2:]
+        if compression != "none":
+            payload = _COMPRESSORS[compression][1](payload)
+        value = _SERIALIZERS[serializer][1](payload, bool(data[1] & _REVIVE_FLAG))
+        codec = serializer if compression == "none" else f"{serializer}+{compression}"
+        self.stats.record(codec, "decode", time.perf_counter() - start)
+        return value
+
+
+__all__ = [
+    "CACHE_CODEC",
+    "CACHE_COMPRESSION",
+    "CACHE_COMPRESS_MIN_BYTES",
+    "CacheCodec",
+    "CodecStats",
+]
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Tag-based cache invalidation
+Entry cache dang ky tag ("table:don_hang", "customer:42"...) khi set, ghi DB qua ORM
+tu thu thap tag bi anh huong va xoa dung cac key do sau khi commit (khong quet KEYS).
+Invalidate con tang version cua tag: fill doc DB truoc commit (cache.tag_stamp) ma ghi sau do
+se bi cache tu choi, khong ghi lai du lieu cu.
+"""
+
+import asyncio
+import logging
+from typing import Any, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+try:
+    from cache import cache as default_cache
+except ModuleNotFoundError:
+    from backend.cache import cache as default_cache
+
+logger = logging.getLogger(__name__)
+
+SESSION_TAGS_KEY = "cache_invalidation_tags"
+
+# Bang -> ten entity dung trong tag "<entity>:<id>"
+ENTITY_TAGS = {
+    "khach_hang": "customer",
+    "san_pham": "product",
+    "don_hang": "order",
+    "nguoi_dung": "user",
+}
+
+# Khoa ngoai -> entity cha cung bi anh huong (vd them chi tiet don -> cache don hang cu)
+RELATED_TAGS = {
+    "don_hang": {"khach_hang_id": "customer"},
+    "chi_tiet_don_hang": {"don_hang_id": "order", "san_pham_id": "product"},
+    "lich_su_lien_he": {"khach_hang_id": "customer"},
+    "payment_transaction": {"don_hang_id": "order"},
+    # Khoa tra cuu (principal cache theo email): doi email thi ca email cu lan moi deu bi xoa
+    "nguoi_dung": {"email": "user_email"},
+}
+
+# Cot ghi thuong xuyen ma cache khong can biet (moi lan login ghi lan_dang_nhap_cuoi):
+# UPDATE chi doi cac cot nay thi khong invalidate gi
+IGNORED_COLUMNS = {
+    "nguoi_dung": {"lan_dang_nhap_cuoi"},
+}
+
+# Cac cache co invalidate_tags(); cache chung cua app dang ky san
+_caches: List[Any] = [default_cache]
+
+
+def table_tag(table: str) -> str:
+    return f"table:{table}"
+
+
+def entity_tag(entity: str, entity_id: Any) -> str:
+    return f"{entity}:{entity_id}"
+
+
+def register_cache(tagged_cache):
+    """Dang ky them 1 cache (vd QueryCache) nhan invalidation theo tag"""
+    if not any(c is tagged_cache for c in _caches):
+        _caches.append(tagged_cache)
+
+
+def invalidate_local_tags(tags: Iterable[str]) -> int:
+    """Chi phan trong process (L1, version memo) - khong I/O, goi duoc tren event loop"""
+    tags = sorted(set(tags))
+    removed = 0
+    for tagged_cache in _caches:
+        local = getattr(tagged_cache, "invalidate_local_tags", tagged_cache.invalidate_tags)
+        try:
+            removed += len(local(tags) or ())
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error: {e}")
+    return removed
+
+
+def invalidate_tags(tags: Iterable[str]) -> int:
+    """Xoa cac key gan tag tren moi cache da dang ky, tra ve tong so key da xoa"""
+    tags = sorted(set(tags))
+    if not tags:
+        return 0
+    removed = 0
+    for tagged_cache in _caches:
+        try:
+            removed += len(tagged_cache.invalidate_tags(tags) or ())
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error: {e}")
+    logger.debug(f"Invalidated {removed} cache entries for tags: {tags}")
+    return removed
+
+
+def _values(state, attr: str) -> Set[Any]:
+    """Gia tri hien tai va truoc do (doi khach hang cua don -> ca 2 khach deu bi anh huong)"""
+    if attr not in state.attrs:
+        return set()
+    history = state.attrs[attr].history
+    values = set(history.added) | set(history.deleted) | set(history.unchanged)
+    if not values:
+        # Khong lazy-load trong flush, chi lay gia tri da nap
+        values.add(state.dict.get(attr))
+    return {v for v in values if v is not None}
+
+
+def tags_for(obj) -> Set[str]:
+    """Tag bi anh huong khi ghi 1 doi tuong ORM"""
+    state = inspect(obj)
+    table = state.mapper.persist_selectable.name
+    tags = {table_tag(table)}
+    entity = ENTITY_TAGS.get(table)
+    if entity and state.identity:
+        tags.add(entity_tag(entity, state.identity[0]))
+    for column, related in RELATED_TAGS.get(table, {}).items():
+        tags.update(entity_tag(related, v) for v in _values(state, column))
+    return tags
+
+
+def _ignored_update(obj) -> bool:
+    """UPDATE chi doi cot trong IGNORED_COLUMNS (object da ton tai, khong phai insert/delete)"""
+    state = inspect(obj)
+    ignored = IGNORED_COLUMNS.get(state.mapper.persist_selectable.name)
+    if not ignored:
+        return False
+    changed = {
+        attr.key
+        for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    }
+    return bool(changed) and changed <= ignored
+
+
+def _pending(session: Session) -> Set[str]:
+    return session.info.setdefault(SESSION_TAGS_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    # new/dirty/deleted van giu trang thai truoc flush, PK cua ban ghi moi da co
+    pending = _pending(session)
+    dirty = [obj for obj in session.dirty if not _ignored_update(obj)]
+    for obj in list(session.new) + dirty + list(session.deleted):
+        pending.update(tags_for(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    # Bulk insert/update/delete khong qua flush -> chi biet duoc bang bi anh huong;
+    # bang co entity them tag "<entity>:*" cho cache theo tung entity (vd principal)
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    table: Optional[Any] = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name:
+        pending = _pending(orm_execute_state.session)
+        pending.add(table_tag(name))
+        if name in ENTITY_TAGS:
+            pending.add(entity_tag(ENTITY_TAGS[name], "*"))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    # Chi xoa sau commit: request khac khong the nap lai du lieu cu vao cache
+    tags = session.info.pop(SESSION_TAGS_KEY, None)
+    if not tags:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        invalidate_tags(tags)
+        return
+    # AsyncSession: hook chay tren event loop -> L1 trong process xoa ngay, round trip Redis
+    # (version + SMEMBERS/DEL + publish) chay tren thread; fill cu da bi chan boi version tag
+    invalidate_local_tags(tags)
+    loop.run_in_executor(None, invalidate_tags, tags)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_rollback(session, transaction):
+    # Rollback transaction ngoai cung -> bo tag da thu thap (savepoint thi giu lai)
+    if transaction.parent is None:
+        session.info.pop(SESSION_TAGS_KEY, None)
+
+
+__all__ = [
+    "ENTITY_TAGS",
+    "IGNORED_COLUMNS",
+    "RELATED_TAGS",
+    "entity_tag",
+    "invalidate_local_tags",
+    "invalidate_tags",
+    "register_cache",
+    "table_tag",
+    "tags_for",
+]
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Per-prefix cache metrics
+Hit/miss, thoi gian tinh lai (fill), kich thuoc payload va so entry bi day ra theo tung
+prefix key (vd ten ham cached_query) - thay cho keyspace_hits cua Redis INFO (chung ca server).
+"""
+
+import threading
+from typing import Any, Dict, List
+
+QUERY_CACHE_PREFIX = "query_cache:"
+MAX_PREFIXES = 200
+OTHER_PREFIX = "other"
+
+_COUNTERS = (
+    "hits",
+    "misses",
+    "stale_hits",
+    "fills",
+    "fill_seconds",
+    "fill_seconds_max",
+    "payload_bytes",
+    "payload_writes",
+    "evictions",
+)
+
+
+def key_prefix(key: Any) -> str:
+    """'query_cache:<prefix>:<hash>' -> '<prefix>', 'settings:public' -> 'settings'"""
+    if isinstance(key, bytes):
+        key = key.decode(errors="replace")
+    key = str(key)
+    if key.startswith(QUERY_CACHE_PREFIX):
+        key = key[len(QUERY_CACHE_PREFIX) :]
+    return key.partition(":")[0]
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CacheMetrics:
+    """Bo dem theo prefix, thread-safe; so prefix bi gioi han de khong no cardinality"""
+
+    def __init__(self, max_prefixes: int = MAX_PREFIXES):
+        self.max_prefixes = max_prefixes
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def _row(self, prefix: str) -> Dict[str, float]:
+        row = self._data.get(prefix)
+        if row is None:
+            if len(self._data) >= self.max_prefixes:
+                prefix = OTHER_PREFIX
+            row = self._data.setdefault(prefix, dict.fromkeys(_COUNTERS, 0))
+        return row
+
+    def record_hit(self, prefix: str, stale: bool = False):
+        with self._lock:
+            row = self._row(prefix)
+            row["hits"] += 1
+            if stale:
+                row["stale_hits"] += 1
+
+    def record_miss(self, prefix: str):
+        with self._lock:
+            self._row(prefix)["misses"] += 1
+
+    def record_fill(self, prefix: str, seconds: float):
+        with self._lock:
+            row = self._row(prefix)
+            row["fills"] += 1
+            row["fill_seconds"] += seconds
+            row["fill_seconds_max"] = max(row["fill_seconds_max"], seconds)
+
+    def record_payload(self, prefix: str, size: int):
+        with self._lock:
+            row = self._row(prefix)
+            row["payload_writes"] += 1
+            row["payload_bytes"] += size
+
+    def record_eviction(self, prefix: str, count: int = 1):
+        with self._lock:
+            self._row(prefix)["evictions"] += count
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = {prefix: dict(row) for prefix, row in self._data.items()}
+        result = {}
+        for prefix, row in sorted(rows.items()):
+            lookups = row["hits"] + row["misses"]
+            result[prefix] = {
+                "hits": row["hits"],
+                "misses": row["misses"],
+                "stale_hits": row["stale_hits"],
+                "hit_ratio": round(row["hits"] / lookups * 100, 2) if lookups else 0.0,
+                "fills": row["fills"],
+                "avg_fill_ms": (
+                    round(row["fill_seconds"] / row["fills"] * 1000, 2) if row["fills"] else 0.0
+                ),
+                "max_fill_ms": round(row["fill_seconds_max"] * 1000, 2),
+                "avg_payload_bytes": (
+                    round(row["payload_bytes"] / row["payload_writes"])
+                    if row["payload_writes"]
+                    else 0
+                ),
+                "evictions": row["evictions"],
+            }
+        return result
+
+    def prometheus(self) -> str:
+        """Text exposition format (khong can prometheus_client)"""
+        with self._lock:
+            rows = {prefix: dict(row) for prefix, row in self._data.items()}
+        metrics = [
+            ("fado_cache_hits_total", "counter", "Cache hits by key prefix", "hits"),
+            ("fado_cache_misses_total", "counter", "Cache misses by key prefix", "misses"),
+            (
+                "fado_cache_stale_hits_total",
+                "counter",
+                "Stale values served while revalidating",
+                "stale_hits",
+            ),
+            ("fado_cache_evictions_total", "counter", "Entries evicted from L1", "evictions"),
+        ]
+        lines: List[str] = []
+        for name, kind, help_text, field in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [
+                f'{name}{{prefix="{_label(p)}"}} {row[field]}' for p, row in sorted(rows.items())
+            ]
+        summaries = [
+            ("fado_cache_fill_seconds", "Time to recompute a cache entry", "fill_seconds", "fills"),
+            (
+                "fado_cache_payload_bytes",
+                "Size of cached payloads",
+                "payload_bytes",
+                "payload_writes",
+            ),
+        ]
+        for name, help_text, total, count in summaries:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for p, row in sorted(rows.items()):
+                lines.append(f'{name}_sum{{prefix="{_label(p)}"}} {row[total]}')
+                lines.append(f'{name}_count{{prefix="{_label(p)}"}} {row[count]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Dung chung cho cache.py, QueryCache va cached_query
+cache_metrics = CacheMetrics()
+
+__all__ = ["CacheMetrics", "cache_metrics", "key_prefix"]
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Scheduled cache warm-up
+Tinh truoc cac entry cache nang (analytics dashboard, business insights) luc khoi dong,
+dinh ky (interval +- jitter) va ngay sau khi flush cache, de user dau tien khong phai cho.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARMUP_ENABLED = os.getenv("CACHE_WARMUP_ENABLED", "true").lower() == "true"
+CACHE_WARMUP_INTERVAL = int(os.getenv("CACHE_WARMUP_INTERVAL", "600"))
+CACHE_WARMUP_JITTER = float(os.getenv("CACHE_WARMUP_JITTER", "0.2"))
+# Danh sach job can chay, cach nhau dau phay; rong = tat ca job da dang ky
+CACHE_WARMUP_JOBS = [j.strip() for j in os.getenv("CACHE_WARMUP_JOBS", "").split(",") if j.strip()]
+
+# Ten job -> ham(db) tinh lai entry cache, vd get_analytics_data.refresh(db, date_range=30)
+_jobs: Dict[str, Callable[[Session], Any]] = {}
+
+
+def register_warmup(name: str, job: Callable[[Session], Any]):
+    """Dang ky 1 job warm-up (goi lai cung ten thi ghi de)"""
+    _jobs[name] = job
+
+
+def warmup_jobs(names: Optional[List[str]] = None) -> Dict[str, Callable[[Session], Any]]:
+    """Job se chay: loc theo names (mac dinh CACHE_WARMUP_JOBS), ten la thi bo qua"""
+    names = names or CACHE_WARMUP_JOBS
+    if not names:
+        return dict(_jobs)
+    unknown = [n for n in names if n not in _jobs]
+    if unknown:
+        logger.warning(f"Unknown cache warm-up jobs: {unknown}")
+    return {n: _jobs[n] for n in names if n in _jobs}
+
+
+class CacheWarmer:
+    """
+    Chay job warm-up theo lich; trigger() de chay ngay (vd sau /performance/cache/clear).
+    session_factory la sessionmaker dong bo: job chay tren thread rieng, khong chan event loop
+    (request dang cho lease cua cung key van nhan duoc ket qua khi warm-up tinh xong).
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        jobs: Optional[List[str]] = None,
+        interval: int = CACHE_WARMUP_INTERVAL,
+        jitter: float = CACHE_WARMUP_JITTER,
+    ):
+        self.session_factory = session_factory
+        self.jobs = jobs
+        self.interval = interval
+        self.jitter = jitter
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.next_run_at: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+
+    def next_delay(self) -> float:
+        # Lech ngau nhien de cac worker khong cung tinh lai 1 luc (lease van chan trung lap)
+        return max(1.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def warm_up(self, db: Session) -> Dict[str, Any]:
+        """Chay tung job tren session db, tra ve bao cao thoi gian"""
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        results = {}
+        for name, job in warmup_jobs(self.jobs).items():
+            job_start = time.perf_counter()
+            result = {"ok": True, "refreshed": False, "error": None}
+            try:
+                # refresh() tra False khi worker khac dang tinh key nay
+                result["refreshed"] = job(db) is not False
+            except Exception as e:
+                db.rollback()
+                result.update(ok=False, error=str(e))
+                logger.error(f"Cache warm-up job {name} failed: {e}")
+            result["duration_ms"] = round((time.perf_counter() - job_start) * 1000, 2)
+            results[name] = result
+
+        self.runs += 1
+        self.last_run = {
+            "started_at": started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "jobs": results,
+        }
+        logger.info(
+            f"Cache warm-up finished: {len(results)} jobs in {self.last_run['duration_ms']} ms"
+        )
+        return self.last_run
+
+    def _run_in_session(self) -> Dict[str, Any]:
+        with self.session_factory() as db:
+            return self.warm_up(db)
+
+    async def run_once(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._run_in_session)
+
+    def trigger(self):
+        self._wakeup.set()
+
+    async def run_forever(self):
+        """Background task: warm-up ngay khi khoi dong, lap lai sau moi next_delay() giay"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Cache warm-up failed: {e}")
+            delay = self.next_delay()
+            self.next_run_at = datetime.utcnow() + timedelta(seconds=delay)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "jobs": list(warmup_jobs(self.jobs)),
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+        }
+
+
+__all__ = [
+    "CACHE_WARMUP_ENABLED",
+    "CACHE_WARMUP_INTERVAL",
+    "CACHE_WARMUP_JITTER",
+    "CACHE_WARMUP_JOBS",
+    "CacheWarmer",
+    "register_warmup",
+    "warmup_jobs",
+]
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Customer RFM
+Bang customer_rfm (1 dong/khach: so don, tong tien, don dau/cuoi, recency, segment) thay cho
+GROUP BY khach_hang_id tren toan bo don_hang cua phan khuc khach hang, top khach va churn.
+Moi lan flush tao/xoa don hoac doi trang_thai/tong_tien/khach/ngay_tao, dong cua cac khach bi anh
+huong duoc tinh lai tu bang goc trong cung transaction. Recency tang theo ngay -> job hang dem
+(age_customer_rfm) cong them so ngay da troi qua va xep lai segment bang vai cau UPDATE.
+Bulk UPDATE/DELETE khong qua session -> chay backfill:
+
+    python customer_rfm.py
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date, datetime
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import (
+    DateTime,
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+try:
+    from analytics_memo import memoized
+    from cache_invalidation import invalidate_tags, table_tag
+    from models import CustomerRFM, DonHang, KhachHang, TrangThaiDonHang
+except ModuleNotFoundError:
+    from backend.analytics_memo import memoized
+    from backend.cache_invalidation import invalidate_tags, table_tag
+    from backend.models import CustomerRFM, DonHang, KhachHang, TrangThaiDonHang
+
+logger = logging.getLogger(__name__)
+
+# Job aging chay moi CUSTOMER_RFM_AGE_INTERVAL giay, chi cap nhat khi da sang ngay moi (UTC)
+CUSTOMER_RFM_AGE_INTERVAL = int(os.getenv("CUSTOMER_RFM_AGE_INTERVAL", "3600"))
+
+# Nguong phan khuc (ngay / so don)
+RFM_NEW_DAYS = 30
+RFM_AT_RISK_DAYS = 60
+RFM_LOST_DAYS = 180
+RFM_LOYAL_ORDERS = 3
+RFM_CHAMPION_ORDERS = 10
+SEGMENTS = ("champion", "loyal", "new", "occasional", "at_risk", "lost")
+
+# Cot cua don hang lam thay doi RFM (sua chi tiet, ghi chu... khong can tinh lai)
+_ORDER_FIELDS = ("khach_hang_id", "trang_thai", "tong_tien", "ngay_tao")
+# IN (...) toi da moi lan tinh lai (bulk tao don cho nhieu khach)
+_ID_CHUNK = 500
+
+_UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+_rfm = CustomerRFM.__table__
+_COLUMNS = [
+    "khach_hang_id",
+    "order_count",
+    "monetary",
+    "first_order_at",
+    "last_order_at",
+    "recency_days",
+    "aged_on",
+    "updated_at",
+]
+
+
+def _segment(recency, order_count):
+    """Segment theo recency/so don - dung chung cho tinh lai tung khach va aging hang dem"""
+    return case(
+        (recency > RFM_LOST_DAYS, "lost"),
+        (recency > RFM_AT_RISK_DAYS, "at_risk"),
+        (order_count >= RFM_CHAMPION_ORDERS, "champion"),
+        (order_count >= RFM_LOYAL_ORDERS, "loyal"),
+        (and_(order_count == 1, recency <= RFM_NEW_DAYS), "new"),
+        else_="occasional",
+    )
+
+
+def _aggregates(filters: list, now: datetime):
+    # recency_days = 0 tinh den ngay cua don cuoi; _age cong phan con lai den hom nay
+    return (
+        select(
+            DonHang.khach_hang_id,
+            func.count(DonHang.id),
+            func.coalesce(func.sum(DonHang.tong_tien), 0.0),
+            func.min(DonHang.ngay_tao),
+            func.max(DonHang.ngay_tao),
+            literal(0),
+            func.date(func.max(DonHang.ngay_tao)),
+            literal(now, DateTime),
+        )
+        .where(
+            DonHang.khach_hang_id.isnot(None),
+            DonHang.ngay_tao.isnot(None),
+            DonHang.trang_thai != TrangThaiDonHang.HUY,
+            *filters,
+        )
+        .group_by(DonHang.khach_hang_id)
+    )
+
+
+def _insert_aggregates(connection, filters: list, now: datetime):
+    connection.execute(_rfm.insert().from_select(_COLUMNS, _aggregates(filters, now)))
+
+
+def _lock_customers(connection, upsert, ids: List[int], today: date):
+    """Giu dong RFM cua cac khach (tao dong rong neu chua co) -> tinh lai cung khach lan luot"""
+    # Chi khach con ton tai (khach bi xoa cung flush khong tao dong)
+    placeholders = select(KhachHang.id, literal(today), literal(0), literal(0.0), literal(0)).where(
+        KhachHang.id.in_(ids)
+    )
+    connection.execute(
+        upsert(_rfm)
+        .from_select(
+            ["khach_hang_id", "aged_on", "order_count", "monetary", "recency_days"], placeholders
+        )
+        .on_conflict_do_nothing(index_elements=["khach_hang_id"])
+    )
+    connection.execute(
+        select(_rfm.c.khach_hang_id)
+        .where(_rfm.c.khach_hang_id.in_(ids))
+        .order_by(_rfm.c.khach_hang_id)
+        .with_for_update()
+    )
+
+
+def _upsert_aggregates(connection, upsert, filters: list, now: datetime):
+    insert = upsert(_rfm).from_select(_COLUMNS, _aggregates(filters, now))
+    values = {column: insert.excluded[column] for column in _COLUMNS[1:]}
+    connection.execute(
+        insert.on_conflict_do_update(
+            index_elements=["khach_hang_id"], set_={**values, "segment": None}
+        )
+    )
+
+
+def _age(connection, today: date, *filters) -> int:
+    """Cong so ngay tu aged_on den today vao recency_days, xep lai segment; tra ve so dong"""
+    days = connection.execute(
+        select(_rfm.c.aged_on).where(_rfm.c.aged_on <= today, *filters).distinct()
+    ).scalars()
+    aged = 0
+    # Moi gia tri aged_on 1 cau UPDATE (hang dem thuong chi co "hom qua")
+    for day in list(days):
+        recency = _rfm.c.recency_days + (today - day).days
+        aged += connection.execute(
+            update(_rfm)
+            .where(_rfm.c.aged_on == day, *filters)
+            .values(
+                recency_days=recency,
+                aged_on=today,
+                segment=_segment(recency, _rfm.c.order_count),
+            )
+        ).rowcount
+    return aged
+
+
+def refresh_customers(connection, customer_ids: Iterable[int]):
+    """Tinh lai dong cua cac khach tu bang goc - idempotent, goi trong transaction ghi"""
+    now = datetime.utcnow()
+    ids = sorted(customer_ids)
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+    for start in range(0, len(ids), _ID_CHUNK):
+        chunk = ids[start : start + _ID_CHUNK]
+        customers = _rfm.c.khach_hang_id.in_(chunk)
+        if upsert is None:
+            connection.execute(delete(_rfm).where(customers))
+            _insert_aggregates(connection, [DonHang.khach_hang_id.in_(chunk)], now)
+        else:
+            # UPSERT sau khi khoa dong: 2 transaction cung khach khong dung khoa chinh, transaction
+            # sau doc lai bang goc khi da thay don cua transaction truoc
+            _lock_customers(connection, upsert, chunk, now.date())
+            _upsert_aggregates(connection, upsert, [DonHang.khach_hang_id.in_(chunk)], now)
+            # Khach khong con don (khong huy) -> xoa dong
+            connection.execute(
+                delete(_rfm).where(
+                    customers, or_(_rfm.c.updated_at.is_(None), _rfm.c.updated_at != now)
+                )
+            )
+        _age(connection, now.date(), customers)
+
+
+def _touched_customers(session: Session) -> Set[int]:
+    ids: Set[Optional[int]] = set()
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, DonHang):
+            ids.add(obj.khach_hang_id)
+    for obj in session.dirty:
+        if not isinstance(obj, DonHang):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in _ORDER_FIELDS):
+            # Chuyen don sang khach khac: tinh lai ca khach cu
+            ids.add(obj.khach_hang_id)
+            ids.update(state.attrs.khach_hang_id.history.deleted)
+    ids.discard(None)
+    return ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    # new/dirty/deleted va attribute history van la trang thai truoc flush o day
+    ids = _touched_customers(session)
+    if ids:
+        refresh_customers(session.connection(), ids)
+
+
+def rebuild_customer_rfm(db: Session) -> int:
+    """Backfill: xoa va tinh lai toan bo customer_rfm bang set-based SQL"""
+    now = datetime.utcnow()
+    connection = db.connection()
+    connection.execute(delete(_rfm))
+    _insert_aggregates(connection, [], now)
+    _age(connection, now.date())
+    count = db.scalar(select(func.count()).select_from(_rfm))
+    db.commit()
+    # Ghi bang SQL tren connection khong qua flush -> tu bao cho cache/memo dang doc bang nay
+    invalidate_tags([table_tag(_rfm.name)])
+    logger.info(f"Rebuilt customer_rfm: {count} customers")
+    return count
+
+
+def ensure_customer_rfm(db: Session) -> Optional[int]:
+    """Lan dau bat customer_rfm tren DB da co don hang: backfill toan bo (cac lan sau khong lam gi)"""
+    if db.scalar(select(_rfm.c.khach_hang_id).limit(1)) is not None:
+        return None
+    if db.scalar(select(DonHang.id).where(DonHang.khach_hang_id.isnot(None)).limit(1)) is None:
+        return None
+    return rebuild_customer_rfm(db)
+
+
+def age_customer_rfm(db: Session, today: Optional[date] = None) -> int:
+    """Aging hang dem: dong chua cap nhat hom nay -> cong recency, xep lai segment"""
+    today = today or datetime.utcnow().date()
+    aged = _age(db.connection(), today, _rfm.c.aged_on < today)
+    db.commit()
+    if aged:
+        invalidate_tags([table_tag(_rfm.name)])
+        logger.info(f"Aged customer_rfm to {today}: {aged} customers")
+    return aged
+
+
+async def age_periodically(session_factory, interval: int = CUSTOMER_RFM_AGE_INTERVAL):
+    """Background task: kiem tra moi `interval` giay, chi ghi khi sang ngay moi (idempotent)"""
+
+    def run():
+        with session_factory() as db:
+            return age_customer_rfm(db)
+
+    while True:
+        try:
+            await asyncio.to_thread(run)
+        except Exception as e:
+            logger.error(f"Customer RFM aging failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# customer_rfm doi cung transaction ghi don hang; analytics, ml_engine doc chung
+@memoized(_rfm.name, "don_hang", "khach_hang")
+def read_customer_rfm(
+    db: Session,
+    segments: Optional[Sequence[str]] = None,
+    inactive_days: Optional[int] = None,
+    min_orders: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List:
+    """
+    Khach co don (khong huy) kem RFM, tong tien giam dan. Dong: id, ho_ten, email, loai_khach,
+    order_count, monetary, avg_order_value, first_order_at, last_order_at, recency_days, segment.
+    inactive_days: chi khach khong mua > inactive_days ngay (churn).
+    """
+    stmt = select(
+        KhachHang.id,
+        KhachHang.ho_ten,
+        KhachHang.email,
+        KhachHang.loai_khach,
+        _rfm.c.order_count,
+        _rfm.c.monetary,
+        (_rfm.c.monetary / _rfm.c.order_count).label("avg_order_value"),
+        _rfm.c.first_order_at,
+        _rfm.c.last_order_at,
+        _rfm.c.recency_days,
+        _rfm.c.segment,
+    ).join(KhachHang, KhachHang.id == _rfm.c.khach_hang_id)
+    if segments:
+        stmt = stmt.where(_rfm.c.segment.in_(segments))
+    if inactive_days is not None:
+        stmt = stmt.where(_rfm.c.recency_days > inactive_days)
+    if min_orders is not None:
+        stmt = stmt.where(_rfm.c.order_count >= min_orders)
+    stmt = stmt.order_by(_rfm.c.monetary.desc(), _rfm.c.khach_hang_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
+
+
+@memoized(_rfm.name, "don_hang")
+def read_rfm_segments(db: Session) -> Dict[str, Dict[str, float]]:
+    """So khach va R/F/M trung binh theo segment (segment khong co khach -> khong co key)"""
+    rows = db.execute(
+        select(
+            _rfm.c.segment,
+            func.count().label("customers"),
+            func.avg(_rfm.c.recency_days).label("avg_recency"),
+            func.avg(_rfm.c.order_count).label("avg_frequency"),
+            func.avg(_rfm.c.monetary).label("avg_monetary"),
+        ).group_by(_rfm.c.segment)
+    ).all()
+    return {
+        row.segment: {
+            "customers": row.customers,
+            "avg_recency": round(float(row.avg_recency or 0), 1),
+            "avg_frequency": round(float(row.avg_frequency or 0), 2),
+            "avg_monetary": round(float(row.avg_monetary or 0), 2),
+        }
+        for row in sorted(rows, key=lambda row: SEGMENTS.index(row.segment))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or age customer_rfm from don_hang")
+    parser.add_argument("--age", action="store_true", help="chi aging recency den hom nay")
+    args = parser.parse_args()
+
+    from database import SessionLocal, create_tables
+
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    with SessionLocal() as db:
+        if args.age:
+            print(f"customer_rfm: {age_customer_rfm(db)} customers aged")
+        else:
+            print(f"customer_rfm: {rebuild_customer_rfm(db)} customers rebuilt")
+
+
+__all__ = [
+    "CUSTOMER_RFM_AGE_INTERVAL",
+    "RFM_AT_RISK_DAYS",
+    "RFM_CHAMPION_ORDERS",
+    "RFM_LOST_DAYS",
+    "RFM_LOYAL_ORDERS",
+    "RFM_NEW_DAYS",
+    "SEGMENTS",
+    "age_customer_rfm",
+    "age_periodically",
+    "ensure_customer_rfm",
+    "read_customer_rfm",
+    "read_rfm_segments",
+    "rebuild_customer_rfm",
+    "refresh_customers",
+]
+
+
+if __name__ == "__main__":
+    main()
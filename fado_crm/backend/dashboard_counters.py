@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Incrementally maintained dashboard counters
+Bang dashboard_counters duoc cap nhat boi mapper event after_insert/after_update/after_delete
+cua DonHang va KhachHang, nen /dashboard chi can doc 1 query bat ke bang lon den dau.
+Delta cua moi dong duoc cong don trong session.info, cuoi flush ghi 1 lan (1 UPSERT cho ca flush).
+Job reconcile dinh ky tinh lai tu dau de sua sai lech (bulk UPDATE/DELETE bo qua event).
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import DateTime, event, func, inspect, literal, select, true, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, object_session
+
+try:
+    from models import DashboardCounter, DonHang, KhachHang, TrangThaiDonHang
+except ModuleNotFoundError:
+    from backend.models import DashboardCounter, DonHang, KhachHang, TrangThaiDonHang
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_RECONCILE_INTERVAL = int(os.getenv("DASHBOARD_RECONCILE_INTERVAL", "3600"))
+
+# Key co dinh; doanh thu/khach moi theo thang dung key "<prefix>:YYYY-MM"
+TONG_KHACH_HANG = "tong_khach_hang"
+TONG_DON_HANG = "tong_don_hang"
+DON_CHO_XU_LY = "don_cho_xu_ly"
+DOANH_THU_PREFIX = "doanh_thu"
+KHACH_MOI_PREFIX = "khach_moi"
+
+PENDING_STATUSES = (
+    TrangThaiDonHang.CHO_XAC_NHAN,
+    TrangThaiDonHang.DA_XAC_NHAN,
+    TrangThaiDonHang.DANG_MUA,
+)
+
+_UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+_counters = DashboardCounter.__table__
+# session.info: delta cong don cua flush dang chay
+SESSION_DELTAS_KEY = "dashboard_counter_deltas"
+
+
+def month_key(prefix: str, moment: Optional[datetime]) -> str:
+    return f"{prefix}:{(moment or datetime.utcnow()).strftime('%Y-%m')}"
+
+
+def _order_contribution(trang_thai, tong_tien, ngay_tao) -> Dict[str, float]:
+    """Dong gop cua 1 don hang vao cac counter"""
+    contribution = {TONG_DON_HANG: 1.0}
+    if trang_thai in PENDING_STATUSES:
+        contribution[DON_CHO_XU_LY] = 1.0
+    if trang_thai != TrangThaiDonHang.HUY:
+        contribution[month_key(DOANH_THU_PREFIX, ngay_tao)] = float(tong_tien or 0)
+    return contribution
+
+
+def _customer_contribution(ngay_tao) -> Dict[str, float]:
+    return {TONG_KHACH_HANG: 1.0, month_key(KHACH_MOI_PREFIX, ngay_tao): 1.0}
+
+
+def _diff(old: Dict[str, float], new: Dict[str, float]) -> Dict[str, float]:
+    return {key: new.get(key, 0.0) - old.get(key, 0.0) for key in set(old) | set(new)}
+
+
+def _negate(contribution: Dict[str, float]) -> Dict[str, float]:
+    return {key: -value for key, value in contribution.items()}
+
+
+def _previous(target, attr: str):
+    """Gia tri truoc khi update (neu attribute khong doi thi lay gia tri hien tai)"""
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+def apply_deltas(connection, deltas: Dict[str, float]):
+    """Cong delta vao counter trong cung transaction voi thay doi goc (UPSERT nguyen tu)"""
+    now = datetime.utcnow()
+    rows = [
+        {"key": key, "value": delta, "updated_at": now}
+        for key, delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+    if upsert is not None:
+        # 1 cau executemany cho moi key cua flush; thu tu key co dinh de khong deadlock
+        stmt = upsert(_counters)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_counters.c.key],
+            set_={"value": _counters.c.value + stmt.excluded.value, "updated_at": now},
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(_counters)
+            .where(_counters.c.key == row["key"])
+            .values(value=_counters.c.value + row["value"], updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(_counters.insert().values(**row))
+
+
+def _accumulate(connection, target, deltas: Dict[str, float]):
+    """Cong delta cua 1 dong vao session.info; ghi o after_flush (ngoai session thi ghi ngay)"""
+    session = object_session(target)
+    if session is None:
+        apply_deltas(connection, deltas)
+        return
+    pending = session.info.setdefault(SESSION_DELTAS_KEY, {})
+    for key, delta in deltas.items():
+        pending[key] = pending.get(key, 0.0) + delta
+
+
+@event.listens_for(Session, "before_flush")
+def _reset_deltas(session, flush_context, instances):
+    # Flush truoc loi giua chung (da rollback) khong duoc de lai delta
+    session.info.pop(SESSION_DELTAS_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flushed_deltas(session, flush_context):
+    deltas = session.info.pop(SESSION_DELTAS_KEY, None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# Mapper events - chay trong flush, dung chung connection/transaction cua session
+@event.listens_for(DonHang, "after_insert")
+def _don_hang_inserted(mapper, connection, target):
+    _accumulate(
+        connection,
+        target,
+        _order_contribution(target.trang_thai, target.tong_tien, target.ngay_tao),
+    )
+
+
+@event.listens_for(DonHang, "after_update")
+def _don_hang_updated(mapper, connection, target):
+    old = _order_contribution(
+        _previous(target, "trang_thai"),
+        _previous(target, "tong_tien"),
+        _previous(target, "ngay_tao"),
+    )
+    new = _order_contribution(target.trang_thai, target.tong_tien, target.ngay_tao)
+    _accumulate(connection, target, _diff(old, new))
+
+
+@event.listens_for(DonHang, "after_delete")
+def _don_hang_deleted(mapper, connection, target):
+    _accumulate(
+        connection,
+        target,
+        _negate(_order_contribution(target.trang_thai, target.tong_tien, target.ngay_tao)),
+    )
+
+
+@event.listens_for(KhachHang, "after_insert")
+def _khach_hang_inserted(mapper, connection, target):
+    _accumulate(connection, target, _customer_contribution(target.ngay_tao))
+
+
+@event.listens_for(KhachHang, "after_update")
+def _khach_hang_updated(mapper, connection, target):
+    old = _customer_contribution(_previous(target, "ngay_tao"))
+    _accumulate(connection, target, _diff(old, _customer_contribution(target.ngay_tao)))
+
+
+@event.listens_for(KhachHang, "after_delete")
+def _khach_hang_deleted(mapper, connection, target):
+    _accumulate(connection, target, _negate(_customer_contribution(target.ngay_tao)))
+
+
+def _current_keys(now: datetime) -> Dict[str, str]:
+    return {
+        "tong_khach_hang": TONG_KHACH_HANG,
+        "tong_don_hang": TONG_DON_HANG,
+        "doanh_thu_thang": month_key(DOANH_THU_PREFIX, now),
+        "don_cho_xu_ly": DON_CHO_XU_LY,
+        "khach_moi_thang": month_key(KHACH_MOI_PREFIX, now),
+    }
+
+
+def _snapshot(values: Dict[str, float], now: datetime) -> Dict[str, float]:
+    snapshot = {}
+    for field, key in _current_keys(now).items():
+        value = values.get(key, 0.0)
+        snapshot[field] = value if field == "doanh_thu_thang" else int(value)
+    return snapshot
+
+
+def read_dashboard_counters(db: Session) -> Dict[str, float]:
+    """Doc cac chi so dashboard bang 1 query (counter chua co coi nhu 0)"""
+    now = datetime.utcnow()
+    keys = list(_current_keys(now).values())
+    rows = db.execute(select(_counters.c.key, _counters.c.value).where(_counters.c.key.in_(keys)))
+    return _snapshot(dict(rows.all()), now)
+
+
+def _actual_values(now: datetime) -> Dict[str, Any]:
+    """Scalar subquery tinh lai tung counter tu bang goc"""
+    start_of_month = datetime(now.year, now.month, 1)
+    return {
+        TONG_KHACH_HANG: select(func.count(KhachHang.id)),
+        TONG_DON_HANG: select(func.count(DonHang.id)),
+        DON_CHO_XU_LY: select(func.count(DonHang.id)).where(
+            DonHang.trang_thai.in_(PENDING_STATUSES)
+        ),
+        month_key(DOANH_THU_PREFIX, now): select(
+            func.coalesce(func.sum(DonHang.tong_tien), 0.0)
+        ).where(DonHang.ngay_tao >= start_of_month, DonHang.trang_thai != TrangThaiDonHang.HUY),
+        month_key(KHACH_MOI_PREFIX, now): select(func.count(KhachHang.id)).where(
+            KhachHang.ngay_tao >= start_of_month
+        ),
+    }
+
+
+def _read_values(db: Session, keys) -> Dict[str, float]:
+    rows = db.execute(select(_counters.c.key, _counters.c.value).where(_counters.c.key.in_(keys)))
+    return dict(rows.all())
+
+
+def reconcile_dashboard_counters(db: Session) -> Dict[str, float]:
+    """Tinh lai counter tu bang goc va ghi de (sua sai lech do bulk update / loi giua chung)"""
+    now = datetime.utcnow()
+    actual = _actual_values(now)
+    keys = list(actual)
+    current = _read_values(db, keys)
+
+    # Dem va ghi trong cung 1 cau lenh: delta cua transaction khac commit giua luc dem va
+    # luc ghi khong bi ghi de mat nhu khi doc-roi-cong-drift
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        source = union_all(
+            *(
+                select(
+                    literal(key).label("key"),
+                    query.scalar_subquery().label("value"),
+                )
+                for key, query in actual.items()
+            )
+        ).subquery()
+        # WHERE true: SQLite can de phan biet INSERT ... SELECT voi ON CONFLICT
+        stmt = upsert(_counters).from_select(
+            ["key", "value", "updated_at"],
+            select(source.c.key, source.c.value, literal(now, DateTime)).where(true()),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_counters.c.key],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        )
+        db.execute(stmt)
+    else:
+        for key, query in actual.items():
+            result = db.execute(
+                update(_counters)
+                .where(_counters.c.key == key)
+                .values(value=query.scalar_subquery(), updated_at=now)
+            )
+            if result.rowcount == 0:
+                db.execute(
+                    _counters.insert().values(
+                        key=key, value=query.scalar_subquery(), updated_at=now
+                    )
+                )
+
+    reconciled = _read_values(db, keys)
+    for key in keys:
+        drift = reconciled.get(key, 0.0) - current.get(key, 0.0)
+        if drift:
+            logger.warning(f"Dashboard counter '{key}' drifted by {drift:+g}, reconciling")
+    db.commit()
+    return _snapshot(reconciled, now)
+
+
+async def reconcile_periodically(session_factory, interval: int = DASHBOARD_RECONCILE_INTERVAL):
+    """Background task: reconcile ngay khi khoi dong roi lap lai moi `interval` giay"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await db.run_sync(reconcile_dashboard_counters)
+        except Exception as e:
+            logger.error(f"Dashboard counter reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+__all__ = [
+    "DASHBOARD_RECONCILE_INTERVAL",
+    "apply_deltas",
+    "read_dashboard_counters",
+    "reconcile_dashboard_counters",
+    "reconcile_periodically",
+]
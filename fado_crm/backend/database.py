@@ -1,8 +1,4 @@
 # FADO CRM - Database Connection
-import os
-
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 # Hỗ trợ import Base linh hoạt khi chạy ở nhiều ngữ cảnh (uvicorn, pytest)
 try:
@@ -10,16 +6,34 @@ try:
 except ModuleNotFoundError:
     from backend.models import Base  # khi import dạng package 'backend'
 
-# Database URL - SQLite for demo or PostgreSQL for production
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fado_crm.db")
+try:
+    from engine_registry import _async_database_url, get_engine_registry  # noqa: F401
+    from pagination import ensure_keyset_columns
+    from search_index import ensure_search_index
+except ModuleNotFoundError:
+    from backend.engine_registry import _async_database_url, get_engine_registry  # noqa: F401
+    from backend.pagination import ensure_keyset_columns
+    from backend.search_index import ensure_search_index
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Dang ky mapper events cap nhat dashboard_counters va invalidation cache theo tag
+try:
+    import cache_invalidation  # noqa: F401
+    import dashboard_counters  # noqa: F401
+except ModuleNotFoundError:
+    from backend import cache_invalidation  # noqa: F401
+    from backend import dashboard_counters  # noqa: F401
 
-# Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engine/session lay tu registry dung chung (primary + read replica, 1 cau hinh pool)
+registry = get_engine_registry()
+
+DATABASE_URL = registry.database_url
+engine = registry.primary
+SessionLocal = registry.sessionmaker()
+
+# Async engine - de cac handler async khong chan event loop khi cho DB
+ASYNC_DATABASE_URL = registry.async_database_url
+async_engine = registry.async_primary
+AsyncSessionLocal = registry.async_sessionmaker()
 
 
 # Dependency to get database session
@@ -32,11 +46,45 @@ def get_db():
         db.close()
 
 
+# Async dependency to get database session
+async def get_async_db():
+    """Get async database session for FastAPI dependency injection"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_db_for(purpose: str):
+    """Dependency theo purpose: analytics/export/search doc tu read replica"""
+
+    def _get_db():
+        db = registry.session(purpose)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return _get_db
+
+
+def get_async_db_for(purpose: str):
+    """Async dependency theo purpose: analytics/export/search doc tu read replica"""
+
+    async def _get_async_db():
+        async with registry.async_sessionmaker(purpose)() as db:
+            yield db
+
+    return _get_async_db
+
+
 # Create all tables
 def create_tables():
     """Create all database tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    # Index full-text cho universal search (FTS5 / tsvector + GIN)
+    ensure_search_index(engine)
+    # Cot sort keyset NOT NULL de trang cursor dung duoc index (ngay_tao, id)
+    ensure_keyset_columns(engine)
     print("Database ready!")
 
 
@@ -176,6 +176,31 @@ class DatabaseOptimizer:
                 "columns": ["created_at"],
                 "reason": "Date range filtering for audit reports",
             },
+            # Keyset pagination: ORDER BY (ngay_tao, id) DESC + WHERE (ngay_tao, id) < cursor
+            {
+                "name": "idx_khach_hang_keyset",
+                "table": "khach_hang",
+                "columns": ["ngay_tao", "id"],
+                "reason": "Cursor pagination for customer list",
+            },
+            {
+                "name": "idx_don_hang_keyset",
+                "table": "don_hang",
+                "columns": ["ngay_tao", "id"],
+                "reason": "Cursor pagination for order list (100k+ rows)",
+            },
+            {
+                "name": "idx_san_pham_keyset",
+                "table": "san_pham",
+                "columns": ["ngay_tao", "id"],
+                "reason": "Cursor pagination for product list",
+            },
+            {
+                "name": "idx_audit_log_keyset",
+                "table": "audit_log",
+                "columns": ["created_at", "id"],
+                "reason": "Cursor pagination for audit log list",
+            },
         ]
 
     def create_performance_indexes(self, db: Session):
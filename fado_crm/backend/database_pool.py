@@ -6,10 +6,22 @@ Enhanced database performance with connection pooling and query caching
 
 import os
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import event
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool, StaticPool
+from starlette.requests import Request
+
+try:
+    from cache import LRUCache, build_cache
+    from cache_codec import CacheCodec
+    from cache_invalidation import register_cache
+    from cache_metrics import cache_metrics
+    from engine_registry import PRIMARY, READ, EngineRegistry, get_engine_registry
+except ModuleNotFoundError:
+    from backend.cache import LRUCache, build_cache
+    from backend.cache_codec import CacheCodec
+    from backend.cache_invalidation import register_cache
+    from backend.cache_metrics import cache_metrics
+    from backend.engine_registry import PRIMARY, READ, EngineRegistry, get_engine_registry
 
 # Redis có thể không sẵn trong môi trường test
 try:
@@ -19,47 +31,85 @@ try:
 except Exception:
     redis = None  # type: ignore
     REDIS_AVAILABLE = False
+import asyncio
 import hashlib
+import inspect
 import json
 import logging
+import math
+import random
+import re
+import threading
 import time
+import uuid
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.time()
+
+
+def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    total = time.time() - context._query_start_time
+    if total > 0.1:  # Log slow queries (>100ms)
+        logger.warning(f"Slow query ({total:.3f}s): {statement[:100]}...")
+
+
 class DatabasePoolManager:
     """Enhanced database manager with connection pooling"""
 
-    def __init__(self):
-        # Align default with backend/database.py to avoid using two different SQLite files
-        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./fado_crm.db")
+    def __init__(self, registry: Optional[EngineRegistry] = None):
+        # Engine lay tu registry dung chung de khong mo them pool rieng
+        self.registry = registry or get_engine_registry()
+        self.database_url = self.registry.database_url
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         self.enable_cache = os.getenv("ENABLE_QUERY_CACHE", "true").lower() == "true"
 
-        # Connection pool settings
-        self.pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
-        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
-        self.pool_timeout = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Connection pool settings (cau hinh trong registry)
+        self.pool_size = self.registry.pool_size
+        self.max_overflow = self.registry.max_overflow
+        self.pool_timeout = self.registry.pool_timeout
 
-        self._engine = None
-        self._session_local = None
         self._redis_client = None
+        self._binary_redis_client = None
 
     @property
     def engine(self):
         """Get database engine with connection pooling"""
-        if self._engine is None:
-            self._engine = self._create_engine()
-        return self._engine
+        engine = self.registry.primary
+        self._setup_engine_events(engine)
+        return engine
+
+    @property
+    def read_engine(self):
+        """Engine cho truy van chi doc (read replica / SQLite reader pool, neu co)"""
+        engine = self.registry.replica()
+        self._setup_engine_events(engine)
+        return engine
+
+    @property
+    def sqlite_tuned(self) -> bool:
+        return self.registry.sqlite_tuned
 
     @property
     def SessionLocal(self):
         """Get session factory"""
-        if self._session_local is None:
-            self._session_local = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        return self._session_local
+        return self.registry.sessionmaker()
+
+    @property
+    def ReadSessionLocal(self):
+        """Session factory cho request chi doc (SQLite: pool reader read-only, con lai primary)"""
+        return self.registry.sessionmaker(READ)
+
+    @property
+    def binary_redis_client(self):
+        """Redis client tra ve bytes (payload query cache da ma hoa/nen), None neu khong co Redis"""
+        if self._binary_redis_client is None and self.redis_client is not None:
+            self._binary_redis_client = redis.from_url(self.redis_url)  # type: ignore
+        return self._binary_redis_client
 
     @property
     def redis_client(self):
@@ -82,54 +132,11 @@ class DatabasePoolManager:
             self._redis_client = None
         return self._redis_client
 
-    def _create_engine(self):
-        """Create database engine with optimized settings"""
-        if self.database_url.startswith("sqlite"):
-            # SQLite optimizations
-            engine = create_engine(
-                self.database_url,
-                poolclass=StaticPool,
-                pool_pre_ping=True,
-                pool_recycle=300,
-                echo=os.getenv("SQL_ECHO", "false").lower() == "true",
-                connect_args={
-                    "check_same_thread": False,
-                    "timeout": 20,
-                    # SQLite performance settings
-                    "isolation_level": None,  # autocommit mode
-                },
-            )
-        else:
-            # PostgreSQL optimizations
-            engine = create_engine(
-                self.database_url,
-                poolclass=QueuePool,
-                pool_size=self.pool_size,
-                max_overflow=self.max_overflow,
-                pool_timeout=self.pool_timeout,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                echo=os.getenv("SQL_ECHO", "false").lower() == "true",
-            )
-
-        # Add performance monitoring
-        self._setup_engine_events(engine)
-        return engine
-
     def _setup_engine_events(self, engine):
-        """Setup engine events for performance monitoring"""
-
-        @event.listens_for(engine, "before_cursor_execute")
-        def receive_before_cursor_execute(
-            conn, cursor, statement, parameters, context, executemany
-        ):
-            context._query_start_time = time.time()
-
-        @event.listens_for(engine, "after_cursor_execute")
-        def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-            total = time.time() - context._query_start_time
-            if total > 0.1:  # Log slow queries (>100ms)
-                logger.warning(f"Slow query ({total:.3f}s): {statement[:100]}...")
+        """Setup engine events for performance monitoring (1 lan moi engine)"""
+        if not event.contains(engine, "before_cursor_execute", receive_before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", receive_before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", receive_after_cursor_execute)
 
     def get_db_session(self):
         """Get database session with proper cleanup"""
@@ -139,58 +146,198 @@ class DatabasePoolManager:
         finally:
             db.close()
 
+    def get_read_db_session(self):
+        """Get read-only database session with proper cleanup"""
+        db = self.ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
 
 # Global pool manager instance
 pool_manager = DatabasePoolManager()
 
 
 # Enhanced database dependency
+def binary_client_for(client):
+    """Client moi cung server/cau hinh voi `client` nhung decode_responses=False (payload bytes)"""
+    pool = client.connection_pool
+    kwargs = {**pool.connection_kwargs, "decode_responses": False}
+    return redis.Redis(  # type: ignore
+        connection_pool=redis.ConnectionPool(  # type: ignore
+            connection_class=pool.connection_class, **kwargs
+        )
+    )
+
+
 def get_db():
     """Database dependency with connection pooling"""
     return next(pool_manager.get_db_session())
 
 
+def get_request_db(request: Request):
+    """
+    GET/HEAD dung pool reader read-only cua SQLite production mode (thay ngay du lieu da commit),
+    co replica PostgreSQL van doc primary (read-after-write); cac method khac dung writer.
+    Chi analytics/export/search (engine_for / sessionmaker theo purpose) moi doc replica.
+    """
+    if request.method in ("GET", "HEAD"):
+        yield from pool_manager.get_read_db_session()
+    else:
+        yield from pool_manager.get_db_session()
+
+
+async def get_async_request_db(request: Request):
+    """Ban async cua get_request_db: GET/HEAD doc pool reader SQLite, khong doc replica"""
+    purpose = READ if request.method in ("GET", "HEAD") else PRIMARY
+    async with pool_manager.registry.async_sessionmaker(purpose)() as db:
+        yield db
+
+
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "300"))
+CACHE_LEASE_TTL = int(os.getenv("CACHE_LEASE_TTL", "30"))
+CACHE_LEASE_WAIT = float(os.getenv("CACHE_LEASE_WAIT", "5"))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
+
+
+class CacheEntry(NamedTuple):
+    """Gia tri cache kem han fresh va thoi gian tinh lai lan truoc"""
+
+    value: Any
+    fresh_until: float
+    delta: float
+
+    def is_fresh(self, now: float = None) -> bool:
+        return (now or time.time()) < self.fresh_until
+
+    def should_refresh_early(
+        self, beta: float = CACHE_EARLY_REFRESH_BETA, now: float = None
+    ) -> bool:
+        """
+        XFetch: tinh lai som ngau nhien truoc khi het han, xac suat tang dan khi gan han
+        va khi query cang ton thoi gian -> cac worker khong cung het han mot luc.
+        """
+        if self.delta <= 0 or beta <= 0:
+            return False
+        now = now or time.time()
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.fresh_until
+
+
+class _Flight:
+    """1 lan tinh dang chay cua 1 key: caller khac trong process cho event, khong giu lock"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_QUERY_PREFIX = re.compile(r"^([A-Za-z_][\w.-]{0,63}):")
+
+
+def query_prefix(query: str) -> str:
+    """'get_dashboard:{...}' -> 'get_dashboard'; SQL tho / chuoi khac -> 'query'"""
+    match = _QUERY_PREFIX.match(query)
+    return match.group(1) if match else "query"
+
+
 class QueryCache:
-    """Query result caching system"""
+    """Query result caching system (L1 LRU trong process truoc Redis)"""
 
-    def __init__(self, redis_client=None, default_ttl=300):
+    def __init__(self, redis_client=None, default_ttl=300, backend=None, codec=None):
         self.redis_client = redis_client or pool_manager.redis_client
         self.default_ttl = default_ttl
-        self.enabled = self.redis_client is not None
+        # Payload la bytes (codec nhi phan + nen) -> L2 can client khong decode_responses
+        # Client truyen vao (thuong decode_responses=True) -> client rieng cung server tra bytes
+        binary_client = (
+            binary_client_for(redis_client)
+            if redis_client is not None
+            else pool_manager.binary_redis_client
+        )
+        # Khong co Redis van cache duoc trong process (L1), chi mat invalidation giua worker
+        self.backend = backend or build_cache(client=binary_client)
+        self.codec = codec or CacheCodec()
+        self.enabled = os.getenv("ENABLE_QUERY_CACHE", "true").lower() == "true"
+        self.stale_ttl = CACHE_STALE_TTL
+        self.lease_ttl = CACHE_LEASE_TTL
+        # key -> lan tinh dang chay; lock chi bao ve dict, khong bao gio giu qua compute/sleep
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
 
     def _generate_cache_key(self, query: str, params: dict = None) -> str:
-        """Generate cache key from query and parameters"""
+        """Generate cache key from query and parameters (giu prefix de do metrics/evictions)"""
         cache_data = {"query": query, "params": params or {}}
         cache_str = json.dumps(cache_data, sort_keys=True)
-        return f"query_cache:{hashlib.md5(cache_str.encode()).hexdigest()}"
+        return f"query_cache:{query_prefix(query)}:{hashlib.md5(cache_str.encode()).hexdigest()}"
 
-    def get(self, query: str, params: dict = None) -> Optional[Any]:
-        """Get cached query result"""
+    def get_entry(self, query: str, params: dict = None) -> Optional[CacheEntry]:
+        """Entry ke ca khi da qua han fresh (con trong cua so stale), None neu khong co"""
         if not self.enabled:
             return None
 
         try:
             cache_key = self._generate_cache_key(query, params)
-            cached_result = self.redis_client.get(cache_key)
+            cached_result = self.backend.get(cache_key)
             if cached_result:
-                return json.loads(cached_result)
+                data = self.codec.loads(cached_result)
+                return CacheEntry(data["value"], data["fresh_until"], data.get("delta", 0.0))
         except Exception as e:
             logger.warning(f"Cache get error: {e}")
 
         return None
 
-    def set(self, query: str, result: Any, params: dict = None, ttl: int = None):
-        """Cache query result"""
+    def get(self, query: str, params: dict = None) -> Optional[Any]:
+        """Get cached query result (chi khi con fresh)"""
+        value = self._fresh_value(query, params)
+        if value is None:
+            cache_metrics.record_miss(query_prefix(query))
+        else:
+            cache_metrics.record_hit(query_prefix(query))
+        return value
+
+    def _fresh_value(self, query: str, params: dict = None) -> Optional[Any]:
+        entry = self.get_entry(query, params)
+        if entry is not None and entry.is_fresh():
+            return entry.value
+        return None
+
+    def set(
+        self,
+        query: str,
+        result: Any,
+        params: dict = None,
+        ttl: int = None,
+        tags: Optional[Iterable[str]] = None,
+        stale_ttl: int = None,
+        delta: float = 0.0,
+        stamp: Any = None,
+    ):
+        """
+        Cache query result. tags: cac tag de invalidate_tags() xoa dung entry nay,
+        stale_ttl: entry con duoc giu them bao lau sau khi het fresh (stale-while-revalidate),
+        delta: thoi gian tinh lai (giay) - dung cho early refresh,
+        stamp: tag_stamp(tags) lay truoc khi tinh - tag bi invalidate sau do thi khong ghi.
+        """
         if not self.enabled:
             return
 
         try:
             cache_key = self._generate_cache_key(query, params)
             ttl = ttl or self.default_ttl
+            stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
 
             # Serialize result
-            serialized_result = json.dumps(result, default=str)
-            self.redis_client.setex(cache_key, ttl, serialized_result)
+            serialized_result = self.codec.dumps(
+                {"value": result, "fresh_until": time.time() + ttl, "delta": delta}
+            )
+            stored = self.backend.set(
+                cache_key, serialized_result, ex=ttl + stale_ttl, tags=tags, stamp=stamp
+            )
+            if stored is False:
+                logger.debug(f"Skip caching {query_prefix(query)}: tags invalidated during fill")
+                return
+            cache_metrics.record_payload(query_prefix(query), len(serialized_result))
 
         except Exception as e:
             logger.warning(f"Cache set error: {e}")
@@ -201,46 +348,272 @@ class QueryCache:
             return
 
         try:
-            keys = self.redis_client.keys(f"query_cache:*{pattern}*")
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Invalidated {len(keys)} cache entries for pattern: {pattern}")
+            removed = self.backend.delete_pattern(f"query_cache:*{pattern}*")
+            logger.info(f"Invalidated {removed} cache entries for pattern: {pattern}")
         except Exception as e:
             logger.warning(f"Cache invalidation error: {e}")
 
+    def tag_stamp(self, tags: Optional[Iterable[str]] = None) -> Any:
+        """Moc version cua tag truoc khi tinh (None neu cache loi -> ghi khong dieu kien)"""
+        if not self.enabled:
+            return None
+        try:
+            return self.backend.tag_stamp(tags)
+        except Exception as e:
+            logger.warning(f"Cache tag stamp error: {e}")
+            return None
+
+    def invalidate_tags(self, tags: Iterable[str]) -> Set[str]:
+        """Xoa cac entry gan 1 trong cac tag (O(so key duoc gan tag), khong SCAN)"""
+        try:
+            return self.backend.invalidate_tags(tags)
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error: {e}")
+            return set()
+
+    def invalidate_local_tags(self, tags: Iterable[str]) -> Set[str]:
+        local = getattr(self.backend, "invalidate_local_tags", self.backend.invalidate_tags)
+        try:
+            return local(tags)
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error: {e}")
+            return set()
+
+    def acquire_lease(self, query: str, params: dict = None) -> Optional[str]:
+        """Lease tinh lai entry (SET NX chung giua worker), tra ve token neu lay duoc"""
+        token = uuid.uuid4().hex
+        lease_key = f"{self._generate_cache_key(query, params)}:lease"
+        try:
+            if self.backend.add(lease_key, token, ex=self.lease_ttl):
+                return token
+        except Exception as e:
+            # Redis loi -> khong chan tinh lai, chi mat bao ve giua cac worker
+            logger.warning(f"Cache lease error: {e}")
+            return token
+        return None
+
+    def release_lease(self, query: str, token: str, params: dict = None):
+        try:
+            self.backend.release(f"{self._generate_cache_key(query, params)}:lease", token)
+        except Exception as e:
+            logger.warning(f"Cache lease release error: {e}")
+
+    def join_flight(self, query: str, params: dict = None) -> Tuple[_Flight, bool]:
+        """(flight, True) neu caller nay la nguoi tinh; (flight dang chay, False) neu da co"""
+        cache_key = self._generate_cache_key(query, params)
+        with self._flights_lock:
+            flight = self._flights.get(cache_key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[cache_key] = _Flight()
+            return flight, True
+
+    def finish_flight(self, query: str, flight: _Flight, params: dict = None):
+        """Go flight khoi bang roi danh thuc cac caller dang cho"""
+        cache_key = self._generate_cache_key(query, params)
+        with self._flights_lock:
+            if self._flights.get(cache_key) is flight:
+                del self._flights[cache_key]
+        flight.done.set()
+
+    def clear(self) -> int:
+        """Xoa toan bo query cache (L1 + L2), tra ve so key da xoa o L2"""
+        return self.backend.delete_pattern("query_cache:*")
+
+    def stats(self) -> Dict[str, Any]:
+        if isinstance(self.backend, LRUCache):
+            stats = {"l1": self.backend.stats()}
+        else:
+            stats = self.backend.stats()
+        return {**stats, "codec": self.codec.name, "codecs": self.codec.stats.snapshot()}
+
 
 # Global cache instance
 query_cache = QueryCache()
+register_cache(query_cache)
 
 
-def cached_query(ttl: int = 300, cache_key_params: list = None):
-    """Decorator for caching query results"""
+def _serve(query_signature: str, entry: CacheEntry):
+    cache_metrics.record_hit(query_prefix(query_signature), stale=not entry.is_fresh())
+    return entry.value
+
+
+def _revalidate(query_signature: str, entry: CacheEntry, compute):
+    flight, leader = query_cache.join_flight(query_signature)
+    if not leader:
+        return _serve(query_signature, entry)
+    try:
+        token = query_cache.acquire_lease(query_signature)
+        if token is None:
+            return _serve(query_signature, entry)
+        try:
+            flight.result = compute()
+            return flight.result
+        finally:
+            query_cache.release_lease(query_signature, token)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        query_cache.finish_flight(query_signature, flight)
+
+
+def _on_event_loop() -> bool:
+    """Thread hien tai dang chay event loop (goi tu async def, khong qua asyncio.to_thread)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _await_other_worker(query_signature: str, compute):
+    """Lease Redis dang o worker khac -> poll ket qua toi CACHE_LEASE_WAIT, qua han thi tu tinh"""
+    deadline = time.time() + CACHE_LEASE_WAIT
+    while True:
+        token = query_cache.acquire_lease(query_signature)
+        if token is not None:
+            try:
+                return compute()
+            finally:
+                query_cache.release_lease(query_signature, token)
+        if time.time() >= deadline or _on_event_loop():
+            # time.sleep tren event loop chan ca worker -> tu tinh thay vi cho
+            return compute()
+        time.sleep(0.05)
+        cached_result = query_cache._fresh_value(query_signature)
+        if cached_result is not None:
+            cache_metrics.record_hit(query_prefix(query_signature))
+            return cached_result
+
+
+def _single_flight(query_signature: str, compute):
+    """Cache trong: chi 1 caller tinh, caller khac (cung process/worker khac) cho ket qua"""
+    flight, leader = query_cache.join_flight(query_signature)
+    if not leader:
+        # Cung process: cho event cua caller dang tinh, dung chung ket qua (hoac loi);
+        # leader treo qua CACHE_LEASE_WAIT (hoac dang tren event loop) thi tu tinh
+        if _on_event_loop() or not flight.done.wait(CACHE_LEASE_WAIT):
+            return compute()
+        if flight.error is not None:
+            raise flight.error
+        cache_metrics.record_hit(query_prefix(query_signature))
+        return flight.result
+    try:
+        # Flight truoc co the vua xong giua luc doc cache va luc dang ky flight
+        cached_result = query_cache._fresh_value(query_signature)
+        if cached_result is not None:
+            cache_metrics.record_hit(query_prefix(query_signature))
+            flight.result = cached_result
+            return cached_result
+        flight.result = _await_other_worker(query_signature, compute)
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        query_cache.finish_flight(query_signature, flight)
+
+
+def cached_query(
+    ttl: int = 300,
+    cache_key_params: list = None,
+    tags=None,
+    stale_ttl: int = None,
+    cache_if: Callable[[Any], bool] = None,
+):
+    """
+    Decorator for caching query results, co chong stampede:
+    - single-flight: flight theo key trong process (caller khac cho event) + lease Redis giua cac worker
+    - stale-while-revalidate: het fresh van tra gia tri cu them stale_ttl giay trong luc 1 caller tinh lai
+    - early refresh xac suat (XFetch) truoc khi het han
+    tags: list tag co dinh hoac callable(*args, **kwargs) -> list tag,
+    vd tags=lambda customer_id: [entity_tag("customer", customer_id)]
+    cache_if: callable(result) -> bool, False thi tra ket qua nhung khong ghi cache (vd ket qua thieu)
+    Ham duoc boc co them .refresh(*args, **kwargs) de tinh lai truoc (cache warm-up).
+    Ham boc la ham dong bo va co the cho (flight/lease) toi CACHE_LEASE_WAIT: endpoint async phai goi
+    qua asyncio.to_thread; goi thang tren event loop thi khong cho ma tu tinh luon.
+    """
 
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generate cache key from function name and specified parameters
+        signature = inspect.signature(func)
+
+        def signature_of(args, kwargs) -> str:
+            # Tham so positional va gia tri mac dinh cung vao key: f(db, 7) == f(db, date_range=7)
             cache_params = {}
             if cache_key_params:
+                bound = signature.bind_partial(*args, **kwargs)
+                bound.apply_defaults()
                 for param in cache_key_params:
-                    if param in kwargs:
-                        cache_params[param] = kwargs[param]
+                    if param in bound.arguments:
+                        cache_params[param] = bound.arguments[param]
+            return f"{func.__name__}:{json.dumps(cache_params, sort_keys=True, default=str)}"
+
+        def compute(query_signature, args, kwargs, miss=True):
+            # Moi lan caller phai tu tinh = 1 miss, thoi gian tinh = fill latency
+            prefix = query_prefix(query_signature)
+            if miss:
+                cache_metrics.record_miss(prefix)
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            # Lay version tag truoc khi doc DB: commit xen giua thi ket qua cu khong duoc ghi
+            stamp = query_cache.tag_stamp(entry_tags)
+            start = time.time()
+            result = func(*args, **kwargs)
+            cache_metrics.record_fill(prefix, time.time() - start)
+            if cache_if is not None and not cache_if(result):
+                logger.debug(f"Result of {func.__name__} not cached (cache_if)")
+                return result
+            query_cache.set(
+                query_signature,
+                result,
+                ttl=ttl,
+                tags=entry_tags,
+                stale_ttl=stale_ttl,
+                delta=time.time() - start,
+                stamp=stamp,
+            )
+            logger.debug(f"Cached result for {func.__name__}")
+            return result
 
-            query_signature = f"{func.__name__}:{json.dumps(cache_params, sort_keys=True)}"
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            query_signature = signature_of(args, kwargs)
 
             # Try to get from cache
-            cached_result = query_cache.get(query_signature)
-            if cached_result is not None:
+            entry = query_cache.get_entry(query_signature)
+            if entry is not None and entry.is_fresh() and not entry.should_refresh_early():
                 logger.debug(f"Cache hit for {func.__name__}")
-                return cached_result
+                return _serve(query_signature, entry)
 
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            query_cache.set(query_signature, result, cache_params, ttl)
-            logger.debug(f"Cached result for {func.__name__}")
+            if not query_cache.enabled:
+                return func(*args, **kwargs)
 
-            return result
+            def fill():
+                return compute(query_signature, args, kwargs)
+
+            if entry is not None:
+                # Stale hoac sap het han: 1 caller tinh lai, cac caller khac dung gia tri cu
+                return _revalidate(query_signature, entry, fill)
+            return _single_flight(query_signature, fill)
+
+        def refresh(*args, **kwargs) -> bool:
+            """
+            Tinh lai va ghi de entry ke ca khi con fresh (cache warm-up).
+            False neu cache tat hoac worker khac dang giu lease cua key nay.
+            """
+            if not query_cache.enabled:
+                return False
+            query_signature = signature_of(args, kwargs)
+            token = query_cache.acquire_lease(query_signature)
+            if token is None:
+                return False
+            try:
+                compute(query_signature, args, kwargs, miss=False)
+                return True
+            finally:
+                query_cache.release_lease(query_signature, token)
 
+        wrapper.refresh = refresh
         return wrapper
 
     return decorator
@@ -311,40 +684,16 @@ performance_monitor = DatabasePerformanceMonitor()
 
 # Optimized query functions
 def get_dashboard_stats_optimized(db):
-    """Optimized dashboard statistics query"""
+    """Dashboard statistics from the incrementally maintained dashboard_counters table"""
+    try:
+        from dashboard_counters import read_dashboard_counters
+    except ModuleNotFoundError:
+        from backend.dashboard_counters import read_dashboard_counters
 
-    @cached_query(ttl=60, cache_key_params=[])  # Cache for 1 minute
-    def _get_stats():
-        from sqlalchemy import text
-
-        # Single optimized query using indexes
-        query = text(
-            """
-            SELECT
-                (SELECT COUNT(*) FROM khach_hang) as total_customers,
-                (SELECT COUNT(*) FROM don_hang) as total_orders,
-                (SELECT COUNT(*) FROM khach_hang WHERE ngay_tao >= date('now', '-30 days')) as new_customers_month,
-                (SELECT COUNT(*) FROM don_hang WHERE trang_thai = 'cho_xac_nhan') as pending_orders,
-                (SELECT COALESCE(SUM(tong_tien), 0) FROM don_hang
-                 WHERE trang_thai != 'huy' AND strftime('%Y-%m', ngay_tao) = strftime('%Y-%m', 'now')) as revenue_month
-        """
-        )
-
-        start_time = time.time()
-        result = db.execute(query).fetchone()
-        execution_time = time.time() - start_time
-
-        performance_monitor.record_query_time("dashboard_stats", execution_time)
-
-        return {
-            "tong_khach_hang": result[0],
-            "tong_don_hang": result[1],
-            "khach_moi_thang": result[2],
-            "don_cho_xu_ly": result[3],
-            "doanh_thu_thang": result[4],
-        }
-
-    return _get_stats()
+    start_time = time.time()
+    stats = read_dashboard_counters(db)
+    performance_monitor.record_query_time("dashboard_stats", time.time() - start_time)
+    return stats
 
 
 def get_customers_optimized(
@@ -389,6 +738,11 @@ def get_customers_optimized(
 __all__ = [
     "pool_manager",
     "get_db",
+    "get_async_request_db",
+    "get_request_db",
+    "binary_client_for",
+    "CacheEntry",
+    "query_prefix",
     "query_cache",
     "cached_query",
     "performance_monitor",
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Unified engine registry
+Mot noi duy nhat tao engine (sync + async) cho primary va N read replica, dung chung
+cau hinh pool. Session theo "purpose": analytics/export/search doc tu replica (chap nhan tre),
+"read" (GET thong thuong) chi dung pool reader read-only cua SQLite production mode (cung file,
+thay ngay du lieu da commit), con lai - ghi va read-after-write - luon o primary.
+"""
+
+import itertools
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+# GET thong thuong: phai thay du lieu vua ghi -> khong doc replica co do tre
+READ = "read"
+# Cac nhom truy van chi doc, chap nhan do tre replication
+REPLICA_PURPOSES = frozenset({"analytics", "export", "search"})
+
+
+def _async_database_url(url: str) -> str:
+    """Chuyen URL sync sang driver async (aiosqlite cho SQLite, asyncpg cho PostgreSQL)"""
+    if url.startswith("sqlite+aiosqlite") or "+asyncpg" in url:
+        return url
+    if url.startswith("sqlite"):
+        return url.replace("sqlite", "sqlite+aiosqlite", 1)
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    if url.startswith("postgresql"):
+        _, rest = url.split("://", 1)
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+def _split_urls(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and make_url(url).database in (None, "", ":memory:")
+
+
+class RoutingSession(Session):
+    """
+    Session chon bind theo purpose: replica cho purpose chi doc, reader SQLite cho "read",
+    nhung sau lan flush dau tien (session da ghi) thi dinh o primary de doc lai duoc du lieu vua ghi.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        registry: Optional["EngineRegistry"] = self.info.get("registry")
+        if registry is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+        is_async = self.info.get("is_async", False)
+        purpose = self.info.get("purpose")
+        if (
+            (purpose in REPLICA_PURPOSES or purpose == READ)
+            and not self._flushing
+            and not self.info.get("wrote")
+        ):
+            # Giu 1 engine doc cho ca session de cac query nhat quan voi nhau
+            if "read_bind" not in self.info:
+                if purpose == READ:
+                    engine = registry.async_reader() if is_async else registry.reader()
+                else:
+                    engine = registry.async_replica() if is_async else registry.replica()
+                self.info["read_bind"] = engine.sync_engine if is_async else engine
+            return self.info["read_bind"]
+
+        primary = registry.async_primary.sync_engine if is_async else registry.primary
+        return primary
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary(session, flush_context):
+    session.info["wrote"] = True
+
+
+class EngineRegistry:
+    """Quan ly engine primary + replica; moi module lay engine/session tu day"""
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        replica_urls: Optional[List[str]] = None,
+        async_database_url: Optional[str] = None,
+    ):
+        self.database_url = database_url or os.getenv("DATABASE_URL", "sqlite:///./fado_crm.db")
+        if replica_urls is None:
+            replica_urls = _split_urls(os.getenv("DATABASE_REPLICA_URLS", ""))
+        self.replica_urls = replica_urls
+        self.async_database_url = async_database_url or os.getenv(
+            "ASYNC_DATABASE_URL", _async_database_url(self.database_url)
+        )
+
+        # Ngan sach connection cua ca process (chia cho cac pool, xem pool_limits)
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+        self.pool_timeout = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+        self.echo = os.getenv("SQL_ECHO", "false").lower() == "true"
+
+        # SQLite production mode: WAL + PRAGMA tuning, writer 1 connection (sync va async moi ban
+        # 1 -> toi da 2 connection ghi, xep hang bang busy_timeout) + pool reader read-only
+        self.sqlite_production = os.getenv("SQLITE_PRODUCTION_MODE", "false").lower() == "true"
+        self.sqlite_reader_pool_size = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # KiB khi am
+        self.sqlite_busy_timeout = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+        self._lock = threading.RLock()
+        self._primary: Optional[Engine] = None
+        self._replicas: Optional[List[Engine]] = None
+        self._sqlite_reader: Optional[Engine] = None
+        self._async_sqlite_reader: Optional[AsyncEngine] = None
+        self._async_primary: Optional[AsyncEngine] = None
+        self._async_replicas: Optional[List[AsyncEngine]] = None
+        self._replica_cycle = None
+        self._async_replica_cycle = None
+        self._sessionmakers: Dict[str, sessionmaker] = {}
+        self._async_sessionmakers: Dict[str, async_sessionmaker] = {}
+
+    # Engine factories
+    @property
+    def sqlite_tuned(self) -> bool:
+        """SQLite production mode chi ap dung cho database file (khong ap dung :memory:)"""
+        return (
+            self.sqlite_production
+            and self.database_url.startswith("sqlite")
+            and not _is_memory_sqlite(self.database_url)
+        )
+
+    def pool_limits(self) -> Tuple[int, int]:
+        """
+        (pool_size, max_overflow) cua moi pool: DB_POOL_SIZE + DB_MAX_OVERFLOW la tong so connection
+        cua process, chia deu cho primary + moi replica, ban sync va async -> them replica
+        khong nhan so connection len server.
+        """
+        pools = 2 * (1 + len(self.replica_urls))
+        return max(1, self.pool_size // pools), self.max_overflow // pools
+
+    def _create_sync_engine(self, url: str) -> Engine:
+        if _is_memory_sqlite(url):
+            return create_engine(
+                url,
+                poolclass=StaticPool,
+                echo=self.echo,
+                connect_args={"check_same_thread": False},
+            )
+        if url.startswith("sqlite"):
+            return create_engine(url, echo=self.echo, connect_args={"check_same_thread": False})
+        pool_size, max_overflow = self.pool_limits()
+        return create_engine(
+            url,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            pool_recycle=self.pool_recycle,
+            echo=self.echo,
+        )
+
+    def _create_async_engine(self, url: str) -> AsyncEngine:
+        if "sqlite" in url:
+            return create_async_engine(
+                url, echo=self.echo, connect_args={"check_same_thread": False}, pool_pre_ping=True
+            )
+        pool_size, max_overflow = self.pool_limits()
+        return create_async_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            pool_recycle=self.pool_recycle,
+            echo=self.echo,
+        )
+
+    def _sqlite_pragmas(self) -> Dict[str, object]:
+        return {
+            "synchronous": "NORMAL",
+            "mmap_size": self.sqlite_mmap_size,
+            "cache_size": self.sqlite_cache_size,
+            "temp_store": "MEMORY",
+            "busy_timeout": self.sqlite_busy_timeout,
+        }
+
+    @staticmethod
+    def _apply_pragmas_on_connect(engine: Engine, pragmas: Dict[str, object]):
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    def _create_sqlite_writer_engine(self) -> Engine:
+        """
+        Writer sync 1 connection: cac request ghi sync xep hang o pool thay vi tranh lock file.
+        Writer async la engine rieng (1 connection nua), 2 ben cho nhau qua busy_timeout.
+        """
+        engine = create_engine(
+            self.database_url,
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            echo=self.echo,
+            connect_args={"check_same_thread": False, "timeout": 20},
+        )
+        self._apply_pragmas_on_connect(engine, {"journal_mode": "WAL", **self._sqlite_pragmas()})
+        # Mo connection ngay de file ton tai va WAL duoc bat truoc khi reader read-only ket noi
+        with engine.connect():
+            pass
+        return engine
+
+    def _create_sqlite_reader_engine(self) -> Engine:
+        """Pool connection read-only; voi WAL reader khong bi chan boi writer"""
+        path = os.path.abspath(make_url(self.database_url).database)
+        engine = create_engine(
+            f"sqlite:///file:{path}?mode=ro&uri=true",
+            poolclass=QueuePool,
+            pool_size=self.sqlite_reader_pool_size,
+            max_overflow=0,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            echo=self.echo,
+            connect_args={"check_same_thread": False, "timeout": 20},
+        )
+        self._apply_pragmas_on_connect(engine, {"query_only": "ON", **self._sqlite_pragmas()})
+        return engine
+
+    def _create_async_sqlite_writer_engine(self) -> AsyncEngine:
+        """
+        Writer async 1 connection (aiosqlite khong dung chung connection voi writer sync),
+        cung PRAGMA; WAL da bat boi writer sync.
+        """
+        engine = create_async_engine(
+            self.async_database_url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            echo=self.echo,
+            connect_args={"check_same_thread": False, "timeout": 20},
+        )
+        self._apply_pragmas_on_connect(
+            engine.sync_engine, {"journal_mode": "WAL", **self._sqlite_pragmas()}
+        )
+        return engine
+
+    def _create_async_sqlite_reader_engine(self) -> AsyncEngine:
+        path = os.path.abspath(make_url(self.database_url).database)
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=self.sqlite_reader_pool_size,
+            max_overflow=0,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=True,
+            echo=self.echo,
+            connect_args={"check_same_thread": False, "timeout": 20},
+        )
+        self._apply_pragmas_on_connect(
+            engine.sync_engine, {"query_only": "ON", **self._sqlite_pragmas()}
+        )
+        return engine
+
+    @property
+    def async_sqlite_tuned(self) -> bool:
+        """Production mode cho engine async khi no tro cung file SQLite voi primary"""
+        return self.sqlite_tuned and self.async_database_url == _async_database_url(
+            self.database_url
+        )
+
+    # Engines
+    @property
+    def primary(self) -> Engine:
+        """Engine primary (ghi + read-after-write)"""
+        with self._lock:
+            if self._primary is None:
+                if self.sqlite_tuned:
+                    self._primary = self._create_sqlite_writer_engine()
+                else:
+                    self._primary = self._create_sync_engine(self.database_url)
+            return self._primary
+
+    def reader(self) -> Engine:
+        """Engine cho purpose "read": pool reader read-only (SQLite production mode) hoac primary"""
+        with self._lock:
+            if not self.sqlite_tuned:
+                return self.primary
+            if self._sqlite_reader is None:
+                _ = self.primary  # writer phai mo file truoc (tao file + bat WAL)
+                self._sqlite_reader = self._create_sqlite_reader_engine()
+            return self._sqlite_reader
+
+    @property
+    def replicas(self) -> List[Engine]:
+        """Engine replica; SQLite production mode dung pool reader read-only lam replica"""
+        with self._lock:
+            if self._replicas is None:
+                replicas = [self._create_sync_engine(url) for url in self.replica_urls]
+                if not replicas and self.sqlite_tuned:
+                    replicas = [self.reader()]
+                self._replicas = replicas
+                self._replica_cycle = itertools.cycle(replicas) if replicas else None
+            return self._replicas
+
+    def replica(self) -> Engine:
+        """Chon replica theo round-robin; khong co replica thi dung primary"""
+        replicas = self.replicas
+        if not replicas:
+            return self.primary
+        with self._lock:
+            return next(self._replica_cycle)
+
+    @property
+    def async_primary(self) -> AsyncEngine:
+        with self._lock:
+            if self._async_primary is None:
+                if self.async_sqlite_tuned:
+                    _ = self.primary  # writer sync tao file + bat WAL truoc
+                    self._async_primary = self._create_async_sqlite_writer_engine()
+                else:
+                    self._async_primary = self._create_async_engine(self.async_database_url)
+            return self._async_primary
+
+    def async_reader(self) -> AsyncEngine:
+        with self._lock:
+            if not self.async_sqlite_tuned:
+                return self.async_primary
+            if self._async_sqlite_reader is None:
+                _ = self.primary
+                self._async_sqlite_reader = self._create_async_sqlite_reader_engine()
+            return self._async_sqlite_reader
+
+    @property
+    def async_replicas(self) -> List[AsyncEngine]:
+        with self._lock:
+            if self._async_replicas is None:
+                replicas = [
+                    self._create_async_engine(_async_database_url(url)) for url in self.replica_urls
+                ]
+                if not replicas and self.async_sqlite_tuned:
+                    replicas = [self.async_reader()]
+                self._async_replicas = replicas
+                self._async_replica_cycle = (
+                    itertools.cycle(self._async_replicas) if self._async_replicas else None
+                )
+            return self._async_replicas
+
+    def async_replica(self) -> AsyncEngine:
+        if not self.async_replicas:
+            return self.async_primary
+        with self._lock:
+            return next(self._async_replica_cycle)
+
+    def engine_for(self, purpose: str = PRIMARY) -> Engine:
+        if purpose == READ:
+            return self.reader()
+        return self.replica() if purpose in REPLICA_PURPOSES else self.primary
+
+    # Sessions
+    def sessionmaker(self, purpose: str = PRIMARY) -> sessionmaker:
+        """Session factory theo purpose (cache lai, moi purpose 1 factory)"""
+        with self._lock:
+            if purpose not in self._sessionmakers:
+                self._sessionmakers[purpose] = sessionmaker(
+                    class_=RoutingSession,
+                    autocommit=False,
+                    autoflush=False,
+                    info={"registry": self, "purpose": purpose},
+                )
+            return self._sessionmakers[purpose]
+
+    def async_sessionmaker(self, purpose: str = PRIMARY) -> async_sessionmaker:
+        """Async session factory theo purpose (expire_on_commit=False de serialize response)"""
+        with self._lock:
+            if purpose not in self._async_sessionmakers:
+                self._async_sessionmakers[purpose] = async_sessionmaker(
+                    class_=AsyncSession,
+                    sync_session_class=RoutingSession,
+                    autoflush=False,
+                    expire_on_commit=False,
+                    info={"registry": self, "purpose": purpose, "is_async": True},
+                )
+            return self._async_sessionmakers[purpose]
+
+    def session(self, purpose: str = PRIMARY) -> Session:
+        return self.sessionmaker(purpose)()
+
+    # Monitoring / shutdown
+    def pool_status(self) -> Dict[str, object]:
+        """Trang thai pool cua moi engine da tao"""
+
+        def _status(engine: Engine) -> Dict[str, object]:
+            pool = engine.pool
+            return {"url": engine.url.render_as_string(hide_password=True), "pool": pool.status()}
+
+        with self._lock:
+            status: Dict[str, object] = {}
+            if self._primary is not None:
+                status["primary"] = _status(self._primary)
+            status["replicas"] = [_status(engine) for engine in self._replicas or []]
+            return status
+
+    async def dispose_async(self):
+        for engine in [
+            self._async_primary,
+            self._async_sqlite_reader,
+            *(self._async_replicas or []),
+        ]:
+            if engine is not None:
+                await engine.dispose()
+
+    def dispose(self):
+        # Reader SQLite co the nam trong replicas: dispose 2 lan khong sao
+        for engine in [self._primary, self._sqlite_reader, *(self._replicas or [])]:
+            if engine is not None:
+                engine.dispose()
+
+
+_registry: Optional[EngineRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_engine_registry() -> EngineRegistry:
+    """Registry dung chung cho ca process (tao lan dau khi duoc goi)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EngineRegistry()
+            logger.info(f"Engine registry: primary + {len(_registry.replica_urls)} read replica(s)")
+        return _registry
+
+
+__all__ = [
+    "PRIMARY",
+    "READ",
+    "REPLICA_PURPOSES",
+    "EngineRegistry",
+    "RoutingSession",
+    "get_engine_registry",
+]
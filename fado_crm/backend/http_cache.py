@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - HTTP conditional caching
+ETag tinh tu gia tri cot cua ban ghi (khong can serialize qua Pydantic/JSON),
+If-None-Match khop -> 304 khong body. Cache-Control theo tung route.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import inspect
+
+# Cache-Control theo route: du lieu rieng tu (private), no-cache = luon hoi lai server
+# nhung duoc dung ban cu neu 304 -> tiet kiem bang thong ma khong bao gio hien du lieu cu
+CACHE_POLICIES: Dict[str, str] = {
+    "dashboard": "private, max-age=30",
+    "khach_hang": "private, no-cache",
+    "san_pham": "private, max-age=60, stale-while-revalidate=300",
+    # Cau hinh cong khai (theme, ten shop...): giong nhau cho moi user, moi trang deu goi
+    "settings_public": "public, max-age=60",
+}
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def row_etag(rows: Iterable[Any], *extra: Any) -> str:
+    """ETag tu gia tri cot cua cac ban ghi ORM (+ tham so query nhu skip/limit/search)"""
+    values = []
+    for row in rows:
+        state = inspect(row)
+        values.append([state.dict.get(attr.key) for attr in state.mapper.column_attrs])
+    return _digest([values, extra])
+
+
+def content_etag(data: Any) -> str:
+    """ETag tu noi dung (dict/list) khi khong co ban ghi ORM"""
+    return _digest(data)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match dung so sanh weak (RFC 9110): bo W/ o ca 2 phia"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def conditional_response(
+    request: Request, response: Response, etag: str, policy: str
+) -> Optional[Response]:
+    """
+    Gan ETag + Cache-Control vao response; tra ve 304 neu client da co ban moi nhat
+    (caller return ngay, bo qua serialize), None neu can gui body.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy], "Vary": "Authorization"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+__all__ = [
+    "CACHE_POLICIES",
+    "conditional_response",
+    "content_etag",
+    "etag_matches",
+    "row_etag",
+]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Eager-loading profiles
+Moi endpoint chon ro rang profile nap quan he, tranh N+1 query khi serialize response
+"""
+
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+try:
+    from models import ChiTietDonHang, DonHang, KhachHang
+except ModuleNotFoundError:
+    from backend.models import ChiTietDonHang, DonHang, KhachHang
+
+# Danh sach don hang (schemas.DonHang): khach hang + chi tiet + san pham.
+# selectinload = 1 query IN (...) cho ca trang, khong nhan ban dong nhu JOIN collection.
+ORDER_LIST = (
+    selectinload(DonHang.khach_hang),
+    selectinload(DonHang.chi_tiet_list).selectinload(ChiTietDonHang.san_pham),
+)
+
+# Chi tiet 1 don hang: JOIN khach hang (many-to-one) trong cung query
+ORDER_DETAIL = (
+    joinedload(DonHang.khach_hang),
+    selectinload(DonHang.chi_tiet_list).selectinload(ChiTietDonHang.san_pham),
+)
+
+# Tim kiem / export chi can ten khach hang, chan lazy-load chi tiet
+ORDER_WITH_CUSTOMER = (
+    joinedload(DonHang.khach_hang),
+    raiseload(DonHang.chi_tiet_list),
+)
+
+# Khach hang kem lich su don hang (trang chi tiet khach hang)
+CUSTOMER_WITH_ORDERS = (selectinload(KhachHang.don_hang_list),)
+
+LOADER_PROFILES: Dict[str, Tuple] = {
+    "order_list": ORDER_LIST,
+    "order_detail": ORDER_DETAIL,
+    "order_with_customer": ORDER_WITH_CUSTOMER,
+    "customer_with_orders": CUSTOMER_WITH_ORDERS,
+}
+
+
+def loader_options(profile: str) -> Tuple:
+    """Lay options cua 1 profile; profile sai la loi lap trinh nen raise ngay"""
+    try:
+        return LOADER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown loader profile '{profile}'. Available: {', '.join(sorted(LOADER_PROFILES))}"
+        )
+
+
+__all__ = [
+    "ORDER_LIST",
+    "ORDER_DETAIL",
+    "ORDER_WITH_CUSTOMER",
+    "CUSTOMER_WITH_ORDERS",
+    "LOADER_PROFILES",
+    "loader_options",
+]
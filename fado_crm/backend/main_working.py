@@ -2,20 +2,43 @@
 # FADO CRM - FastAPI Backend Sieu Toc!
 # API nay nhanh nhu tia chop va manh nhu Thor!
 
+import asyncio
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Literal, Optional
 
 import schemas
 
 # Import core modules
-from database import create_tables, get_db
+from analytics_stream import iter_daily_sales, ndjson_response
+from cache_warmup import CACHE_WARMUP_ENABLED, CacheWarmer
+from customer_rfm import age_periodically, ensure_customer_rfm
+from dashboard_counters import read_dashboard_counters, reconcile_periodically
+from database import AsyncSessionLocal, create_tables, get_async_db, registry
+from database_pool import get_async_request_db
+from exceptions import FADOException
 from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from http_cache import conditional_response, content_etag, row_etag
+from loader_profiles import loader_options
 from models import DonHang, KhachHang, LoaiKhachHang, SanPham, TrangThaiDonHang
-from sqlalchemy import func, text
-from sqlalchemy.orm import Session
+from order_service import bulk_create_orders, create_order, replace_order_details
+from order_snapshot import order_snapshot
+from pagination import (
+    NEXT_CURSOR_HEADER,
+    PREV_CURSOR_HEADER,
+    InvalidCursorError,
+    apply_keyset,
+    apply_offset,
+    build_page,
+    set_cursor_headers,
+)
+from query_counter import QUERY_COUNT_DEBUG, QUERY_COUNT_HEADER, QueryCountMiddleware
+from sales_rollup import ensure_daily_sales_rollup
+from settings_snapshot import settings_snapshot
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import error handling & logging
 try:
@@ -44,7 +67,14 @@ except ImportError as e:
 
 # Optional imports with error handling
 try:
-    from auth import get_admin_user, get_current_active_user, login_user, refresh_access_token
+    from auth import (
+        ServiceBusyError,
+        get_admin_user,
+        get_current_active_user,
+        get_manager_user,
+        login_user_async,
+        refresh_access_token,
+    )
 
     AUTH_AVAILABLE = True
 except ImportError:
@@ -52,7 +82,7 @@ except ImportError:
     print("Warning: Auth module not available")
 
 try:
-    from analytics_service import get_analytics_data
+    from analytics_service import AdvancedAnalytics, get_analytics_data, get_business_insights
 
     ANALYTICS_AVAILABLE = True
 except ImportError:
@@ -74,6 +104,10 @@ if MIDDLEWARE_AVAILABLE:
     app.add_middleware(ErrorHandlerMiddleware)
     app.add_middleware(RequestLoggingMiddleware)
 
+# Debug N+1: log so query SQL moi request (SQL_QUERY_COUNT_DEBUG=true)
+if QUERY_COUNT_DEBUG:
+    app.add_middleware(QueryCountMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -81,6 +115,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, QUERY_COUNT_HEADER],
 )
 
 # Create uploads directory if it doesn't exist
@@ -95,12 +130,45 @@ async def startup_event():
     try:
         create_tables()
         app_logger.info("Database tables created successfully")
+        settings_snapshot.load()
+        # Bang daily_sales_rollup/customer_rfm moi tao tren DB da co don hang -> backfill 1 lan
+        with registry.session() as db:
+            ensure_daily_sales_rollup(db)
+            ensure_customer_rfm(db)
+        # Reconcile dashboard counters luc khoi dong va dinh ky
+        app.state.counter_reconciler = asyncio.create_task(
+            reconcile_periodically(AsyncSessionLocal)
+        )
+        # Recency cua customer_rfm tang theo ngay: aging khi sang ngay moi
+        app.state.customer_rfm_task = asyncio.create_task(age_periodically(registry.sessionmaker()))
+        # Tinh truoc cache analytics (khoi dong + dinh ky), /performance/cache/clear goi trigger()
+        if CACHE_WARMUP_ENABLED:
+            app.state.cache_warmer = CacheWarmer(registry.sessionmaker("analytics"))
+            app.state.cache_warmup_task = asyncio.create_task(app.state.cache_warmer.run_forever())
+        # Snapshot cot cua don hang cho /analytics/slice (can numpy, ORDER_SNAPSHOT_ENABLED)
+        if order_snapshot.available:
+            app.state.order_snapshot_task = asyncio.create_task(
+                order_snapshot.refresh_periodically(registry.sessionmaker("analytics"))
+            )
         app_logger.info("FADO CRM API is ready to serve!")
     except Exception as e:
         app_logger.error(f"Failed to start API: {str(e)}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    for name in (
+        "counter_reconciler",
+        "customer_rfm_task",
+        "cache_warmup_task",
+        "order_snapshot_task",
+    ):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+
+
 # Root endpoint
 @app.get("/", response_model=schemas.MessageResponse)
 async def root():
@@ -116,10 +184,10 @@ async def health_check():
     db_ok = False
     db_error = None
     try:
-        from database import engine
+        from database import async_engine
 
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_ok = True
     except Exception as e:
         db_error = str(e)
@@ -135,11 +203,13 @@ async def health_check():
 
 # AUTHENTICATION ENDPOINTS
 @app.post("/auth/login", response_model=schemas.LoginResponse)
-async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    """Dang nhap va lay JWT token (su dung auth.login_user)"""
+async def login(login_data: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    """Dang nhap va lay JWT token (su dung auth.login_user_async)"""
     try:
-        result = login_user(db, login_data.email, login_data.password)
+        result = await login_user_async(db, login_data.email, login_data.password)
         return schemas.LoginResponse(**result)
+    except ServiceBusyError:
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Email hoac mat khau khong chinh xac"
@@ -147,9 +217,11 @@ async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db))
 
 
 @app.post("/auth/refresh", response_model=schemas.TokenResponse)
-async def refresh_token(refresh_data: schemas.RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(
+    refresh_data: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)
+):
     try:
-        result = refresh_access_token(refresh_data.refresh_token, db)
+        result = await refresh_access_token(refresh_data.refresh_token, db)
         return schemas.TokenResponse(**result)
     except Exception:
         raise HTTPException(
@@ -164,104 +236,231 @@ async def get_current_user_info(current_user=Depends(get_current_active_user)):
 
 # Dashboard/Thong ke tong quan
 @app.get("/dashboard", response_model=schemas.ThongKeResponse)
-async def get_dashboard(db: Session = Depends(get_db)):
+async def get_dashboard(
+    request: Request, response: Response, db: AsyncSession = Depends(get_async_request_db)
+):
     """Dashboard sieu cool voi thong ke realtime!"""
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-
-    # Tinh toan cac chi so
-    tong_khach_hang = db.query(KhachHang).count()
-    tong_don_hang = db.query(DonHang).count()
-
-    # Doanh thu thang nay
-    doanh_thu_thang = (
-        db.query(func.sum(DonHang.tong_tien))
-        .filter(DonHang.ngay_tao >= start_of_month, DonHang.trang_thai != TrangThaiDonHang.HUY)
-        .scalar()
-        or 0.0
-    )
+    # Doc tu bang dashboard_counters (duy tri boi mapper events) - 1 query, O(1)
+    counters = await db.run_sync(read_dashboard_counters)
+    not_modified = conditional_response(request, response, content_etag(counters), "dashboard")
+    return not_modified or schemas.ThongKeResponse(**counters)
 
-    # Don cho xu ly
-    don_cho_xu_ly = (
-        db.query(DonHang)
-        .filter(
-            DonHang.trang_thai.in_(
-                [
-                    TrangThaiDonHang.CHO_XAC_NHAN,
-                    TrangThaiDonHang.DA_XAC_NHAN,
-                    TrangThaiDonHang.DANG_MUA,
-                ]
-            )
-        )
-        .count()
-    )
 
-    # Khach moi thang nay
-    khach_moi_thang = db.query(KhachHang).filter(KhachHang.ngay_tao >= start_of_month).count()
+# Analytics nang cao - ket qua cache ANALYTICS_CACHE_TTL, duoc CacheWarmer tinh truoc
+def _dashboard_data(date_range: int):
+    # Cac section chay song song tren pool session dong bo, caller cho ket qua -> ngoai event loop
+    with registry.session("analytics") as db:
+        return get_analytics_data(db, date_range=date_range)
 
-    return schemas.ThongKeResponse(
-        tong_khach_hang=tong_khach_hang,
-        tong_don_hang=tong_don_hang,
-        doanh_thu_thang=doanh_thu_thang,
-        don_cho_xu_ly=don_cho_xu_ly,
-        khach_moi_thang=khach_moi_thang,
+
+@app.get("/analytics/dashboard")
+async def get_advanced_dashboard(
+    date_range: int = Query(30, ge=1, le=365, description="So ngay phan tich"),
+    current_user=Depends(get_current_active_user),
+):
+    if not ANALYTICS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Analytics service not available")
+    data = await asyncio.to_thread(_dashboard_data, date_range)
+    return {"success": True, "data": data, "message": f"Analytics data for {date_range} days"}
+
+
+def _revenue_trend(days: int):
+    with registry.session("analytics") as db:
+        return AdvancedAnalytics(db).get_daily_revenue_trend(days)
+
+
+# Chuoi doanh thu theo ngay; format=ndjson stream tung dong (nhieu nam x danh muc, bo nho co dinh)
+@app.get("/analytics/revenue-trend")
+async def get_revenue_trend(
+    days: int = Query(30, ge=1, description="So ngay (tinh den hom nay)"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson: moi dong 1 object"),
+    since: Optional[date] = Query(None, description="ndjson: ngay dau (mac dinh hom nay - days)"),
+    until: Optional[date] = Query(None, description="ndjson: ngay cuoi (mac dinh hom nay)"),
+    by_category: bool = Query(False, description="ndjson: 1 dong moi ngay x danh muc"),
+    after: Optional[date] = Query(None, description="ndjson: doc tiep sau date cua dong cuoi"),
+    after_category: Optional[str] = Query(None, description="ndjson: category cua dong cuoi"),
+    current_user=Depends(get_current_active_user),
+):
+    if format == "ndjson":
+        until = until or datetime.utcnow().date()
+        try:
+            rows = iter_daily_sales(
+                registry.sessionmaker("analytics"),
+                since or until - timedelta(days=days),
+                until,
+                by_category=by_category,
+                after=after,
+                after_category=after_category,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ndjson_response(rows)
+
+    if not ANALYTICS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Analytics service not available")
+    data = await asyncio.to_thread(_revenue_trend, days)
+    return {"success": True, "data": data, "total_days": days}
+
+
+def _slice_orders(**params) -> List[Dict[str, Any]]:
+    # Lan dau (task nen chua nap xong) -> nap ngay tren thread nay
+    if not order_snapshot.loaded:
+        with registry.session("analytics") as db:
+            order_snapshot.refresh(db)
+    return order_snapshot.group_by(**params)
+
+
+# Slice ad-hoc (danh_muc x thang x loai khach...) tren snapshot cot trong process, khong qua SQL
+@app.get("/analytics/slice")
+async def slice_orders(
+    by: str = Query(
+        "month",
+        description="Chieu, cach nhau dau phay: day,month,status,tier,customer,category,product",
+    ),
+    metrics: str = Query("orders,revenue", description="orders,revenue,units,customers"),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    tier: Optional[List[LoaiKhachHang]] = Query(None),
+    trang_thai: Optional[List[TrangThaiDonHang]] = Query(None),
+    exclude_cancelled: bool = Query(True),
+    current_user=Depends(get_current_active_user),
+):
+    if not order_snapshot.available:
+        raise HTTPException(status_code=503, detail="Order snapshot not available")
+    where = {
+        name: [getattr(v, "value", v) for v in values]
+        for name, values in (("category", category), ("tier", tier), ("status", trang_thai))
+        if values
+    }
+    try:
+        rows = await asyncio.to_thread(
+            _slice_orders,
+            by=[name for name in by.split(",") if name],
+            metrics=[name for name in metrics.split(",") if name],
+            since=since,
+            until=until,
+            where=where,
+            exclude_cancelled=exclude_cancelled,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": rows, "snapshot": order_snapshot.stats()}
+
+
+def _insights_data():
+    # cached_query cho lease bang time.sleep -> chay tren thread, khong tren event loop
+    with registry.session("analytics") as db:
+        return get_business_insights(db)
+
+
+@app.get("/analytics/insights")
+async def get_ai_insights(current_user=Depends(get_manager_user)):
+    if not ANALYTICS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Analytics service not available")
+    data = await asyncio.to_thread(_insights_data)
+    return {"success": True, "data": data, "message": "Business insights generated"}
+
+
+async def _paginate(
+    db: AsyncSession,
+    query,
+    sort_column,
+    id_column,
+    response: Response,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+):
+    """Phan trang keyset khi co cursor, offset cu khi khong; cursor tra ve qua header"""
+    try:
+        if cursor:
+            page_query, direction = apply_keyset(query, sort_column, id_column, cursor, limit)
+        else:
+            page_query, direction = apply_offset(query, sort_column, id_column, skip, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    result = await db.execute(page_query)
+    page = build_page(
+        result.scalars().all(),
+        sort_column.key,
+        id_column.key,
+        limit,
+        direction,
+        has_previous=bool(cursor) or skip > 0,
     )
+    set_cursor_headers(response, page)
+    return page["items"]
 
 
 # KHACH HANG ENDPOINTS
 @app.get("/khach-hang/", response_model=List[schemas.KhachHang])
 async def get_khach_hang_list(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor tu header X-Next-Cursor/X-Prev-Cursor"),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_request_db),
 ):
-    """Lay danh sach khach hang"""
-    query = db.query(KhachHang)
+    """Lay danh sach khach hang (moi nhat truoc)"""
+    query = select(KhachHang)
 
     if search:
-        query = query.filter(
+        query = query.where(
             (KhachHang.ho_ten.contains(search))
             | (KhachHang.email.contains(search))
             | (KhachHang.so_dien_thoai.contains(search))
         )
 
-    khach_hang_list = query.offset(skip).limit(limit).all()
-    return khach_hang_list
+    return await _paginate(
+        db, query, KhachHang.ngay_tao, KhachHang.id, response, skip, limit, cursor
+    )
 
 
 @app.post("/khach-hang/", response_model=schemas.KhachHang)
-async def create_khach_hang(khach_hang: schemas.KhachHangCreate, db: Session = Depends(get_db)):
+async def create_khach_hang(
+    khach_hang: schemas.KhachHangCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Tao khach hang moi"""
     # Check if email already exists
-    existing = db.query(KhachHang).filter(KhachHang.email == khach_hang.email).first()
+    existing = await db.scalar(select(KhachHang.id).where(KhachHang.email == khach_hang.email))
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email da ton tai")
 
     db_khach_hang = KhachHang(**khach_hang.dict())
     db.add(db_khach_hang)
-    db.commit()
-    db.refresh(db_khach_hang)
+    await db.commit()
+    await db.refresh(db_khach_hang)
     return db_khach_hang
 
 
 @app.get("/khach-hang/{khach_hang_id}", response_model=schemas.KhachHang)
-async def get_khach_hang(khach_hang_id: int, db: Session = Depends(get_db)):
+async def get_khach_hang(
+    khach_hang_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_request_db),
+):
     """Lay thong tin khach hang theo ID"""
-    khach_hang = db.query(KhachHang).filter(KhachHang.id == khach_hang_id).first()
+    khach_hang = await db.get(KhachHang, khach_hang_id)
     if not khach_hang:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Khong tim thay khach hang"
         )
-    return khach_hang
+    not_modified = conditional_response(request, response, row_etag([khach_hang]), "khach_hang")
+    return not_modified or khach_hang
 
 
 @app.put("/khach-hang/{khach_hang_id}", response_model=schemas.KhachHang)
 async def update_khach_hang(
-    khach_hang_id: int, khach_hang_update: schemas.KhachHangUpdate, db: Session = Depends(get_db)
+    khach_hang_id: int,
+    khach_hang_update: schemas.KhachHangUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Cap nhat thong tin khach hang"""
-    khach_hang = db.query(KhachHang).filter(KhachHang.id == khach_hang_id).first()
+    khach_hang = await db.get(KhachHang, khach_hang_id)
     if not khach_hang:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Khong tim thay khach hang"
@@ -271,78 +470,127 @@ async def update_khach_hang(
     for field, value in update_data.items():
         setattr(khach_hang, field, value)
 
-    db.commit()
-    db.refresh(khach_hang)
+    await db.commit()
+    await db.refresh(khach_hang)
     return khach_hang
 
 
 # SAN PHAM ENDPOINTS
 @app.get("/san-pham/", response_model=List[schemas.SanPham])
 async def get_san_pham_list(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor tu header X-Next-Cursor/X-Prev-Cursor"),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_request_db),
 ):
-    """Lay danh sach san pham"""
-    query = db.query(SanPham)
+    """Lay danh sach san pham (moi nhat truoc)"""
+    query = select(SanPham)
 
     if search:
-        query = query.filter(SanPham.ten.contains(search))
+        query = query.where(SanPham.ten_san_pham.contains(search))
 
-    san_pham_list = query.offset(skip).limit(limit).all()
-    return san_pham_list
+    items = await _paginate(db, query, SanPham.ngay_tao, SanPham.id, response, skip, limit, cursor)
+    etag = row_etag(items, skip, limit, cursor, search)
+    return conditional_response(request, response, etag, "san_pham") or items
 
 
 @app.post("/san-pham/", response_model=schemas.SanPham)
-async def create_san_pham(san_pham: schemas.SanPhamCreate, db: Session = Depends(get_db)):
+async def create_san_pham(
+    san_pham: schemas.SanPhamCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Tao san pham moi"""
     db_san_pham = SanPham(**san_pham.dict())
     db.add(db_san_pham)
-    db.commit()
-    db.refresh(db_san_pham)
+    await db.commit()
+    await db.refresh(db_san_pham)
     return db_san_pham
 
 
 # DON HANG ENDPOINTS
+# Session async khong lazy-load duoc quan he khi serialize, nen moi endpoint chon loader profile
+async def _load_don_hang(db: AsyncSession, don_hang_id: int) -> Optional[DonHang]:
+    """Nap don hang kem quan he can cho response"""
+    result = await db.execute(
+        select(DonHang)
+        .options(*loader_options("order_detail"))
+        .where(DonHang.id == don_hang_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+def _http_error(exc: FADOException) -> HTTPException:
+    """Chuyen loi nghiep vu (order_service) thanh HTTPException"""
+    detail: Any = exc.message
+    if exc.details.get("errors"):
+        detail = {"message": exc.message, "errors": exc.details["errors"]}
+    return HTTPException(status_code=exc.status_code, detail=detail)
+
+
 @app.get("/don-hang/", response_model=List[schemas.DonHang])
 async def get_don_hang_list(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor tu header X-Next-Cursor/X-Prev-Cursor"),
     trang_thai: Optional[TrangThaiDonHang] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_request_db),
 ):
     """Lay danh sach don hang"""
-    query = db.query(DonHang)
+    query = select(DonHang).options(*loader_options("order_list"))
 
     if trang_thai:
-        query = query.filter(DonHang.trang_thai == trang_thai)
+        query = query.where(DonHang.trang_thai == trang_thai)
 
-    don_hang_list = query.order_by(DonHang.ngay_tao.desc()).offset(skip).limit(limit).all()
-    return don_hang_list
+    return await _paginate(db, query, DonHang.ngay_tao, DonHang.id, response, skip, limit, cursor)
 
 
 @app.post("/don-hang/", response_model=schemas.DonHang)
-async def create_don_hang(don_hang: schemas.DonHangCreate, db: Session = Depends(get_db)):
+async def create_don_hang(
+    don_hang: schemas.DonHangCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Tao don hang moi"""
-    # Generate unique order code
-    import uuid
+    try:
+        db_don_hang = await create_order(db, don_hang)
+    except FADOException as e:
+        raise _http_error(e)
+    return await _load_don_hang(db, db_don_hang.id)
 
-    ma_don_hang = f"FADO{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
 
-    db_don_hang = DonHang(
-        **don_hang.dict(), ma_don_hang=ma_don_hang, trang_thai=TrangThaiDonHang.CHO_XAC_NHAN
-    )
-    db.add(db_don_hang)
-    db.commit()
-    db.refresh(db_don_hang)
-    return db_don_hang
+@app.post("/don-hang/bulk", response_model=schemas.DonHangBulkCreateResponse)
+async def bulk_create_don_hang(
+    payload: schemas.DonHangBulkCreate,
+    skip_invalid: bool = Query(False, description="Bo qua don loi thay vi huy ca lo"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Import hang loat don hang (marketplace) trong 1 transaction"""
+    try:
+        return await bulk_create_orders(db, payload.don_hang_list, skip_invalid=skip_invalid)
+    except FADOException as e:
+        raise _http_error(e)
+
+
+@app.put("/don-hang/{don_hang_id}/chi-tiet", response_model=schemas.DonHang)
+async def replace_don_hang_chi_tiet(
+    don_hang_id: int,
+    payload: schemas.OrderDetailsUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Thay toan bo chi tiet don hang va tinh lai tong tien"""
+    try:
+        await replace_order_details(db, don_hang_id, payload.chi_tiet_list)
+    except FADOException as e:
+        raise _http_error(e)
+    return await _load_don_hang(db, don_hang_id)
 
 
 @app.get("/don-hang/{don_hang_id}", response_model=schemas.DonHang)
-async def get_don_hang(don_hang_id: int, db: Session = Depends(get_db)):
+async def get_don_hang(don_hang_id: int, db: AsyncSession = Depends(get_async_request_db)):
     """Lay thong tin don hang theo ID"""
-    don_hang = db.query(DonHang).filter(DonHang.id == don_hang_id).first()
+    don_hang = await _load_don_hang(db, don_hang_id)
     if not don_hang:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khong tim thay don hang")
     return don_hang
@@ -350,18 +598,19 @@ async def get_don_hang(don_hang_id: int, db: Session = Depends(get_db)):
 
 @app.put("/don-hang/{don_hang_id}/trang-thai", response_model=schemas.DonHang)
 async def update_don_hang_status(
-    don_hang_id: int, trang_thai_update: schemas.TrangThaiUpdate, db: Session = Depends(get_db)
+    don_hang_id: int,
+    trang_thai_update: schemas.TrangThaiUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Cap nhat trang thai don hang"""
-    don_hang = db.query(DonHang).filter(DonHang.id == don_hang_id).first()
+    don_hang = await db.get(DonHang, don_hang_id)
     if not don_hang:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khong tim thay don hang")
 
     don_hang.trang_thai = trang_thai_update.trang_thai
     don_hang.ghi_chu = trang_thai_update.ghi_chu
-    db.commit()
-    db.refresh(don_hang)
-    return don_hang
+    await db.commit()
+    return await _load_don_hang(db, don_hang_id)
 
 
 if __name__ == "__main__":
@@ -2,7 +2,18 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -43,7 +54,7 @@ class KhachHang(Base):
     email = Column(String(100), unique=True, index=True)
     so_dien_thoai = Column(String(20))
     dia_chi = Column(Text)
-    ngay_tao = Column(DateTime, default=datetime.utcnow)
+    ngay_tao = Column(DateTime, default=datetime.utcnow, nullable=False)
     loai_khach = Column(Enum(LoaiKhachHang), default=LoaiKhachHang.MOI)
     tong_tien_da_mua = Column(Float, default=0.0)
     so_don_thanh_cong = Column(Integer, default=0)
@@ -68,7 +79,7 @@ class SanPham(Base):
     kich_thuoc = Column(String(100))
     danh_muc = Column(String(100))
     quoc_gia_nguon = Column(String(50))
-    ngay_tao = Column(DateTime, default=datetime.utcnow)
+    ngay_tao = Column(DateTime, default=datetime.utcnow, nullable=False)
     is_active = Column(Boolean, default=True)
 
     # Relationships
@@ -92,8 +103,9 @@ class DonHang(Base):
 
     # Status and timing
     trang_thai = Column(Enum(TrangThaiDonHang), default=TrangThaiDonHang.CHO_XAC_NHAN)
-    ngay_tao = Column(DateTime, default=datetime.utcnow)
-    ngay_cap_nhat = Column(DateTime, default=datetime.utcnow)
+    ngay_tao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # onupdate: moi lan sua don deu doi -> watermark cho ban sao/snapshot doc tang dan
+    ngay_cap_nhat = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     ngay_giao_hang = Column(DateTime)
 
     # Additional info
@@ -166,7 +178,7 @@ class AuditLog(Base):
     ip_address = Column(String(45))
     user_agent = Column(String(255))
     details = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 # System Settings
@@ -179,6 +191,48 @@ class SystemSetting(Base):
     updated_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Dashboard counters (cap nhat tang dan boi dashboard_counters.py)
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Doanh so theo ngay x trang thai x danh muc (cap nhat tang dan boi sales_rollup.py)
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"
+
+    ngay = Column(Date, primary_key=True)
+    trang_thai = Column(Enum(TrangThaiDonHang), primary_key=True)
+    # "*" = tong cua ca don hang (tong_tien); con lai = phan chi tiet thuoc danh muc do
+    danh_muc = Column(String(100), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)
+    unique_customers = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Recency/Frequency/Monetary cua tung khach (don khong huy) - customer_rfm.py giu dong bo
+class CustomerRFM(Base):
+    __tablename__ = "customer_rfm"
+
+    khach_hang_id = Column(
+        Integer, ForeignKey("khach_hang.id", ondelete="CASCADE"), primary_key=True
+    )
+    order_count = Column(Integer, nullable=False, default=0)
+    monetary = Column(Float, nullable=False, default=0.0)
+    first_order_at = Column(DateTime)
+    last_order_at = Column(DateTime)
+    # So ngay tu don gan nhat tinh den aged_on; job hang dem cong them so ngay da troi qua
+    recency_days = Column(Integer, nullable=False, default=0)
+    aged_on = Column(Date, nullable=False, index=True)
+    segment = Column(String(20), index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 # Payment Status
 class PaymentStatus(enum.Enum):
     PENDING = "pending"
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Order write service
+Tao/cap nhat don hang trong 1 transaction: validate san pham bang 1 query IN,
+insert chi tiet hang loat (executemany) va commit dung 1 lan.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    import schemas
+    from exceptions import NotFoundError, ValidationError
+    from models import ChiTietDonHang, DonHang, KhachHang, SanPham, TrangThaiDonHang
+except ModuleNotFoundError:
+    from backend import schemas
+    from backend.exceptions import NotFoundError, ValidationError
+    from backend.models import ChiTietDonHang, DonHang, KhachHang, SanPham, TrangThaiDonHang
+
+# SQLite gioi han so bien trong 1 cau lenh; chia IN (...) thanh tung lo
+IN_CLAUSE_CHUNK = 900
+MAX_BULK_ORDERS = 5000
+
+
+def generate_ma_don_hang() -> str:
+    """Ma don hang unique: FADO + ngay + 6 ky tu hex"""
+    return f"FADO{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
+
+
+def _chunks(values: List[int], size: int = IN_CLAUSE_CHUNK) -> Iterable[List[int]]:
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+async def _fetch_by_ids(db: AsyncSession, model, ids: Iterable[int], *criteria) -> Dict[int, Any]:
+    """Nap ban ghi theo danh sach id bang query IN (chia lo neu qua dai)"""
+    unique_ids = sorted(set(ids))
+    found: Dict[int, Any] = {}
+    for chunk in _chunks(unique_ids):
+        result = await db.execute(select(model).where(model.id.in_(chunk), *criteria))
+        found.update({row.id: row for row in result.scalars()})
+    return found
+
+
+async def load_products(
+    db: AsyncSession, san_pham_ids: Iterable[int], active_only: bool = False
+) -> Dict[int, SanPham]:
+    """Validate toan bo san pham bang 1 query IN; thieu san pham nao thi raise NotFoundError"""
+    criteria = (SanPham.is_active == True,) if active_only else ()
+    ids = list(san_pham_ids)
+    products = await _fetch_by_ids(db, SanPham, ids, *criteria)
+    missing = sorted(set(ids) - set(products))
+    if missing:
+        raise NotFoundError(resource="san pham", resource_id=", ".join(map(str, missing)))
+    return products
+
+
+def _detail_rows(
+    don_hang_id: int,
+    chi_tiet_list: List["schemas.ChiTietDonHangCreate"],
+    products: Dict[int, SanPham],
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Chuyen chi tiet thanh mapping cho executemany va tinh tong gia san pham"""
+    rows = []
+    tong_gia_san_pham = 0.0
+    for chi_tiet in chi_tiet_list:
+        # Su dung gia ban cua san pham neu khong co gia_mua
+        gia = chi_tiet.gia_mua or products[chi_tiet.san_pham_id].gia_ban or 0
+        tong_gia_san_pham += gia * chi_tiet.so_luong
+        rows.append({"don_hang_id": don_hang_id, **chi_tiet.dict(), "gia_mua": gia})
+    return rows, tong_gia_san_pham
+
+
+def _new_order(payload: "schemas.DonHangCreate", tong_gia_chi_tiet: float) -> DonHang:
+    fields = payload.dict(exclude={"chi_tiet_list"})
+    if not fields.get("tong_gia_san_pham"):
+        fields["tong_gia_san_pham"] = tong_gia_chi_tiet
+    tong_tien = (
+        fields["tong_gia_san_pham"]
+        + fields["phi_mua_ho"]
+        + fields["phi_van_chuyen"]
+        + fields["phi_khac"]
+    )
+    return DonHang(
+        **fields,
+        ma_don_hang=generate_ma_don_hang(),
+        tong_tien=tong_tien,
+        trang_thai=TrangThaiDonHang.CHO_XAC_NHAN,
+    )
+
+
+def _line_total(chi_tiet_list, products: Dict[int, SanPham]) -> float:
+    return sum(
+        (ct.gia_mua or products[ct.san_pham_id].gia_ban or 0) * ct.so_luong for ct in chi_tiet_list
+    )
+
+
+async def create_order(db: AsyncSession, payload: "schemas.DonHangCreate") -> DonHang:
+    """Tao 1 don hang + chi tiet trong 1 transaction (1 query IN, 1 executemany, 1 commit)"""
+    if await db.get(KhachHang, payload.khach_hang_id) is None:
+        raise NotFoundError(resource="khach hang", resource_id=payload.khach_hang_id)
+
+    products = await load_products(db, [ct.san_pham_id for ct in payload.chi_tiet_list])
+
+    try:
+        don_hang = _new_order(payload, _line_total(payload.chi_tiet_list, products))
+        db.add(don_hang)
+        await db.flush()  # lay id, chua commit
+
+        rows, _ = _detail_rows(don_hang.id, payload.chi_tiet_list, products)
+        if rows:
+            await db.execute(insert(ChiTietDonHang), rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return don_hang
+
+
+async def replace_order_details(
+    db: AsyncSession, don_hang_id: int, chi_tiet_list: List["schemas.ChiTietDonHangCreate"]
+) -> DonHang:
+    """Thay toan bo chi tiet don hang va tinh lai tong tien trong 1 transaction"""
+    don_hang = await db.get(DonHang, don_hang_id)
+    if don_hang is None:
+        raise NotFoundError(resource="don hang", resource_id=don_hang_id)
+
+    products = await load_products(db, [ct.san_pham_id for ct in chi_tiet_list], active_only=True)
+
+    try:
+        await db.execute(delete(ChiTietDonHang).where(ChiTietDonHang.don_hang_id == don_hang_id))
+        rows, tong_gia_san_pham = _detail_rows(don_hang_id, chi_tiet_list, products)
+        if rows:
+            await db.execute(insert(ChiTietDonHang), rows)
+
+        # Cap nhat tong gia va tong tien don hang
+        don_hang.tong_gia_san_pham = tong_gia_san_pham
+        don_hang.tong_tien = (
+            don_hang.tong_gia_san_pham
+            + (don_hang.phi_mua_ho or 0)
+            + (don_hang.phi_van_chuyen or 0)
+            + (don_hang.phi_khac or 0)
+        )
+        don_hang.ngay_cap_nhat = datetime.utcnow()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return don_hang
+
+
+async def bulk_create_orders(
+    db: AsyncSession, orders: List["schemas.DonHangCreate"], skip_invalid: bool = False
+) -> Dict[str, Any]:
+    """
+    Import hang loat don hang (marketplace): validate khach hang/san pham cua ca lo
+    bang query IN, insert don hang + chi tiet hang loat, commit 1 lan.
+
+    skip_invalid=False: co don loi thi khong insert gi ca (ValidationError kem danh sach loi).
+    """
+    if len(orders) > MAX_BULK_ORDERS:
+        raise ValidationError(f"Toi da {MAX_BULK_ORDERS} don hang moi lan import", field="orders")
+
+    customer_ids: Set[int] = {o.khach_hang_id for o in orders}
+    product_ids: Set[int] = {ct.san_pham_id for o in orders for ct in o.chi_tiet_list}
+    customers = await _fetch_by_ids(db, KhachHang, customer_ids)
+    products = await _fetch_by_ids(db, SanPham, product_ids)
+
+    errors: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, "schemas.DonHangCreate"]] = []
+    for index, payload in enumerate(orders):
+        missing_products = sorted({ct.san_pham_id for ct in payload.chi_tiet_list} - set(products))
+        if payload.khach_hang_id not in customers:
+            errors.append(
+                {"index": index, "error": f"Khong tim thay khach hang {payload.khach_hang_id}"}
+            )
+        elif missing_products:
+            errors.append({"index": index, "error": f"Khong tim thay san pham {missing_products}"})
+        else:
+            valid.append((index, payload))
+
+    if errors and not skip_invalid:
+        raise ValidationError(
+            "Lo import co don hang khong hop le", field="orders", details={"errors": errors}
+        )
+
+    try:
+        db_orders = [
+            _new_order(payload, _line_total(payload.chi_tiet_list, products))
+            for _, payload in valid
+        ]
+        db.add_all(db_orders)
+        await db.flush()  # INSERT hang loat (insertmanyvalues) de lay id
+
+        detail_rows: List[Dict[str, Any]] = []
+        for db_order, (_, payload) in zip(db_orders, valid):
+            rows, _ = _detail_rows(db_order.id, payload.chi_tiet_list, products)
+            detail_rows.extend(rows)
+        if detail_rows:
+            await db.execute(insert(ChiTietDonHang), detail_rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return {
+        "created": len(db_orders),
+        "failed": len(errors),
+        "ma_don_hang_list": [o.ma_don_hang for o in db_orders],
+        "errors": errors,
+    }
+
+
+__all__ = [
+    "generate_ma_don_hang",
+    "load_products",
+    "create_order",
+    "replace_order_details",
+    "bulk_create_orders",
+    "MAX_BULK_ORDERS",
+]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Keyset (cursor) pagination
+Phan trang theo (ngay_tao, id) thay vi OFFSET de trang sau khong phai quet lai cac trang truoc
+So sanh tren cot tran de dung index (sort, id): cot sort phai NOT NULL (NULL < x luon sai ->
+dong NULL bi bo qua); ensure_keyset_columns() backfill dong cu va dat NOT NULL khi khoi dong.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, inspect, or_, text
+from sqlalchemy.engine import Engine
+
+NEXT = "next"
+PREV = "prev"
+
+# Header tra ve cursor de giu nguyen body List[...] cho client cu
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+# Bang -> cot sort keyset (index (cot, id) trong database_optimization / database_postgres)
+KEYSET_COLUMNS = {
+    "khach_hang": "ngay_tao",
+    "san_pham": "ngay_tao",
+    "don_hang": "ngay_tao",
+    "audit_log": "created_at",
+}
+# Dong cu khong ro ngay tao: xep cuoi danh sach, khong tinh vao "moi trong thang"
+UNKNOWN_CREATED_AT = datetime(1970, 1, 1)
+
+
+class InvalidCursorError(ValueError):
+    """Cursor khong giai ma duoc (bi sua hoac tu phien ban khac)"""
+
+
+def encode_cursor(sort_value: Any, row_id: int, direction: str = NEXT) -> str:
+    """Ma hoa (sort_value, id, direction) thanh chuoi opaque an toan cho URL"""
+    if isinstance(sort_value, datetime):
+        payload = {"v": sort_value.isoformat(), "t": "dt"}
+    else:
+        payload = {"v": sort_value, "t": "raw"}
+    payload.update({"id": row_id, "d": direction})
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int, str]:
+    """Giai ma cursor -> (sort_value, id, direction)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if payload.get("t") == "dt" and value is not None:
+            value = datetime.fromisoformat(value)
+        direction = payload.get("d", NEXT)
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return value, int(payload["id"]), direction
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor khong hop le: {e}")
+
+
+def ensure_keyset_columns(engine: Engine):
+    """
+    Backfill cot sort NULL cua DB cu (bang tao truoc khi cot NOT NULL) roi dat NOT NULL
+    (PostgreSQL; SQLite khong ALTER duoc cot nhung ORM luon ghi gia tri mac dinh).
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table, column in KEYSET_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            conn.execute(
+                text(f"UPDATE {table} SET {column} = :value WHERE {column} IS NULL"),
+                {"value": UNKNOWN_CREATED_AT},
+            )
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+
+
+def apply_keyset(query, sort_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Ap dung keyset pagination (thu tu moi nhat truoc) cho Query/Select.
+
+    Lay them 1 dong de biet con trang tiep theo hay khong. Tra ve (query, direction).
+    """
+    if not cursor:
+        ordered = query.order_by(sort_column.desc(), id_column.desc())
+        return ordered.limit(limit + 1), NEXT
+
+    sort_value, last_id, direction = decode_cursor(cursor)
+    if direction == NEXT:
+        query = query.filter(
+            or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < last_id))
+        ).order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.filter(
+            or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > last_id))
+        ).order_by(sort_column.asc(), id_column.asc())
+    return query.limit(limit + 1), direction
+
+
+def apply_offset(query, sort_column, id_column, skip: int, limit: int):
+    """Phan trang offset cu, cung thu tu voi keyset de co the chuyen sang cursor tu trang dau"""
+    ordered = query.order_by(sort_column.desc(), id_column.desc())
+    return ordered.offset(skip).limit(limit + 1), NEXT
+
+
+def build_page(
+    rows: Sequence[Any],
+    sort_attr: str,
+    id_attr: str,
+    limit: int,
+    direction: str = NEXT,
+    has_previous: bool = False,
+) -> Dict[str, Any]:
+    """
+    Cat dong thua va tinh next/prev cursor.
+
+    has_previous: trang hien tai khong phai trang dau (da co cursor hoac skip > 0).
+    """
+    rows = list(rows)
+    has_more = len(rows) > limit
+    items: List[Any] = rows[:limit]
+    if direction == PREV:
+        items.reverse()
+
+    next_cursor = None
+    prev_cursor = None
+    if items:
+        first, last = items[0], items[-1]
+        if direction == PREV or has_more:
+            next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr), NEXT)
+        if (direction == PREV and has_more) or (direction == NEXT and has_previous):
+            prev_cursor = encode_cursor(getattr(first, sort_attr), getattr(first, id_attr), PREV)
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "has_more": has_more,
+    }
+
+
+def set_cursor_headers(response, page: Dict[str, Any]) -> None:
+    """Gan next/prev cursor vao header cua response"""
+    if page.get("next_cursor"):
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    if page.get("prev_cursor"):
+        response.headers[PREV_CURSOR_HEADER] = page["prev_cursor"]
+
+
+__all__ = [
+    "InvalidCursorError",
+    "encode_cursor",
+    "decode_cursor",
+    "apply_keyset",
+    "apply_offset",
+    "ensure_keyset_columns",
+    "build_page",
+    "set_cursor_headers",
+    "NEXT_CURSOR_HEADER",
+    "PREV_CURSOR_HEADER",
+    "KEYSET_COLUMNS",
+]
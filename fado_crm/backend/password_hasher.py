@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Off-loop password hashing
+Hash/verify mat khau (pbkdf2_sha256/bcrypt, ton CPU hang tram ms) chay tren thread pool
+rieng co gioi han hang doi, de /auth/login khong chan event loop luc dang nhap don dap.
+hashlib.pbkdf2_hmac va bcrypt nha GIL nen thread pool du, khong can process pool.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+# So vong pbkdf2_sha256 cho hash moi; hash cu khac so vong duoc hash lai khi dang nhap
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+
+def build_context(rounds: int = PASSWORD_HASH_ROUNDS) -> CryptContext:
+    """pbkdf2_sha256 mac dinh, bcrypt chi de doc hash cu (deprecated -> hash lai khi login)"""
+    return CryptContext(
+        schemes=["pbkdf2_sha256", "bcrypt"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+class HasherBusyError(RuntimeError):
+    """Hang doi hash day - caller nen tra 503 + Retry-After thay vi xep hang vo han"""
+
+
+class PasswordHasher:
+    """
+    workers=0: chay ngay tren thread goi (hanh vi cu, dung de so sanh benchmark).
+    Toi da workers + queue_limit viec dang chay/cho; vuot qua -> HasherBusyError.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+    ):
+        self.context = context
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+            if workers > 0
+            else None
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _timed(self, fn: Callable, *args) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self._executor is None:
+            return self._timed(fn, *args)
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HasherBusyError("Password hashing queue is full")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(dung mat khau?, hash moi neu hash cu can nang cap - scheme/so vong khac cau hinh)"""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": (
+                    round(self.busy_seconds / self.completed * 1000, 2) if self.completed else 0.0
+                ),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+__all__ = [
+    "PASSWORD_HASH_QUEUE_LIMIT",
+    "PASSWORD_HASH_ROUNDS",
+    "PASSWORD_HASH_WORKERS",
+    "HasherBusyError",
+    "PasswordHasher",
+    "build_context",
+]
@@ -7,7 +7,7 @@ Real-time database performance monitoring and optimization
 import time
 from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
@@ -20,7 +20,9 @@ except Exception:
     PSUTIL_AVAILABLE = False
 import os
 
+# cache_metrics lay qua database_pool de chac chan cung 1 instance voi QueryCache
 from backend.database_pool import (
+    cache_metrics,
     get_dashboard_stats_optimized,
     performance_monitor,
     pool_manager,
@@ -70,14 +72,17 @@ async def get_database_performance_stats(
             "checked_in": getattr(engine.pool, "checkedin", lambda: 0)(),
             "checked_out": getattr(engine.pool, "checkedout", lambda: 0)(),
             "overflow": getattr(engine.pool, "overflow", lambda: 0)(),
+            "engines": pool_manager.registry.pool_status(),
         }
 
-        # Get cache stats
-        cache_stats = {}
+        # Get cache stats - hit/miss theo prefix key cua app (Redis INFO la so chung ca server)
+        cache_stats = {"prefixes": cache_metrics.snapshot()}
         if query_cache.enabled:
+            cache_stats["query_cache"] = query_cache.stats()
+        if query_cache.enabled and query_cache.redis_client is not None:
             try:
                 redis_info = query_cache.redis_client.info()
-                cache_stats = {
+                cache_stats["redis"] = {
                     "connected_clients": redis_info.get("connected_clients", 0),
                     "used_memory": redis_info.get("used_memory_human", "0B"),
                     "keyspace_hits": redis_info.get("keyspace_hits", 0),
@@ -93,7 +98,7 @@ async def get_database_performance_stats(
                     * 100,
                 }
             except Exception as e:
-                cache_stats = {"error": str(e)}
+                cache_stats["redis"] = {"error": str(e)}
 
         # System performance (nếu psutil không sẵn có, trả về thông tin tối thiểu)
         if PSUTIL_AVAILABLE:
@@ -247,7 +252,7 @@ async def get_database_indexes(
 
 @router.post("/cache/clear")
 async def clear_query_cache(
-    pattern: str = None, current_user: NguoiDung = Depends(get_admin_user)
+    request: Request, pattern: str = None, current_user: NguoiDung = Depends(get_admin_user)
 ) -> Dict[str, Any]:
     """Clear query cache (all or by pattern)"""
 
@@ -260,20 +265,46 @@ async def clear_query_cache(
             query_cache.invalidate_pattern(pattern)
             return {"message": f"Cache cleared for pattern: {pattern}", "pattern": pattern}
         else:
-            # Clear all cache
-            cache_keys = query_cache.redis_client.keys("query_cache:*")
-            if cache_keys:
-                query_cache.redis_client.delete(*cache_keys)
-                cleared_count = len(cache_keys)
-            else:
-                cleared_count = 0
-
-            return {"message": "All cache cleared", "cleared": cleared_count}
+            # Clear all cache (L1 cua moi worker + Redis)
+            cleared_count = query_cache.clear()
+            # Tinh lai ngay cac entry nang thay vi de user dau tien chiu
+            warmer = getattr(request.app.state, "cache_warmer", None)
+            if warmer:
+                warmer.trigger()
+
+            return {
+                "message": "All cache cleared",
+                "cleared": cleared_count,
+                "warmup_triggered": warmer is not None,
+            }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cache clear error: {str(e)}")
 
 
+@router.get("/cache/warmup")
+async def get_cache_warmup_status(
+    request: Request, current_user: NguoiDung = Depends(get_admin_user)
+) -> Dict[str, Any]:
+    """Trang thai cache warm-up: job, thoi gian chay lan cuoi, lan chay ke tiep"""
+    warmer = getattr(request.app.state, "cache_warmer", None)
+    if warmer is None:
+        return {"enabled": False}
+    return {"enabled": True, **warmer.status()}
+
+
+@router.post("/cache/warmup")
+async def trigger_cache_warmup(
+    request: Request, current_user: NguoiDung = Depends(get_admin_user)
+) -> Dict[str, Any]:
+    """Chay warm-up ngay (khong cho lich dinh ky)"""
+    warmer = getattr(request.app.state, "cache_warmer", None)
+    if warmer is None:
+        raise HTTPException(status_code=404, detail="Cache warm-up not enabled")
+    warmer.trigger()
+    return {"message": "Cache warm-up triggered"}
+
+
 @router.get("/database/optimize")
 async def optimize_database(
     current_user: NguoiDung = Depends(get_admin_user), db: Session = Depends(get_db)
@@ -352,7 +383,9 @@ async def performance_health_check() -> Dict[str, Any]:
             health_status["database"] = {"status": "unhealthy", "error": str(e)}
 
         # Cache connection test
-        if query_cache.enabled:
+        if query_cache.enabled and query_cache.redis_client is None:
+            health_status["cache"] = {"status": "healthy", "backend": "memory"}
+        elif query_cache.enabled:
             try:
                 start_time = time.time()
                 query_cache.redis_client.ping()
@@ -384,15 +417,18 @@ async def performance_health_check() -> Dict[str, Any]:
 @router.get("/metrics", include_in_schema=False)
 async def prometheus_metrics():
     """Expose Prometheus metrics if available. Always returns text/plain."""
+    # Metrics cache theo prefix luon co, khong phu thuoc prometheus_client
+    cache_text = cache_metrics.prometheus()
     try:
         from backend.performance_monitor import (
             performance_monitor as sys_performance_monitor,  # type: ignore
         )
 
         metrics_text = sys_performance_monitor.get_prometheus_metrics()
-        return Response(content=metrics_text, media_type="text/plain; version=0.0.4")
+        return Response(content=cache_text + metrics_text, media_type="text/plain; version=0.0.4")
     except Exception as e:
         # Graceful fallback if module or prometheus not available
         return Response(
-            content=f"# metrics unavailable: {e}\n", media_type="text/plain; version=0.0.4"
+            content=f"{cache_text}# metrics unavailable: {e}\n",
+            media_type="text/plain; version=0.0.4",
         )
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Per-request SQL query counter (debug mode)
+Bat SQL_QUERY_COUNT_DEBUG=true de log so query moi request va tra header X-Query-Count,
+giup phat hien N+1 query ngay khi vua xuat hien.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_DEBUG = os.getenv("SQL_QUERY_COUNT_DEBUG", "false").lower() == "true"
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("SQL_QUERY_COUNT_WARN", "20"))
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryCounter:
+    """Bo dem query cua 1 request (dung chung giua task va threadpool qua ContextVar)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def increment(self):
+        self.count += 1
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "fado_query_counter", default=None
+)
+_listener_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.increment()
+
+
+def install_query_counter():
+    """Gan listener vao moi Engine (sync va async.sync_engine) - goi nhieu lan van an toan"""
+    global _listener_installed
+    if not _listener_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        _listener_installed = True
+
+
+@contextmanager
+def count_queries():
+    """Dem so query SQL thuc thi trong block (dung cho test va debug thu cong)"""
+    install_query_counter()
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    """Log so query moi request; canh bao khi vuot nguong (dau hieu N+1)"""
+
+    async def dispatch(self, request, call_next):
+        with count_queries() as counter:
+            response = await call_next(request)
+
+        response.headers[QUERY_COUNT_HEADER] = str(counter.count)
+        message = f"{request.method} {request.url.path} executed {counter.count} SQL queries"
+        if counter.count > QUERY_COUNT_WARN_THRESHOLD:
+            logger.warning(f"{message} (threshold {QUERY_COUNT_WARN_THRESHOLD}, possible N+1)")
+        else:
+            logger.info(message)
+        return response
+
+
+__all__ = [
+    "QUERY_COUNT_DEBUG",
+    "QUERY_COUNT_HEADER",
+    "QueryCounter",
+    "QueryCountMiddleware",
+    "count_queries",
+    "install_query_counter",
+]
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Daily sales rollup
+Bang daily_sales_rollup (ngay x trang_thai x danh_muc) thay cho GROUP BY date(ngay_tao) tren
+bang don_hang cua cac bieu do theo thoi gian. Moi lan flush co thay doi DonHang/ChiTietDonHang,
+cac o (ngay, trang_thai) bi anh huong duoc tinh lai tu bang goc trong cung transaction;
+bulk INSERT/UPDATE/DELETE chi_tiet_don_hang qua session (order_service) cung vay.
+Bulk UPDATE/DELETE don_hang, SQL tren connection va doi danh_muc san pham -> chay backfill:
+
+    python sales_rollup.py --since 2024-01-01
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, String, delete, event, func, inspect, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+try:
+    from analytics_memo import memoized
+    from cache_invalidation import invalidate_tags, table_tag
+    from models import ChiTietDonHang, DailySalesRollup, DonHang, SanPham, TrangThaiDonHang
+except ModuleNotFoundError:
+    from backend.analytics_memo import memoized
+    from backend.cache_invalidation import invalidate_tags, table_tag
+    from backend.models import ChiTietDonHang, DailySalesRollup, DonHang, SanPham, TrangThaiDonHang
+
+logger = logging.getLogger(__name__)
+
+# danh_muc cua dong tong (ca don hang); san pham chua co danh muc gom vao UNCATEGORIZED
+ALL_CATEGORIES = "*"
+UNCATEGORIZED = ""
+
+# Cot cua don hang lam thay doi rollup (sua ghi chu... khong can tinh lai)
+_ORDER_FIELDS = ("ngay_tao", "trang_thai", "tong_tien", "khach_hang_id")
+_LINE_FIELDS = ("don_hang_id", "san_pham_id", "so_luong", "gia_mua")
+
+_UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+_rollup = DailySalesRollup.__table__
+_KEY = ["ngay", "trang_thai", "danh_muc"]
+_COLUMNS = [
+    "ngay",
+    "trang_thai",
+    "danh_muc",
+    "order_count",
+    "revenue",
+    "units",
+    "unique_customers",
+    "updated_at",
+]
+
+Cell = Tuple[date, TrangThaiDonHang]
+
+
+def _aggregate_selects(filters: list, now: datetime):
+    """SELECT tong hop theo (ngay, trang_thai) va (ngay, trang_thai, danh_muc) cho don thoa filters"""
+    day = func.date(DonHang.ngay_tao)
+    stamp = literal(now, DateTime)
+
+    # So luong hang cua tung don (chi cac don thoa filters) de cong vao dong tong
+    units = (
+        select(
+            ChiTietDonHang.don_hang_id.label("don_hang_id"),
+            func.sum(ChiTietDonHang.so_luong).label("units"),
+        )
+        .join(DonHang, DonHang.id == ChiTietDonHang.don_hang_id)
+        .where(*filters)
+        .group_by(ChiTietDonHang.don_hang_id)
+        .subquery()
+    )
+    totals = (
+        select(
+            day,
+            DonHang.trang_thai,
+            literal(ALL_CATEGORIES, String),
+            func.count(DonHang.id),
+            func.coalesce(func.sum(DonHang.tong_tien), 0.0),
+            func.coalesce(func.sum(units.c.units), 0),
+            func.count(func.distinct(DonHang.khach_hang_id)),
+            stamp,
+        )
+        .select_from(DonHang)
+        .outerjoin(units, units.c.don_hang_id == DonHang.id)
+        .where(*filters)
+        .group_by(day, DonHang.trang_thai)
+    )
+
+    category = func.coalesce(SanPham.danh_muc, UNCATEGORIZED)
+    by_category = (
+        select(
+            day,
+            DonHang.trang_thai,
+            category,
+            func.count(func.distinct(DonHang.id)),
+            func.coalesce(func.sum(ChiTietDonHang.so_luong * ChiTietDonHang.gia_mua), 0.0),
+            func.coalesce(func.sum(ChiTietDonHang.so_luong), 0),
+            func.count(func.distinct(DonHang.khach_hang_id)),
+            stamp,
+        )
+        .select_from(ChiTietDonHang)
+        .join(DonHang, DonHang.id == ChiTietDonHang.don_hang_id)
+        .outerjoin(SanPham, SanPham.id == ChiTietDonHang.san_pham_id)
+        .where(*filters)
+        .group_by(day, DonHang.trang_thai, category)
+    )
+    return totals, by_category
+
+
+def _insert_aggregates(connection, filters: list):
+    now = datetime.utcnow()
+    for stmt in _aggregate_selects(filters, now):
+        connection.execute(_rollup.insert().from_select(_COLUMNS, stmt))
+
+
+def _lock_cells(connection, upsert, day: date, statuses: List[TrangThaiDonHang]):
+    """
+    Giu dong tong "*" cua cac o (tao dong rong neu chua co): transaction khac tinh lai cung o
+    phai cho den khi transaction nay commit, roi moi doc bang goc (READ COMMITTED thay don moi).
+    """
+    connection.execute(
+        upsert(_rollup).on_conflict_do_nothing(index_elements=_KEY),
+        [
+            {"ngay": day, "trang_thai": status, "danh_muc": ALL_CATEGORIES, "updated_at": None}
+            for status in statuses
+        ],
+    )
+    connection.execute(
+        select(_rollup.c.ngay)
+        .where(
+            _rollup.c.ngay == day,
+            _rollup.c.trang_thai.in_(statuses),
+            _rollup.c.danh_muc == ALL_CATEGORIES,
+        )
+        .order_by(_rollup.c.trang_thai)
+        .with_for_update()
+    )
+
+
+def _upsert_aggregates(connection, upsert, filters: list, now: datetime):
+    for stmt in _aggregate_selects(filters, now):
+        insert = upsert(_rollup).from_select(_COLUMNS, stmt)
+        connection.execute(
+            insert.on_conflict_do_update(
+                index_elements=_KEY,
+                set_={column: insert.excluded[column] for column in _COLUMNS if column not in _KEY},
+            )
+        )
+
+
+def refresh_cells(connection, cells: Iterable[Cell]):
+    """Tinh lai cac o (ngay, trang_thai) tu bang goc - idempotent, goi trong transaction ghi"""
+    by_day: Dict[date, Set[TrangThaiDonHang]] = defaultdict(set)
+    for day, status in cells:
+        by_day[day].add(status)
+
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+    # Thu tu khoa co dinh (ngay, trang_thai) -> 2 transaction cung o khong deadlock
+    for day in sorted(by_day):
+        statuses = sorted(by_day[day], key=lambda status: status.name)
+        start = datetime(day.year, day.month, day.day)
+        filters = [
+            DonHang.ngay_tao >= start,
+            DonHang.ngay_tao < start + timedelta(days=1),
+            DonHang.trang_thai.in_(statuses),
+        ]
+        cell = [_rollup.c.ngay == day, _rollup.c.trang_thai.in_(statuses)]
+        if upsert is None:
+            connection.execute(delete(_rollup).where(*cell))
+            _insert_aggregates(connection, filters)
+            continue
+
+        # UPSERT thay DELETE + INSERT: 2 transaction ghi cung o khong con dung khoa chinh
+        now = datetime.utcnow()
+        _lock_cells(connection, upsert, day, statuses)
+        _upsert_aggregates(connection, upsert, filters, now)
+        # Dong khong duoc ghi lai lan nay (danh muc/o khong con don) -> xoa
+        connection.execute(
+            delete(_rollup).where(
+                *cell, or_(_rollup.c.updated_at.is_(None), _rollup.c.updated_at != now)
+            )
+        )
+
+
+def _cell(ngay_tao: Optional[datetime], trang_thai) -> Optional[Cell]:
+    if ngay_tao is None or trang_thai is None:
+        return None
+    return (ngay_tao.date(), trang_thai)
+
+
+def _history(target, attr: str):
+    """(gia tri cu neu co, gia tri hien tai) cua attribute trong flush"""
+    history = inspect(target).attrs[attr].history
+    current = getattr(target, attr)
+    return (history.deleted[0] if history.deleted else current), current
+
+
+def _changed(target, fields: Tuple[str, ...]) -> bool:
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _order_cells(connection, order_ids: Set[int]) -> Set[Optional[Cell]]:
+    order_ids = order_ids - {None}
+    if not order_ids:
+        return set()
+    rows = connection.execute(
+        select(DonHang.ngay_tao, DonHang.trang_thai).where(DonHang.id.in_(order_ids))
+    )
+    return {_cell(ngay_tao, trang_thai) for ngay_tao, trang_thai in rows}
+
+
+def _touched_cells(session: Session) -> Set[Cell]:
+    cells: Set[Optional[Cell]] = set()
+    order_ids = set()
+
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, DonHang):
+            cells.add(_cell(obj.ngay_tao, obj.trang_thai))
+        elif isinstance(obj, ChiTietDonHang):
+            order_ids.add(obj.don_hang_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, DonHang) and _changed(obj, _ORDER_FIELDS):
+            (old_ngay, ngay), (old_status, status) = (
+                _history(obj, "ngay_tao"),
+                _history(obj, "trang_thai"),
+            )
+            cells.update((_cell(old_ngay, old_status), _cell(ngay, status)))
+        elif isinstance(obj, ChiTietDonHang) and _changed(obj, _LINE_FIELDS):
+            order_ids.update(_history(obj, "don_hang_id"))
+
+    cells.update(_order_cells(session.connection(), order_ids))
+    cells.discard(None)
+    return cells
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    # new/dirty/deleted va attribute history van la trang thai truoc flush o day
+    cells = _touched_cells(session)
+    if cells:
+        refresh_cells(session.connection(), cells)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _refresh_after_bulk_lines(orm_execute_state):
+    # insert(ChiTietDonHang) / delete(...) cua order_service khong qua flush -> lay don_hang_id
+    # tu tham so (INSERT) hoac doc truoc theo WHERE (UPDATE/DELETE), chay lenh roi tinh lai o
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    table = getattr(state.statement, "table", None)
+    if getattr(table, "name", None) != ChiTietDonHang.__tablename__:
+        return None
+
+    connection = state.session.connection()
+    order_ids: Set[int] = set()
+    if state.is_insert:
+        params = state.parameters
+        rows = params if isinstance(params, (list, tuple)) else [params or {}]
+        order_ids.update(row.get("don_hang_id") for row in rows)
+    else:
+        where = state.statement.whereclause
+        lines = select(ChiTietDonHang.don_hang_id).distinct()
+        if where is not None:
+            lines = lines.where(where)
+        order_ids.update(connection.execute(lines).scalars())
+
+    result = state.invoke_statement()
+    cells = _order_cells(connection, order_ids)
+    cells.discard(None)
+    if cells:
+        refresh_cells(connection, cells)
+    return result
+
+
+def rebuild_daily_sales_rollup(
+    db: Session, since: Optional[date] = None, until: Optional[date] = None
+) -> int:
+    """Backfill: xoa va tinh lai rollup trong [since, until] (mac dinh toan bo) bang set-based SQL"""
+    where, filters = [], []
+    if since is not None:
+        where.append(_rollup.c.ngay >= since)
+        filters.append(DonHang.ngay_tao >= datetime(since.year, since.month, since.day))
+    if until is not None:
+        where.append(_rollup.c.ngay <= until)
+        next_day = until + timedelta(days=1)
+        filters.append(DonHang.ngay_tao < datetime(next_day.year, next_day.month, next_day.day))
+    filters.append(DonHang.trang_thai.isnot(None))
+
+    connection = db.connection()
+    connection.execute(delete(_rollup).where(*where))
+    _insert_aggregates(connection, filters)
+    count = db.scalar(select(func.count()).select_from(_rollup).where(*where))
+    db.commit()
+    # Ghi bang SQL tren connection khong qua flush -> tu bao cho cache/memo dang doc rollup
+    invalidate_tags([table_tag(_rollup.name)])
+    logger.info(f"Rebuilt daily_sales_rollup ({since} .. {until}): {count} rows")
+    return count
+
+
+def ensure_daily_sales_rollup(db: Session) -> Optional[int]:
+    """Lan dau bat rollup tren DB da co don hang: backfill toan bo (cac lan sau khong lam gi)"""
+    if db.scalar(select(_rollup.c.ngay).limit(1)) is not None:
+        return None
+    if db.scalar(select(DonHang.id).limit(1)) is None:
+        return None
+    return rebuild_daily_sales_rollup(db)
+
+
+def daily_sales_select(
+    since: date,
+    until: Optional[date] = None,
+    by_category: bool = False,
+    exclude_cancelled: bool = True,
+):
+    """SELECT chuoi theo ngay tren rollup (cong cac trang thai), xep theo ngay[, danh_muc]"""
+    keys = [_rollup.c.ngay, _rollup.c.danh_muc] if by_category else [_rollup.c.ngay]
+    stmt = select(
+        *keys,
+        func.sum(_rollup.c.order_count).label("orders"),
+        func.sum(_rollup.c.revenue).label("revenue"),
+        func.sum(_rollup.c.units).label("units"),
+        func.sum(_rollup.c.unique_customers).label("unique_customers"),
+    ).where(_rollup.c.ngay >= since)
+    if until is not None:
+        stmt = stmt.where(_rollup.c.ngay <= until)
+    if by_category:
+        stmt = stmt.where(_rollup.c.danh_muc != ALL_CATEGORIES)
+    else:
+        stmt = stmt.where(_rollup.c.danh_muc == ALL_CATEGORIES)
+    if exclude_cancelled:
+        stmt = stmt.where(_rollup.c.trang_thai != TrangThaiDonHang.HUY)
+    return stmt.group_by(*keys).order_by(*keys)
+
+
+# Rollup doi cung transaction ghi don hang/chi tiet; dashboard, ml_engine, analytics_server doc chung
+@memoized(_rollup.name, "don_hang", "chi_tiet_don_hang", "san_pham")
+def read_daily_sales(
+    db: Session,
+    since: date,
+    until: Optional[date] = None,
+    by_category: bool = False,
+    exclude_cancelled: bool = True,
+) -> List:
+    """
+    Doc chuoi theo ngay tu rollup (cong cac trang thai). Dong: ngay[, danh_muc], orders, revenue,
+    units, unique_customers. unique_customers chi chinh xac trong 1 o; cong qua nhieu o la
+    so luot khach theo ngay (khach mua 2 ngay tinh 2 lan).
+    """
+    return db.execute(daily_sales_select(since, until, by_category, exclude_cancelled)).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily_sales_rollup from don_hang")
+    parser.add_argument("--since", type=date.fromisoformat, help="YYYY-MM-DD (mac dinh: tu dau)")
+    parser.add_argument("--until", type=date.fromisoformat, help="YYYY-MM-DD (mac dinh: hom nay)")
+    args = parser.parse_args()
+
+    from database import SessionLocal, create_tables
+
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    with SessionLocal() as db:
+        count = rebuild_daily_sales_rollup(db, args.since, args.until)
+    print(f"daily_sales_rollup: {count} rows rebuilt")
+
+
+__all__ = [
+    "ALL_CATEGORIES",
+    "UNCATEGORIZED",
+    "daily_sales_select",
+    "ensure_daily_sales_rollup",
+    "read_daily_sales",
+    "rebuild_daily_sales_rollup",
+    "refresh_cells",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -268,3 +268,15 @@ class ChiTietDonHangCreate(BaseModel):
 
 class OrderDetailsUpdate(BaseModel):
     chi_tiet_list: List[ChiTietDonHangCreate]
+
+
+# Bulk order import (marketplace)
+class DonHangBulkCreate(BaseModel):
+    don_hang_list: List[DonHangCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class DonHangBulkCreateResponse(BaseModel):
+    created: int
+    failed: int = 0
+    ma_don_hang_list: List[str] = []
+    errors: List[dict] = []
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Full-text search index
+SQLite: bang ao FTS5 (external content) dong bo bang trigger, xep hang bm25.
+PostgreSQL: cot tsvector GENERATED + index GIN, xep hang ts_rank.
+Cot ma/so dien thoai con khop giua chuoi ("4567" trong so dien thoai) qua trigram:
+SQLite FTS5 tokenize='trigram', PostgreSQL ILIKE tren index GIN pg_trgm.
+universal_search dung index nay thay cho ilike('%term%') (luon quet toan bang).
+"""
+
+import logging
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TERMS = 8
+
+
+@dataclass(frozen=True)
+class FtsSpec:
+    """Cau hinh index cho 1 bang: cac cot duoc index va trong so bm25 tuong ung"""
+
+    table: str
+    columns: Tuple[str, ...]
+    weights: Tuple[float, ...]
+    name: str = "fts"
+    tokenize: str = "unicode61 remove_diacritics 2"
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_{self.name}"
+
+
+SEARCH_INDEXES: Dict[str, FtsSpec] = {
+    "customers": FtsSpec(
+        "khach_hang", ("ho_ten", "email", "so_dien_thoai", "dia_chi"), (10.0, 5.0, 5.0, 1.0)
+    ),
+    "products": FtsSpec(
+        "san_pham", ("ten_san_pham", "mo_ta", "danh_muc", "quoc_gia_nguon"), (10.0, 1.0, 3.0, 2.0)
+    ),
+    "orders": FtsSpec("don_hang", ("ma_don_hang", "ma_van_don"), (10.0, 5.0)),
+}
+
+# Cot ma don / van don / so dien thoai: nguoi dung hay go 1 doan giua chuoi, prefix khong du
+CODE_INDEXES: Dict[str, FtsSpec] = {
+    "customers": FtsSpec("khach_hang", ("so_dien_thoai",), (1.0,), "code_fts", "trigram"),
+    "orders": FtsSpec("don_hang", ("ma_don_hang", "ma_van_don"), (1.0, 1.0), "code_fts", "trigram"),
+}
+MIN_CODE_FRAGMENT = 3
+
+# Don hang con khop theo ten/email khach hang (giong universal_search cu)
+ORDER_CUSTOMER_COLUMNS = ("ho_ten", "email")
+
+
+def query_terms(query: str) -> List[str]:
+    """Tach tu khoa nguoi dung thanh cac token an toan (chi ky tu chu/so)"""
+    return [term.lower() for term in _WORD.findall(query or "")][:MAX_QUERY_TERMS]
+
+
+def fts5_query(query: str, columns: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """'nguyen van' -> '"nguyen"* "van"*' (AND + prefix, search-as-you-type)"""
+    terms = query_terms(query)
+    if not terms:
+        return None
+    match = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        match = f"{{{' '.join(columns)}}} : ({match})"
+    return match
+
+
+def code_fragment(query: str) -> Optional[str]:
+    """'0901 234' -> '0901234' de tim giua chuoi; trigram can it nhat 3 ky tu"""
+    fragment = "".join(query_terms(query))
+    return fragment if len(fragment) >= MIN_CODE_FRAGMENT else None
+
+
+def tsquery(query: str) -> Optional[str]:
+    """'nguyen van' -> 'nguyen:* & van:*' cho to_tsquery('simple', ...)"""
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+# SQLite FTS5
+def _sqlite_ddl(spec: FtsSpec) -> List[str]:
+    cols = ", ".join(spec.columns)
+    new_values = ", ".join(f"new.{c}" for c in spec.columns)
+    old_values = ", ".join(f"old.{c}" for c in spec.columns)
+    fts = spec.fts_table
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{spec.table}', "
+        f"content_rowid='id', tokenize='{spec.tokenize}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {spec.table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {spec.table} BEGIN {delete_old} END",
+        # Chi cap nhat index khi cot duoc index thay doi (khong phai moi lan doi trang thai/tien)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {spec.table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _sqlite_search(db: Session, entity: str, query: str, limit: int) -> List[int]:
+    spec = SEARCH_INDEXES[entity]
+    match = fts5_query(query)
+    if match is None:
+        return []
+    weights = ", ".join(str(w) for w in spec.weights)
+    fts = spec.fts_table
+    branches = [
+        f"SELECT rowid AS id, bm25({fts}, {weights}) AS rank FROM {fts} WHERE {fts} MATCH :match"
+    ]
+    params = {"match": match, "limit": limit}
+
+    if entity == "orders":
+        customers = SEARCH_INDEXES["customers"]
+        customer_weights = ", ".join(str(w) for w in customers.weights)
+        branches.append(
+            f"SELECT d.id AS id, bm25({customers.fts_table}, {customer_weights}) AS rank "
+            f"FROM {customers.fts_table} "
+            f"JOIN don_hang d ON d.khach_hang_id = {customers.fts_table}.rowid "
+            f"WHERE {customers.fts_table} MATCH :customer_match"
+        )
+        params["customer_match"] = fts5_query(query, ORDER_CUSTOMER_COLUMNS)
+
+    code = CODE_INDEXES.get(entity)
+    fragment = code_fragment(query)
+    if code is not None and fragment is not None:
+        # Khop giua chuoi xep sau moi ket qua bm25 (bm25 am, cang nho cang khop)
+        branches.append(
+            f"SELECT rowid AS id, 0 AS rank FROM {code.fts_table} "
+            f"WHERE {code.fts_table} MATCH :code_match"
+        )
+        params["code_match"] = f'"{fragment}"'
+
+    if len(branches) == 1:
+        # 1 nhanh: bm25 phai nam ngay trong query MATCH (SQLite gop subquery don se loi)
+        sql = f"{branches[0]} ORDER BY rank LIMIT :limit"
+    else:
+        sql = f"""
+            SELECT id FROM ({" UNION ALL ".join(branches)})
+            GROUP BY id ORDER BY MIN(rank) LIMIT :limit
+        """
+    return [row[0] for row in db.execute(text(sql), params)]
+
+
+# PostgreSQL tsvector + GIN
+def _postgres_ddl(spec: FtsSpec) -> List[str]:
+    # Trong so A..D theo thu tu trong so bm25 (cot quan trong nhat = A)
+    labels = {}
+    for label, weight in zip("ABCD", sorted(set(spec.weights), reverse=True)):
+        labels[weight] = label
+    parts = " || ".join(
+        f"setweight(to_tsvector('simple', coalesce({col}, '')), '{labels.get(w, 'D')}')"
+        for col, w in zip(spec.columns, spec.weights)
+    )
+    return [
+        f"ALTER TABLE {spec.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({parts}) STORED",
+        f"CREATE INDEX IF NOT EXISTS idx_{spec.table}_search_vector ON {spec.table} "
+        f"USING GIN (search_vector)",
+    ]
+
+
+def _postgres_code_ddl(spec: FtsSpec) -> List[str]:
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX IF NOT EXISTS idx_{spec.table}_{col}_trgm ON {spec.table} "
+        f"USING GIN ({col} gin_trgm_ops)"
+        for col in spec.columns
+    ]
+
+
+def _postgres_search(db: Session, entity: str, query: str, limit: int) -> List[int]:
+    spec = SEARCH_INDEXES[entity]
+    q = tsquery(query)
+    if q is None:
+        return []
+    # UNION thay vi OR de moi nhanh deu dung duoc index GIN
+    branches = [
+        f"SELECT id, ts_rank(search_vector, query) AS rank "
+        f"FROM {spec.table}, to_tsquery('simple', :q) query WHERE search_vector @@ query"
+    ]
+    params = {"q": q, "limit": limit}
+
+    if entity == "orders":
+        branches.append(
+            "SELECT d.id AS id, ts_rank(k.search_vector, query) AS rank "
+            "FROM khach_hang k JOIN don_hang d ON d.khach_hang_id = k.id, "
+            "to_tsquery('simple', :q) query WHERE k.search_vector @@ query"
+        )
+
+    code = CODE_INDEXES.get(entity)
+    fragment = code_fragment(query)
+    if code is not None and fragment is not None:
+        # ILIKE '%...%' dung index pg_trgm; xep sau moi ket qua ts_rank
+        condition = " OR ".join(f"{col} ILIKE :code_pattern" for col in code.columns)
+        branches.append(f"SELECT id, 0 AS rank FROM {code.table} WHERE {condition}")
+        params["code_pattern"] = "%" + fragment.replace("_", "\\_") + "%"
+
+    sql = f"""
+        SELECT id FROM ({" UNION ALL ".join(branches)}) ranked
+        GROUP BY id ORDER BY MAX(rank) DESC LIMIT :limit
+    """
+    return [row[0] for row in db.execute(text(sql), params)]
+
+
+_DIALECTS = {
+    "sqlite": (_sqlite_ddl, _sqlite_ddl, _sqlite_search),
+    "postgresql": (_postgres_ddl, _postgres_code_ddl, _postgres_search),
+}
+
+# Engine da co index hay chua (kiem tra 1 lan moi engine)
+_index_ready: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+
+def ensure_search_index(engine: Engine, rebuild: bool = False) -> bool:
+    """
+    Tao index full-text (idempotent). SQLite: bang FTS5 moi tao duoc nap du lieu san co,
+    rebuild=True ep nap lai toan bo (vd sau khi import bang SQL tho khi chua co trigger).
+    """
+    dialect = _DIALECTS.get(engine.dialect.name)
+    if dialect is None:
+        logger.info(f"Full-text index not supported on {engine.dialect.name}; using LIKE search")
+        return False
+
+    ddl, code_ddl, _ = dialect
+    is_sqlite = engine.dialect.name == "sqlite"
+    specs = [(spec, ddl) for spec in SEARCH_INDEXES.values()]
+    specs += [(spec, code_ddl) for spec in CODE_INDEXES.values()]
+    try:
+        with engine.begin() as conn:
+            for spec, spec_ddl in specs:
+                exists = (
+                    is_sqlite
+                    and conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {"name": spec.fts_table},
+                    ).first()
+                )
+                for statement in spec_ddl(spec):
+                    conn.execute(text(statement))
+                if is_sqlite and (rebuild or not exists):
+                    conn.execute(
+                        text(f"INSERT INTO {spec.fts_table}({spec.fts_table}) VALUES ('rebuild')")
+                    )
+    except Exception as e:
+        logger.warning(f"Full-text index setup failed, falling back to LIKE search: {e}")
+        return False
+
+    _index_ready[engine] = True
+    return True
+
+
+def _has_index(engine: Engine) -> bool:
+    if engine not in _index_ready:
+        spec = SEARCH_INDEXES["customers"]
+        if engine.dialect.name == "sqlite":
+            sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            params = {"name": spec.fts_table}
+        else:
+            sql = (
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = :name AND column_name = 'search_vector'"
+            )
+            params = {"name": spec.table}
+        with engine.connect() as conn:
+            _index_ready[engine] = conn.execute(text(sql), params).first() is not None
+    return _index_ready[engine]
+
+
+def search_ids(db: Session, entity: str, query: str, limit: int) -> Optional[List[int]]:
+    """
+    ID ket qua theo thu tu rank (bm25 / ts_rank).
+    Tra ve None neu DB chua co index full-text -> caller dung LIKE search nhu cu.
+    """
+    engine = db.get_bind().engine
+    dialect = _DIALECTS.get(engine.dialect.name)
+    if dialect is None or not _has_index(engine):
+        return None
+    return dialect[-1](db, entity, query, limit)
+
+
+__all__ = [
+    "CODE_INDEXES",
+    "SEARCH_INDEXES",
+    "code_fragment",
+    "ensure_search_index",
+    "fts5_query",
+    "query_terms",
+    "search_ids",
+    "tsquery",
+]
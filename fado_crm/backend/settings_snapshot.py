@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - In-memory system settings snapshot
+Bang system_setting duoc nap 1 lan vao dict trong process; doc = tra dict, khong query DB.
+Ghi qua apply() thay snapshot nguyen tu va tang version dung chung (cache/Redis) de worker
+khac nap lai trong vong SETTINGS_VERSION_CHECK_INTERVAL giay.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+try:
+    from cache import cache as default_cache
+    from database import SessionLocal
+    from models import SystemSetting
+except ModuleNotFoundError:
+    from backend.cache import cache as default_cache
+    from backend.database import SessionLocal
+    from backend.models import SystemSetting
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_VERSION_KEY = "settings:version"
+SETTINGS_VERSION_CHECK_INTERVAL = float(os.getenv("SETTINGS_VERSION_CHECK_INTERVAL", "2"))
+
+# Cau hinh tra cho frontend khong can dang nhap, kem gia tri mac dinh
+PUBLIC_SETTINGS = {"app_name": "FADO.VN CRM"}
+
+
+def _as_dict(row: SystemSetting) -> Dict[str, Any]:
+    return {
+        "key": row.key,
+        "value": row.value,
+        "description": getattr(row, "description", None),
+        "updated_at": getattr(row, "updated_at", None),
+    }
+
+
+class SettingsSnapshot:
+    """Snapshot bat bien: moi lan doi tao dict moi roi gan lai (doc khong can lock)"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        shared=default_cache,
+        check_interval: float = SETTINGS_VERSION_CHECK_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.shared = shared
+        self.check_interval = check_interval
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+
+    def _shared_version(self) -> int:
+        try:
+            return int(self.shared.get(SETTINGS_VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"Settings version read failed: {e}")
+            return self._version or 0
+
+    def load(self, db: Optional[Session] = None):
+        """Nap lai toan bo bang (luc khoi dong hoac khi version dung chung thay doi)"""
+        # Doc version truoc: ghi xen giua se lam version lech -> lan check sau nap lai
+        version = self._shared_version()
+        if db is None:
+            with self.session_factory() as session:
+                rows = session.query(SystemSetting).all()
+        else:
+            rows = db.query(SystemSetting).all()
+        self._rows = {row.key: _as_dict(row) for row in rows}
+        self._version = version
+        self._checked_at = time.monotonic()
+        logger.info(f"Loaded {len(self._rows)} system settings (version {version})")
+
+    def _refresh_if_stale(self):
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._reload_lock:
+            if self._version is not None and (
+                time.monotonic() - self._checked_at < self.check_interval
+            ):
+                return
+            if self._version is not None and self._shared_version() == self._version:
+                self._checked_at = time.monotonic()
+                return
+            try:
+                self.load()
+            except Exception as e:
+                # DB loi: tiep tuc phuc vu snapshot cu, thu lai lan check sau
+                logger.error(f"Settings snapshot reload failed: {e}")
+                self._checked_at = time.monotonic()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._refresh_if_stale()
+        row = self._rows.get(key)
+        return row["value"] if row else default
+
+    def row(self, key: str) -> Optional[Dict[str, Any]]:
+        self._refresh_if_stale()
+        return self._rows.get(key)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        self._refresh_if_stale()
+        return [self._rows[key] for key in sorted(self._rows)]
+
+    def public(self) -> Dict[str, Any]:
+        self._refresh_if_stale()
+        return {
+            key: self._rows[key]["value"] if key in self._rows else default
+            for key, default in PUBLIC_SETTINGS.items()
+        }
+
+    def apply(self, row: SystemSetting):
+        """Goi sau khi commit upsert: cap nhat snapshot local va bao worker khac"""
+        rows = dict(self._rows)
+        rows[row.key] = _as_dict(row)
+        self._rows = rows
+        try:
+            version = self.shared.incr(SETTINGS_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Settings version bump failed: {e}")
+            return
+        # Worker khac cung vua ghi -> version nhay >1, nap lai o lan doc sau
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            self._version = None
+
+
+settings_snapshot = SettingsSnapshot()
+
+__all__ = [
+    "PUBLIC_SETTINGS",
+    "SETTINGS_VERSION_CHECK_INTERVAL",
+    "SETTINGS_VERSION_KEY",
+    "SettingsSnapshot",
+    "settings_snapshot",
+]
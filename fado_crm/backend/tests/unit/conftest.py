@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Shared unit-test fixtures: in-memory SQLite shared across threads, order builder and
+# snapshot/rebuild checks for incrementally maintained tables (rollup, RFM)
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models import Base, ChiTietDonHang, DonHang, TrangThaiDonHang
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def memory_engine():
+    """SQLite :memory: da tao schema; StaticPool -> moi thread/session dung chung 1 connection"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def memory_session(memory_engine):
+    session = sessionmaker(bind=memory_engine)()
+    yield session
+    session.close()
+
+
+def build_order(
+    id,
+    khach_hang_id,
+    ngay_tao,
+    lines=(),
+    trang_thai=TrangThaiDonHang.CHO_XAC_NHAN,
+    tong_tien=None,
+    phi=10.0,
+):
+    """Don hang id co dinh; lines = [(san_pham_id, so_luong, gia)], tong_tien mac dinh = hang + phi"""
+    if tong_tien is None:
+        tong_tien = sum(qty * price for _, qty, price in lines) + phi
+    return DonHang(
+        id=id,
+        ma_don_hang=f"DH{id}",
+        khach_hang_id=khach_hang_id,
+        ngay_tao=ngay_tao,
+        trang_thai=trang_thai,
+        tong_tien=tong_tien,
+        chi_tiet_list=[
+            ChiTietDonHang(san_pham_id=sp, so_luong=qty, gia_mua=price) for sp, qty, price in lines
+        ],
+    )
+
+
+class IncrementalTable:
+    """
+    Bang duy tri tang dan (rollup, RFM): snapshot cac cot can so sanh (bo cot thoi gian ghi)
+    va doi chieu voi ban rebuild tu dau.
+    key=None -> list tuple da sap xep; key="cot" -> dict {gia tri cot key: tuple cac cot con lai}
+    """
+
+    def __init__(self, table, columns, rebuild, key=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.rebuild = rebuild
+        self.key = key
+
+    def snapshot(self, db):
+        rows = db.execute(select(*(self.table.c[name] for name in self.columns))).all()
+        # Enum -> gia tri de sap xep duoc
+        rows = [tuple(getattr(v, "value", v) for v in row) for row in rows]
+        if self.key is None:
+            return sorted(rows)
+        index = self.columns.index(self.key)
+        return {row[index]: row[:index] + row[index + 1 :] for row in rows}
+
+    def assert_matches_rebuild(self, db):
+        incremental = self.snapshot(db)
+        self.rebuild(db)
+        assert incremental == self.snapshot(db)
+        return incremental
+
+
+@pytest.fixture
+def make_order():
+    return build_order
+
+
+@pytest.fixture
+def incremental_table():
+    return IncrementalTable
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Tests for memoized analytics sub-reports shared across composite reports
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import analytics_service
+from analytics_memo import analytics_memo, memo_scope
+from analytics_service import AdvancedAnalytics
+from models import ChiTietDonHang, DonHang, KhachHang, SanPham, TrangThaiDonHang
+from sqlalchemy import event
+
+
+@pytest.fixture
+def db(memory_engine, memory_session):
+    session = memory_session
+    an = KhachHang(ho_ten="An", email="an@fado.vn")
+    son = SanPham(ten_san_pham="Son", danh_muc="my_pham")
+    now = datetime.utcnow()
+    session.add_all([an, son])
+    for i in range(14):
+        session.add(
+            DonHang(
+                ma_don_hang=f"DH{i}",
+                khach_hang=an,
+                tong_tien=100.0 if i < 7 else 300.0,
+                trang_thai=TrangThaiDonHang.DA_NHAN,
+                ngay_tao=now - timedelta(days=13 - i),
+                chi_tiet_list=[ChiTietDonHang(san_pham=son, so_luong=1, gia_mua=90.0)],
+            )
+        )
+    session.commit()
+    queries = []
+    event.listen(memory_engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+    return session, queries
+
+
+def test_insights_reuse_dashboard_sub_reports(db):
+    session, queries = db
+    dashboard = AdvancedAnalytics(session).get_advanced_dashboard_data(30)
+    assert queries
+
+    queries.clear()
+    insights = AdvancedAnalytics(session).get_business_insights()
+    assert queries == []
+    titles = [insight["title"] for insight in insights["insights"]]
+    # Tuan nay 300/ngay so voi 100/ngay tuan truoc
+    assert " Doanh thu tang truong manh" in titles
+    top = dashboard["product_performance"]["top_products"][0]
+    assert insights["insights"][-1]["description"].startswith(top["name"])
+
+
+def test_commit_bumps_data_version(db):
+    session, queries = db
+    analytics = AdvancedAnalytics(session)
+    before = analytics.get_sales_overview(30)
+    assert analytics.get_sales_overview(date_range=30) is before
+
+    session.add(DonHang(ma_don_hang="DH-NEW", tong_tien=1000.0, ngay_tao=datetime.utcnow()))
+    # Ghi chua commit: khong dung memo (session thay du lieu cua chinh no)
+    assert analytics.get_sales_overview(30)["total_orders"] == before["total_orders"] + 1
+    session.commit()
+
+    queries.clear()
+    after = analytics.get_sales_overview(30)
+    assert len(queries) == 1
+    assert after["total_orders"] == before["total_orders"] + 1
+    assert after["total_revenue"] == before["total_revenue"] + 1000.0
+
+
+def test_request_scope_shares_results_without_window(db, monkeypatch):
+    session, queries = db
+    monkeypatch.setattr(analytics_memo, "ttl", 0)
+    analytics = AdvancedAnalytics(session)
+
+    with memo_scope():
+        first = analytics.get_customer_analytics()
+        queries.clear()
+        assert analytics.get_customer_analytics() is first
+        assert queries == []
+
+    analytics.get_customer_analytics()
+    assert queries
+
+
+def test_failed_sub_report_is_not_memoized(db, monkeypatch):
+    session, _ = db
+
+    def broken(dialect):
+        raise RuntimeError("dialect probe failed")
+
+    monkeypatch.setattr(analytics_service, "supports_aggregate_filter", broken)
+    assert AdvancedAnalytics(session).get_order_status_analytics() == {}
+
+    monkeypatch.undo()
+    assert AdvancedAnalytics(session).get_order_status_analytics()["total_orders"] == 14
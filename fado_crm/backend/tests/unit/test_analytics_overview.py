@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Tests for single-scan conditional aggregation in AdvancedAnalytics overviews
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import analytics_service
+from analytics_service import AdvancedAnalytics
+from models import DonHang, KhachHang, LoaiKhachHang, TrangThaiDonHang
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql
+
+
+@pytest.fixture(params=[True, False], ids=["filter", "case"])
+def db(request, monkeypatch, memory_engine, memory_session):
+    monkeypatch.setattr(analytics_service, "supports_aggregate_filter", lambda d: request.param)
+    session = memory_session
+    now = datetime.utcnow()
+    session.add_all(
+        [
+            KhachHang(id=1, ho_ten="An", email="an@fado.vn", loai_khach=LoaiKhachHang.VIP),
+            KhachHang(id=2, ho_ten="Binh", email="binh@fado.vn", ngay_tao=now - timedelta(days=90)),
+        ]
+    )
+    orders = [
+        # (so ngay truoc, tong tien, trang thai, so ngay xu ly)
+        (1, 100.0, TrangThaiDonHang.DA_NHAN, 2),
+        (5, 50.0, TrangThaiDonHang.DANG_SHIP, 1),
+        (6, 999.0, TrangThaiDonHang.HUY, 0),
+        (40, 75.0, TrangThaiDonHang.DA_NHAN, 4),
+        (90, 500.0, TrangThaiDonHang.DA_NHAN, 1),
+    ]
+    for i, (days_ago, total, status, processing) in enumerate(orders, start=1):
+        created = now - timedelta(days=days_ago)
+        session.add(
+            DonHang(
+                id=i,
+                ma_don_hang=f"DH{i}",
+                khach_hang_id=1,
+                tong_tien=total,
+                trang_thai=status,
+                ngay_tao=created,
+                ngay_cap_nhat=created + timedelta(days=processing),
+            )
+        )
+    session.commit()
+    queries = []
+    event.listen(memory_engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+    return session, queries
+
+
+def test_sales_overview_is_one_query(db):
+    session, queries = db
+    overview = AdvancedAnalytics(session).get_sales_overview(30)
+
+    assert len(queries) == 1
+    assert overview["total_revenue"] == 150.0
+    assert overview["total_orders"] == 3
+    assert overview["completed_orders"] == 1
+    assert overview["revenue_growth"] == 100.0
+
+
+def test_customer_and_status_overviews_are_single_scans(db):
+    session, queries = db
+    analytics = AdvancedAnalytics(session)
+
+    customers = analytics.get_customer_analytics()
+    # 1 lan quet khach_hang + top khach, churn, phan khuc RFM (doc customer_rfm)
+    assert len(queries) == 4
+    assert all("don_hang" not in sql for sql in queries)
+    assert customers["total_customers"] == 2
+    assert customers["type_distribution"] == {"moi": 1, "than_thiet": 0, "vip": 1, "blacklist": 0}
+    assert customers["new_customers_this_month"] == 1
+
+    queries.clear()
+    status = analytics.get_order_status_analytics()
+    assert len(queries) == 1
+    assert status["status_distribution"]["da_nhan"]["count"] == 3
+    assert status["processing_times"] == {"da_nhan": 2.33, "dang_ship": 1.0, "huy": 0.0}
+
+
+def test_aggregate_filter_dialect_support():
+    assert analytics_service.supports_aggregate_filter(postgresql.dialect())
+    assert not analytics_service.supports_aggregate_filter(mysql.dialect())
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Tests for NDJSON streaming of daily sales (server-side cursor + resume after last row)
+
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from analytics_stream import NDJSON_MEDIA_TYPE, iter_daily_sales, ndjson_response
+from models import KhachHang, SanPham, TrangThaiDonHang
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+DAY = date(2024, 2, 27)
+
+
+@pytest.fixture
+def factory(memory_engine, make_order):
+    factory = sessionmaker(bind=memory_engine)
+    with factory() as db:
+        db.add_all(
+            [
+                KhachHang(id=1, ho_ten="An", email="an@fado.vn"),
+                SanPham(id=1, ten_san_pham="Son", danh_muc="my_pham"),
+                SanPham(id=2, ten_san_pham="Tui", danh_muc="thoi_trang"),
+            ]
+        )
+        # Ngay 27/2 va 1/3 co don, 28-29/2 trong; don huy khong tinh
+        for id, offset, lines, trang_thai in [
+            (1, 0, [(1, 1, 100.0), (2, 2, 50.0)], TrangThaiDonHang.DA_NHAN),
+            (2, 3, [(2, 1, 40.0)], TrangThaiDonHang.DA_NHAN),
+            (3, 3, [(1, 5, 100.0)], TrangThaiDonHang.HUY),
+        ]:
+            ngay_tao = datetime(DAY.year, DAY.month, DAY.day, 12) + timedelta(days=offset)
+            db.add(make_order(id, 1, ngay_tao, lines, trang_thai, phi=0))
+        db.commit()
+    return factory
+
+
+def test_daily_rows_fill_gaps_and_resume_after_last_date(factory):
+    rows = list(iter_daily_sales(factory, DAY, DAY + timedelta(days=4)))
+    assert [(r["date"], r["revenue"], r["orders"]) for r in rows] == [
+        ("2024-02-27", 200.0, 1),
+        ("2024-02-28", 0.0, 0),
+        ("2024-02-29", 0.0, 0),
+        ("2024-03-01", 40.0, 1),
+        ("2024-03-02", 0.0, 0),
+    ]
+    assert rows[0]["units"] == 3 and rows[0]["unique_customers"] == 1
+
+    # Ngat sau dong thu 2 -> doc tiep sau date cua dong do, khong trung/thieu dong
+    resumed = list(
+        iter_daily_sales(factory, DAY, DAY + timedelta(days=4), after=DAY + timedelta(1))
+    )
+    assert rows[2:] == resumed
+
+
+def test_category_rows_resume_inside_a_day(factory):
+    rows = list(iter_daily_sales(factory, DAY, by_category=True))
+    assert [(r["date"], r["category"], r["revenue"]) for r in rows] == [
+        ("2024-02-27", "my_pham", 100.0),
+        ("2024-02-27", "thoi_trang", 100.0),
+        ("2024-03-01", "thoi_trang", 40.0),
+    ]
+    resumed = iter_daily_sales(factory, DAY, by_category=True, after=DAY, after_category="my_pham")
+    assert list(resumed) == rows[1:]
+
+    with pytest.raises(ValueError):
+        iter_daily_sales(factory, DAY, after_category="my_pham")
+
+
+def test_ndjson_response_streams_from_server_side_cursor(factory):
+    options = []
+    engine = factory.kw["bind"]
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *a: options.append(a[4].execution_options.get("stream_results")),
+    )
+    rows = iter_daily_sales(factory, DAY, DAY + timedelta(days=3))
+    # Chua doc DB cho den khi response bat dau gui
+    assert options == []
+
+    app = FastAPI()
+    app.get("/trend")(lambda: ndjson_response(rows))
+    response = TestClient(app).get("/trend")
+
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["date"] for line in lines] == [
+        "2024-02-27",
+        "2024-02-28",
+        "2024-02-29",
+        "2024-03-01",
+    ]
+    assert options == [True]
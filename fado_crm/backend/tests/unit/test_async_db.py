@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Tests for async database dependency on main_working CRUD/dashboard endpoints
+
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# main_working import theo kieu --app-dir backend (from database import ...)
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database
+import database_pool
+import main_working
+from models import Base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async_test.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(_create())
+
+    async def _override_db():
+        async with session_factory() as db:
+            yield db
+
+    main_working.app.dependency_overrides[database.get_async_db] = _override_db
+    main_working.app.dependency_overrides[database_pool.get_async_request_db] = _override_db
+    yield TestClient(main_working.app)
+    main_working.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def test_async_database_url_mapping():
+    assert database._async_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert (
+        database._async_database_url("postgresql://u:p@db:5432/fado")
+        == "postgresql+asyncpg://u:p@db:5432/fado"
+    )
+    assert (
+        database._async_database_url("postgresql+psycopg2://u:p@db/fado")
+        == "postgresql+asyncpg://u:p@db/fado"
+    )
+
+
+def test_customer_crud_and_dashboard_use_async_session(client):
+    r = client.post("/khach-hang/", json={"ho_ten": "Nguyen Van A", "email": "a@fado.vn"})
+    assert r.status_code == 200
+    customer_id = r.json()["id"]
+
+    r = client.post("/khach-hang/", json={"ho_ten": "Trung Email", "email": "a@fado.vn"})
+    assert r.status_code == 400
+
+    r = client.put(f"/khach-hang/{customer_id}", json={"ho_ten": "Nguyen Van B"})
+    assert r.status_code == 200
+    assert r.json()["ho_ten"] == "Nguyen Van B"
+
+    r = client.get("/khach-hang/", params={"search": "Van B"})
+    assert [c["id"] for c in r.json()] == [customer_id]
+
+    r = client.get("/dashboard")
+    assert r.status_code == 200
+    assert r.json()["tong_khach_hang"] == 1
+    assert r.json()["tong_don_hang"] == 0
+
+
+def test_missing_order_returns_404(client):
+    assert client.get("/don-hang/999").status_code == 404
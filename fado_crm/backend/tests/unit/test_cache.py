@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Tests for the two-tier cache (bounded LRU in front of Redis)
+
+import os
+import sys
+import time
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from cache import LRUCache, RedisCache, TwoTierCache
+
+
+class _FakeRedis:
+    """Redis toi thieu trong bo nho, dem so round trip"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self.published = []
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def publish(self, channel, payload):
+        self.published.append(payload)
+
+    def pipeline(self):
+        client = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def get(self, key):
+                self.ops.append(lambda: client.get(key))
+
+            def ttl(self, key):
+                self.ops.append(lambda: 60)
+
+            def execute(self):
+                return [op() for op in self.ops]
+
+        return _Pipe()
+
+
+def test_lru_is_bounded_and_expires():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    lru.get("a")  # a moi dung -> b bi day ra
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert lru.get("a") == "1" and lru.get("c") == "3"
+    assert lru.evictions == 1
+
+
+def test_lru_drops_expired_entries_first():
+    lru = LRUCache(max_entries=2)
+    lru.set("short", "x", ex=1)
+    lru.set("long", "y", ex=60)
+    lru._store["short"] = ("x", time.time() - 1)  # gia lap het han
+    assert lru.get("short") is None
+
+    lru.set("old", "z", ex=1)
+    lru._store["old"] = ("z", time.time() - 1)
+    lru.set("new", "w")
+    # Entry het han bi bo truoc, "long" con song du nam o dau LRU
+    assert lru.get("long") == "y" and lru.get("new") == "w"
+    assert lru.evictions == 0
+
+
+def test_lru_expiry_sweep_is_amortized():
+    lru = LRUCache(max_entries=3)
+    for key in ("a", "b", "c", "d"):
+        lru.set(key, key, ex=60)
+    assert list(lru._store) == ["b", "c", "d"]
+    lru._store["c"] = ("c", time.time() - 1)
+
+    # Day: chi bo dau LRU, khong quet ca store moi lan set
+    lru.set("e", "e", ex=60)
+    assert list(lru._store) == ["c", "d", "e"]
+    # Entry het han o dau LRU bi bo nhung khong tinh la eviction
+    lru.set("f", "f", ex=60)
+    assert list(lru._store) == ["d", "e", "f"]
+    assert lru.evictions == 2
+
+
+def test_two_tier_serves_hot_keys_from_memory():
+    client = _FakeRedis()
+    cache = TwoTierCache(RedisCache(client=client), listen=False)
+    client.data["settings:public"] = '{"theme": "dark"}'
+
+    assert cache.get("settings:public") == '{"theme": "dark"}'
+    calls = client.calls
+    for _ in range(5):
+        assert cache.get("settings:public") == '{"theme": "dark"}'
+    assert client.calls == calls
+    assert cache.l1.stats()["hits"] == 5
+
+
+def test_writes_invalidate_other_workers():
+    client = _FakeRedis()
+    worker_a = TwoTierCache(RedisCache(client=client), listen=False)
+    worker_b = TwoTierCache(RedisCache(client=client), listen=False)
+    worker_a.set("dashboard", "v1", ex=60)
+    assert worker_b.get("dashboard") == "v1"
+
+    worker_a.set("dashboard", "v2", ex=60)
+    for payload in client.published:
+        worker_b.handle_invalidation(payload)
+    assert worker_b.get("dashboard") == "v2"
+
+    worker_a.delete("dashboard")
+    worker_b.handle_invalidation(client.published[-1])
+    assert worker_b.get("dashboard") is None
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Tests for the binary cache codec (type round-trip, compression, stats)
+
+import json
+import os
+import sys
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import cache_codec
+from cache import LRUCache
+from cache_codec import CacheCodec
+from database_pool import QueryCache, binary_client_for
+from models import TrangThaiDonHang
+
+SERIALIZERS = [
+    name
+    for name, module in (
+        ("json", json),
+        ("orjson", cache_codec.orjson),
+        ("msgpack", cache_codec.msgpack),
+    )
+    if module is not None
+]
+
+PAYLOAD = {
+    "ngay": datetime(2024, 5, 1, 8, 30),
+    "thang": date(2024, 5, 1),
+    "doanh_thu": Decimal("1234567.89"),
+    "trang_thai": TrangThaiDonHang.DA_NHAN,
+    "ma": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "rows": [{"id": 1, "ngay": datetime(2024, 1, 2)}, {"id": 2, "ten": "Nguyễn"}],
+}
+
+
+@pytest.mark.parametrize("serializer", SERIALIZERS)
+def test_round_trips_rich_types(serializer):
+    codec = CacheCodec(serializer, "none")
+    value = codec.loads(codec.dumps(PAYLOAD))
+    assert value == PAYLOAD
+    assert value["trang_thai"] is TrangThaiDonHang.DA_NHAN
+
+
+def test_compresses_only_above_threshold():
+    codec = CacheCodec("json", "zlib", compress_min_bytes=1024)
+    small = codec.dumps({"a": 1})
+    big_value = {"rows": [{"ten": "khach hang", "id": i} for i in range(500)]}
+    big = codec.dumps(big_value)
+
+    assert len(big) < len(json.dumps(big_value)) / 5
+    assert codec.loads(big) == big_value and codec.loads(small) == {"a": 1}
+    stats = codec.stats.snapshot()
+    assert stats["json"]["encodes"] == 1
+    assert stats["json+zlib"]["compression_ratio"] > 5
+    assert stats["json+zlib"]["decodes"] == 1
+
+
+def test_reads_legacy_json_entries():
+    assert CacheCodec().loads('{"value": 1, "fresh_until": 0}') == {"value": 1, "fresh_until": 0}
+
+
+def test_query_cache_keeps_types():
+    qc = QueryCache(backend=LRUCache(max_entries=10))
+    qc.enabled = True
+    qc.set("report", PAYLOAD, ttl=60)
+    assert qc.get("report") == PAYLOAD
+    assert qc.stats()["codecs"]
+
+
+def test_binary_client_mirrors_text_client():
+    redis = pytest.importorskip("redis")
+    text_client = redis.Redis.from_url("redis://cache:6380/3", decode_responses=True)
+    binary = binary_client_for(text_client)
+    kwargs = binary.connection_pool.connection_kwargs
+    assert binary is not text_client
+    assert kwargs["decode_responses"] is False
+    assert (kwargs["host"], kwargs["port"], kwargs["db"]) == ("cache", 6380, 3)
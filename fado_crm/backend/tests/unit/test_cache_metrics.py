@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Tests for per-prefix cache hit/miss, fill latency, payload size and eviction metrics
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import cache
+import database_pool
+from cache import LRUCache
+from cache_metrics import CacheMetrics, key_prefix
+from database_pool import QueryCache, cached_query
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = CacheMetrics()
+    monkeypatch.setattr(database_pool, "cache_metrics", metrics)
+    monkeypatch.setattr(cache, "cache_metrics", metrics)
+    qc = QueryCache(backend=LRUCache(max_entries=100))
+    qc.enabled = True
+    monkeypatch.setattr(database_pool, "query_cache", qc)
+    return metrics
+
+
+def test_key_prefix():
+    assert key_prefix("query_cache:doanh_thu:ab12") == "doanh_thu"
+    assert key_prefix("settings:public") == "settings"
+    assert key_prefix(b"dashboard") == "dashboard"
+
+
+def test_cached_query_records_per_prefix(metrics):
+    @cached_query(ttl=60)
+    def doanh_thu():
+        return {"rows": list(range(100))}
+
+    @cached_query(ttl=60)
+    def top_khach_hang():
+        return []
+
+    for _ in range(3):
+        doanh_thu()
+    top_khach_hang()
+
+    stats = metrics.snapshot()
+    assert stats["doanh_thu"]["hits"] == 2 and stats["doanh_thu"]["misses"] == 1
+    assert stats["doanh_thu"]["fills"] == 1
+    assert stats["doanh_thu"]["avg_payload_bytes"] > stats["top_khach_hang"]["avg_payload_bytes"]
+    assert stats["top_khach_hang"]["hit_ratio"] == 0.0
+
+
+def test_evictions_are_attributed_to_prefix(metrics):
+    lru = LRUCache(max_entries=2)
+    lru.set("query_cache:doanh_thu:1", "a")
+    lru.set("query_cache:doanh_thu:2", "b")
+    lru.set("settings:public", "c")
+    assert metrics.snapshot()["doanh_thu"]["evictions"] == 1
+
+
+def test_prometheus_exposition(metrics):
+    metrics.record_hit('bad"prefix')
+    metrics.record_fill("doanh_thu", 0.5)
+    text = metrics.prometheus()
+    assert "# TYPE fado_cache_hits_total counter" in text
+    assert 'fado_cache_hits_total{prefix="bad\\"prefix"} 1' in text
+    assert 'fado_cache_fill_seconds_sum{prefix="doanh_thu"} 0.5' in text
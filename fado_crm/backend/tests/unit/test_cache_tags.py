@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Tests for tag-based cache invalidation driven by ORM writes
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import cache_invalidation
+from cache import LRUCache
+from models import Base, DonHang, KhachHang, SanPham
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def lru(monkeypatch):
+    lru = LRUCache(max_entries=100)
+    monkeypatch.setattr(cache_invalidation, "_caches", [lru])
+    return lru
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    an = KhachHang(ho_ten="An", email="an@fado.vn")
+    session.add_all([an, SanPham(ten_san_pham="Nike", gia_ban=1e6)])
+    session.add(DonHang(ma_don_hang="FADO1", khach_hang=an))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_lru_invalidates_only_tagged_keys():
+    lru = LRUCache(max_entries=10)
+    lru.set("orders:42", "a", tags=["customer:42", "table:don_hang"])
+    lru.set("orders:7", "b", tags=["customer:7"])
+    lru.set("untagged", "c")
+
+    assert lru.invalidate_tags(["customer:42"]) == {"orders:42"}
+    assert lru.get("orders:42") is None
+    assert lru.get("orders:7") == "b" and lru.get("untagged") == "c"
+    # Tag cua key da xoa cung duoc don, khong ro ri bo nho
+    assert lru.stats()["tags"] == 1
+
+
+def test_commit_invalidates_entity_and_parent_tags(lru, db):
+    customer = db.query(KhachHang).one()
+    order = db.query(DonHang).one()
+    lru.set("customer", "x", tags=[f"customer:{customer.id}"])
+    lru.set("order", "y", tags=[f"order:{order.id}"])
+    lru.set("products", "z", tags=["table:san_pham"])
+
+    order.ghi_chu_noi_bo = "giao gap"
+    db.flush()
+    # Chua commit -> cache van phuc vu gia tri cu cho den khi ghi thanh cong
+    assert lru.get("customer") == "x"
+
+    db.commit()
+    assert lru.get("customer") is None and lru.get("order") is None
+    assert lru.get("products") == "z"
+
+
+def test_rollback_keeps_cache(lru, db):
+    lru.set("customers", "x", tags=["table:khach_hang"])
+    db.add(KhachHang(ho_ten="Binh", email="binh@fado.vn"))
+    db.flush()
+    db.rollback()
+    assert lru.get("customers") == "x"
+
+
+def test_bulk_statement_invalidates_table_tag(lru, db):
+    lru.set("orders", "x", tags=["table:don_hang"])
+    db.execute(update(DonHang).values(ghi_chu_noi_bo="bulk"))
+    db.commit()
+    assert lru.get("orders") is None
+
+
+def test_fill_started_before_commit_is_not_stored(lru, db):
+    # Fill doc DB truoc khi commit invalidate tag -> ket qua cu khong duoc ghi vao cache
+    stamp = lru.tag_stamp(["table:don_hang"])
+    db.query(DonHang).one().ghi_chu_noi_bo = "moi"
+    db.commit()
+    assert lru.set("orders", "cu", tags=["table:don_hang"], stamp=stamp) is False
+    assert lru.get("orders") is None
+
+    # Fill bat dau sau commit va tag khong lien quan van ghi binh thuong
+    assert lru.set("orders", "moi", tags=["table:don_hang"], stamp=lru.tag_stamp()) is True
+    assert lru.set("products", "z", tags=["table:san_pham"], stamp=stamp) is True
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# Tests for scheduled cache warm-up and cached_query.refresh()
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import cache_warmup
+import database_pool
+from cache import LRUCache
+from cache_warmup import CacheWarmer, register_warmup
+from database_pool import QueryCache, cached_query
+from models import DonHang, KhachHang
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def qc(monkeypatch):
+    qc = QueryCache(backend=LRUCache(max_entries=100))
+    qc.enabled = True
+    monkeypatch.setattr(database_pool, "query_cache", qc)
+    return qc
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(cache_warmup, "_jobs", {})
+    monkeypatch.setattr(cache_warmup, "CACHE_WARMUP_JOBS", [])
+    return cache_warmup._jobs
+
+
+def test_refresh_overwrites_fresh_entry_and_shares_key(qc):
+    version = {"n": 1}
+
+    @cached_query(ttl=60, cache_key_params=["days"])
+    def revenue(db, days=30):
+        return {"days": days, "n": version["n"]}
+
+    assert revenue(None) == {"days": 30, "n": 1}
+    version["n"] = 2
+    # Positional, keyword va mac dinh cung 1 key -> refresh thay gia tri user dang doc
+    assert revenue.refresh(None, 30) is True
+    assert revenue(None, days=30) == {"days": 30, "n": 2}
+    assert revenue(None, 7) == {"days": 7, "n": 2}
+
+
+def test_refresh_skips_key_leased_by_other_worker(qc):
+    @cached_query(ttl=60)
+    def insights(db):
+        return "computed"
+
+    token = qc.acquire_lease("insights:{}")
+    assert insights.refresh(None) is False
+    qc.release_lease("insights:{}", token)
+    assert insights.refresh(None) is True
+
+
+def test_warm_up_reports_duration_and_isolates_failures(jobs):
+    calls = []
+    register_warmup("ok", lambda db: calls.append(db) or True)
+    register_warmup("busy", lambda db: False)
+    register_warmup("broken", lambda db: 1 / 0)
+
+    class FakeSession:
+        def rollback(self):
+            calls.append("rollback")
+
+    warmer = CacheWarmer(session_factory=None)
+    report = warmer.warm_up(FakeSession())
+
+    assert report["jobs"]["ok"] == {
+        "ok": True,
+        "refreshed": True,
+        "error": None,
+        "duration_ms": report["jobs"]["ok"]["duration_ms"],
+    }
+    assert report["jobs"]["busy"]["refreshed"] is False
+    assert (
+        report["jobs"]["broken"]["ok"] is False and "division" in report["jobs"]["broken"]["error"]
+    )
+    assert calls[-1] == "rollback" and report["duration_ms"] >= 0
+    assert warmer.status()["runs"] == 1
+    # CACHE_WARMUP_JOBS / jobs= chi chay cac job duoc chon
+    assert list(CacheWarmer(None, jobs=["busy", "missing"]).warm_up(FakeSession())["jobs"]) == [
+        "busy"
+    ]
+
+
+def test_next_delay_stays_within_jitter():
+    warmer = CacheWarmer(None, interval=100, jitter=0.2)
+    delays = [warmer.next_delay() for _ in range(200)]
+    assert all(80 <= d <= 120 for d in delays) and len(set(delays)) > 1
+
+
+def test_run_forever_warms_at_startup_and_on_trigger(jobs, qc, memory_engine):
+    import analytics_service
+
+    # Job chay tren thread rieng -> in-memory sqlite (StaticPool) dung chung 1 connection
+    factory = sessionmaker(bind=memory_engine)
+    with factory() as db:
+        an = KhachHang(ho_ten="An", email="an@fado.vn")
+        db.add_all([an, DonHang(ma_don_hang="FADO1", khach_hang=an, tong_tien=500000)])
+        db.commit()
+
+    async def scenario():
+        register_warmup(
+            "analytics_dashboard",
+            lambda db: analytics_service.get_analytics_data.refresh(db, date_range=30),
+        )
+        warmer = CacheWarmer(factory, interval=3600, jitter=0)
+        task = asyncio.create_task(warmer.run_forever())
+        try:
+            while warmer.runs < 1:
+                await asyncio.sleep(0.01)
+            warmer.trigger()
+            while warmer.runs < 2:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+        return warmer
+
+    warmer = asyncio.run(scenario())
+    assert warmer.last_run["jobs"]["analytics_dashboard"]["refreshed"] is True
+    cached = qc.get('get_analytics_data:{"date_range": 30}')
+    assert cached["sales_overview"]["total_revenue"] == 500000
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Tests for cached_query stampede protection (single-flight, stale-while-revalidate, early refresh)
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database_pool
+from cache import LRUCache
+from database_pool import CacheEntry, QueryCache, cached_query
+
+
+@pytest.fixture
+def qc(monkeypatch):
+    qc = QueryCache(backend=LRUCache(max_entries=100))
+    qc.enabled = True
+    monkeypatch.setattr(database_pool, "query_cache", qc)
+    return qc
+
+
+def _expire(qc, signature):
+    """Day entry sang trang thai stale (het fresh nhung con trong cua so stale)"""
+    entry = qc.get_entry(signature)
+    stale = {"value": entry.value, "fresh_until": time.time() - 1, "delta": entry.delta}
+    qc.backend.set(qc._generate_cache_key(signature), qc.codec.dumps(stale), ex=60)
+
+
+def test_concurrent_misses_compute_once(qc):
+    calls = []
+
+    @cached_query(ttl=60)
+    def stats():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"tong": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(stats())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"tong": 42}] * 8
+
+
+def test_stale_value_served_while_other_worker_revalidates(qc):
+    version = {"n": 1}
+
+    @cached_query(ttl=60)
+    def stats():
+        return version["n"]
+
+    assert stats() == 1
+    version["n"] = 2
+    _expire(qc, "stats:{}")
+    assert qc.get("stats:{}") is None  # het fresh
+
+    # Worker khac dang giu lease -> tra gia tri cu, khong tinh lai
+    token = qc.acquire_lease("stats:{}")
+    assert stats() == 1
+    qc.release_lease("stats:{}", token)
+
+    # Lease trong -> caller nay tinh lai
+    assert stats() == 2
+    assert qc.get("stats:{}") == 2
+
+
+def test_waits_for_other_worker_instead_of_recomputing(qc):
+    calls = []
+
+    @cached_query(ttl=60)
+    def stats():
+        calls.append(1)
+        return "tu tinh"
+
+    token = qc.acquire_lease("stats:{}")
+
+    def other_worker():
+        time.sleep(0.2)
+        qc.set("stats:{}", "worker khac", ttl=60)
+        qc.release_lease("stats:{}", token)
+
+    threading.Thread(target=other_worker).start()
+    assert stats() == "worker khac"
+    assert calls == []
+
+
+def test_concurrent_misses_share_leader_error(qc):
+    calls = []
+
+    @cached_query(ttl=60)
+    def stats():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError("db down")
+
+    errors = []
+
+    def call():
+        try:
+            stats()
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert errors == ["db down"] * 4
+    assert qc._flights == {}
+
+
+def test_follower_computes_locally_when_leader_hangs(qc, monkeypatch):
+    monkeypatch.setattr(database_pool, "CACHE_LEASE_WAIT", 0.1)
+    calls = []
+
+    @cached_query(ttl=60)
+    def stats():
+        calls.append(1)
+        return "tu tinh"
+
+    # Leader cung process dang tinh nhung khong bao gio xong
+    flight, leader = qc.join_flight("stats:{}")
+    assert leader
+    start = time.time()
+    assert stats() == "tu tinh"
+    assert time.time() - start < 1
+    assert calls == [1]
+    qc.finish_flight("stats:{}", flight)
+
+
+def test_event_loop_callers_do_not_wait_for_lease(qc):
+    calls = []
+
+    @cached_query(ttl=60)
+    def stats():
+        calls.append(1)
+        return "tu tinh"
+
+    token = qc.acquire_lease("stats:{}")
+
+    async def handler():
+        return stats()
+
+    start = time.time()
+    assert asyncio.run(handler()) == "tu tinh"
+    # Khong poll lease CACHE_LEASE_WAIT giay tren event loop
+    assert time.time() - start < 1
+    assert calls == [1]
+    qc.release_lease("stats:{}", token)
+
+
+def test_early_refresh_probability():
+    now = time.time()
+    # Query re (delta=0) khong bao gio tinh som
+    assert not CacheEntry("v", now + 1, 0.0).should_refresh_early(now=now)
+    # Con xa han so voi thoi gian tinh -> gan nhu khong tinh som
+    far = CacheEntry("v", now + 3600, 0.01)
+    assert not any(far.should_refresh_early(now=now) for _ in range(100))
+    # Sat han va query ton thoi gian -> phan lon caller se tinh som
+    near = CacheEntry("v", now + 0.1, 5.0)
+    assert sum(near.should_refresh_early(now=now) for _ in range(100)) > 80
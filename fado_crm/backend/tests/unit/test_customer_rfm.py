@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Tests for the incrementally maintained customer_rfm table
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from analytics_service import AdvancedAnalytics
+from customer_rfm import age_customer_rfm, read_rfm_segments, rebuild_customer_rfm
+from models import CustomerRFM, DonHang, KhachHang, TrangThaiDonHang
+from sqlalchemy import event
+
+NOW = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+RFM_COLUMNS = ("khach_hang_id", "order_count", "monetary", "recency_days", "aged_on", "segment")
+
+
+@pytest.fixture
+def session(memory_session):
+    memory_session.add_all(
+        [KhachHang(id=i, ho_ten=f"KH{i}", email=f"kh{i}@fado.vn") for i in (1, 2, 3)]
+    )
+    memory_session.commit()
+    return memory_session
+
+
+@pytest.fixture
+def rfm(incremental_table):
+    return incremental_table(
+        CustomerRFM.__table__, RFM_COLUMNS, rebuild_customer_rfm, key="khach_hang_id"
+    )
+
+
+@pytest.fixture
+def order(make_order):
+    def order(id, khach_hang_id, days_ago, tong_tien, trang_thai=TrangThaiDonHang.DA_NHAN):
+        ngay_tao = NOW - timedelta(days=days_ago)
+        return make_order(id, khach_hang_id, ngay_tao, trang_thai=trang_thai, tong_tien=tong_tien)
+
+    return order
+
+
+def test_order_writes_keep_rfm_equal_to_rebuild(session, order, rfm):
+    today = NOW.date()
+    session.add_all(
+        [
+            order(1, 1, 0, 100.0),
+            order(2, 1, 10, 50.0),
+            order(3, 1, 20, 25.0),
+            order(4, 2, 5, 300.0),
+            order(5, 3, 90, 80.0),
+            order(6, 3, 1, 999.0, TrangThaiDonHang.HUY),
+        ]
+    )
+    session.commit()
+    rows = rfm.assert_matches_rebuild(session)
+    assert rows == {
+        1: (3, 175.0, 0, today, "loyal"),
+        2: (1, 300.0, 5, today, "new"),
+        # Don huy khong tinh
+        3: (1, 80.0, 90, today, "at_risk"),
+    }
+
+    # Huy don, chuyen don sang khach khac, xoa don
+    session.get(DonHang, 1).trang_thai = TrangThaiDonHang.HUY
+    session.get(DonHang, 4).khach_hang_id = 3
+    session.commit()
+    rows = rfm.assert_matches_rebuild(session)
+    assert rows[1] == (2, 75.0, 10, today, "occasional")
+    assert 2 not in rows
+    assert rows[3] == (2, 380.0, 5, today, "occasional")
+
+    session.delete(session.get(DonHang, 5))
+    session.commit()
+    assert rfm.assert_matches_rebuild(session)[3] == (1, 300.0, 5, today, "new")
+
+
+def test_nightly_aging_moves_recency_and_segments(session, order, rfm):
+    session.add_all([order(1, 1, 0, 100.0), order(2, 2, 40, 60.0)])
+    session.commit()
+    today = NOW.date()
+
+    assert age_customer_rfm(session, today) == 0
+    assert age_customer_rfm(session, today + timedelta(days=25)) == 2
+    rows = rfm.snapshot(session)
+    assert rows[1][2:] == (25, today + timedelta(days=25), "new")
+    assert rows[2][2:] == (65, today + timedelta(days=25), "at_risk")
+
+    # Chay lai trong cung ngay: khong doi gi; don moi cua khach da age tinh lai tu dau
+    assert age_customer_rfm(session, today + timedelta(days=25)) == 0
+    session.add(order(3, 2, 0, 40.0))
+    session.commit()
+    assert rfm.snapshot(session)[2] == (2, 100.0, 0, today, "occasional")
+
+
+def test_segmentation_and_churn_readers_use_rfm(session, order):
+    for i in range(4):
+        session.add(order(i + 1, 1, 70 + i, 500.0))
+    session.add(order(5, 2, 2, 100.0))
+    session.commit()
+
+    queries = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: queries.append(a[2]))
+    customers = AdvancedAnalytics(session).get_customer_analytics()
+
+    # Quet khach_hang cho tong so/phan bo loai; con lai doc customer_rfm
+    assert all("don_hang" not in sql for sql in queries)
+    assert [c["id"] for c in customers["top_customers"]] == [1, 2]
+    assert customers["top_customers"][0]["total_spent"] == 2000.0
+    assert customers["churn_risk"] == [
+        {
+            "id": 1,
+            "name": "KH1",
+            "type": "moi",
+            "days_inactive": 70,
+            "order_count": 4,
+            "lifetime_value": 2000.0,
+        }
+    ]
+    assert list(customers["rfm_segments"]) == ["new", "at_risk"]
+    assert read_rfm_segments(session)["at_risk"]["avg_monetary"] == 2000.0
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Tests for event-maintained dashboard counters and their reconciliation
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from dashboard_counters import read_dashboard_counters, reconcile_dashboard_counters
+from models import Base, DonHang, KhachHang, TrangThaiDonHang
+from query_counter import count_queries
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _seed(db):
+    last_month = datetime.utcnow().replace(day=1) - timedelta(days=1)
+    old_customer = KhachHang(ho_ten="Cu", email="cu@fado.vn", ngay_tao=last_month)
+    new_customer = KhachHang(ho_ten="Moi", email="moi@fado.vn")
+    db.add_all(
+        [
+            DonHang(ma_don_hang="FADO1", khach_hang=new_customer, tong_tien=100.0),
+            DonHang(
+                ma_don_hang="FADO2",
+                khach_hang=new_customer,
+                tong_tien=50.0,
+                trang_thai=TrangThaiDonHang.DA_NHAN,
+            ),
+            DonHang(
+                ma_don_hang="FADO3", khach_hang=old_customer, tong_tien=70.0, ngay_tao=last_month
+            ),
+        ]
+    )
+    db.commit()
+
+
+def test_counters_follow_inserts_and_updates(db):
+    _seed(db)
+    assert read_dashboard_counters(db) == {
+        "tong_khach_hang": 2,
+        "tong_don_hang": 3,
+        "doanh_thu_thang": 150.0,
+        "don_cho_xu_ly": 2,
+        "khach_moi_thang": 1,
+    }
+
+    order = db.query(DonHang).filter_by(ma_don_hang="FADO1").one()
+    order.trang_thai = TrangThaiDonHang.HUY
+    db.commit()
+    stats = read_dashboard_counters(db)
+    assert stats["doanh_thu_thang"] == 50.0
+    assert stats["don_cho_xu_ly"] == 1
+
+    db.delete(db.query(DonHang).filter_by(ma_don_hang="FADO2").one())
+    db.commit()
+    stats = read_dashboard_counters(db)
+    assert stats["tong_don_hang"] == 2
+    assert stats["doanh_thu_thang"] == 0.0
+
+
+def test_dashboard_read_is_single_query(db):
+    _seed(db)
+    with count_queries() as counter:
+        read_dashboard_counters(db)
+    assert counter.count == 1
+
+
+def test_reconcile_fixes_drift_from_bulk_updates(db):
+    _seed(db)
+    # Bulk UPDATE khong qua mapper events -> counter lech
+    db.execute(update(DonHang).values(trang_thai=TrangThaiDonHang.HUY))
+    db.commit()
+    assert read_dashboard_counters(db)["doanh_thu_thang"] == 150.0
+
+    expected = reconcile_dashboard_counters(db)
+    assert expected["doanh_thu_thang"] == 0.0
+    assert expected["don_cho_xu_ly"] == 0
+    assert read_dashboard_counters(db) == expected
+
+
+def test_flush_applies_counter_deltas_in_one_statement(db):
+    _seed(db)
+    customer = db.query(KhachHang).filter_by(email="moi@fado.vn").one()
+    db.add_all(
+        [DonHang(ma_don_hang=f"FADO{i}", khach_hang=customer, tong_tien=10.0) for i in range(4, 9)]
+    )
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    db.flush()
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+    # 5 don cung khach + cung thang -> 1 UPSERT cho ca flush, khong phai 1 cau moi key moi dong
+    assert sum("dashboard_counters" in statement for statement in statements) == 1
+    db.commit()
+    assert read_dashboard_counters(db)["tong_don_hang"] == 8
+    assert read_dashboard_counters(db)["doanh_thu_thang"] == 200.0
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Tests for running dashboard sections concurrently with per-section errors and timeout
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import analytics_service
+import database_pool
+from analytics_service import AdvancedAnalytics, run_dashboard_sections, section_session_factory
+from cache import LRUCache
+from database_pool import QueryCache
+from models import Base, DonHang, KhachHang, TrangThaiDonHang
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def session(tmp_path):
+    # File SQLite (QueuePool) -> moi section lay connection rieng
+    engine = create_engine(f"sqlite:///{tmp_path / 'dashboard.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    an = KhachHang(ho_ten="An", email="an@fado.vn")
+    db.add_all(
+        [
+            an,
+            DonHang(
+                ma_don_hang="DH1",
+                khach_hang=an,
+                tong_tien=500000,
+                trang_thai=TrangThaiDonHang.DA_NHAN,
+                ngay_tao=datetime.utcnow(),
+            ),
+        ]
+    )
+    db.commit()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def _sleep_section(seconds, value=None):
+    def section(analytics, date_range):
+        time.sleep(seconds)
+        return value
+
+    return section
+
+
+def test_dashboard_sections_match_sequential_results(session):
+    assert section_session_factory(session) is not None
+    data = AdvancedAnalytics(session).get_advanced_dashboard_data(30)
+
+    analytics = AdvancedAnalytics(session)
+    assert "section_errors" not in data
+    assert set(data["section_timings_ms"]) == set(analytics_service.DASHBOARD_SECTIONS)
+    assert data["sales_overview"] == analytics.get_sales_overview(30)
+    assert data["order_status"] == analytics.get_order_status_analytics()
+    assert data["customer_analytics"]["total_customers"] == 1
+
+
+def test_sections_run_concurrently_on_own_sessions(session):
+    seen = []
+    lock = threading.Lock()
+
+    def section(analytics, date_range):
+        with lock:
+            seen.append(analytics.db_session)
+        time.sleep(0.3)
+        return date_range
+
+    start = time.perf_counter()
+    results, errors, _ = run_dashboard_sections(
+        session, 7, sections={name: section for name in "abcd"}, timeout=5
+    )
+    elapsed = time.perf_counter() - start
+
+    assert results == {"a": 7, "b": 7, "c": 7, "d": 7} and errors == {}
+    # Gan section cham nhat (0.3s), khong phai tong (1.2s)
+    assert elapsed < 0.9
+    assert len({id(db) for db in seen}) == 4 and session not in seen
+
+
+def test_failed_and_slow_sections_give_partial_results(session):
+    def boom(analytics, date_range):
+        raise ValueError("section exploded")
+
+    start = time.perf_counter()
+    results, errors, timings = run_dashboard_sections(
+        session,
+        sections={"ok": _sleep_section(0, "done"), "boom": boom, "slow": _sleep_section(1.0)},
+        timeout=0.2,
+    )
+
+    assert time.perf_counter() - start < 0.8
+    assert results == {"ok": "done", "boom": None, "slow": None}
+    assert errors["boom"] == "section exploded"
+    assert errors["slow"].startswith("timeout")
+    assert set(timings) == {"ok"}
+
+
+def test_single_connection_pool_runs_sequentially_on_caller_session(memory_session):
+    db = memory_session
+    assert section_session_factory(db) is None
+    results, errors, _ = run_dashboard_sections(
+        db, sections={"db": lambda analytics, date_range: analytics.db_session}
+    )
+    assert results["db"] is db and errors == {}
+
+
+def test_partial_dashboard_is_not_cached(session, monkeypatch):
+    qc = QueryCache(backend=LRUCache(max_entries=100))
+    qc.enabled = True
+    monkeypatch.setattr(database_pool, "query_cache", qc)
+
+    def boom(analytics, date_range):
+        raise RuntimeError("replica down")
+
+    monkeypatch.setattr(
+        analytics_service,
+        "DASHBOARD_SECTIONS",
+        {**analytics_service.DASHBOARD_SECTIONS, "order_status": boom},
+    )
+    data = analytics_service.get_analytics_data(session, date_range=30)
+    assert data["order_status"] is None and data["section_errors"] == {
+        "order_status": "replica down"
+    }
+    assert data["sales_overview"]["total_revenue"] == 500000
+    assert qc.get('get_analytics_data:{"date_range": 30}') is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(database_pool, "query_cache", qc)
+    analytics_service.get_analytics_data(session, date_range=30)
+    assert qc.get('get_analytics_data:{"date_range": 30}')["order_status"]["total_orders"] == 1
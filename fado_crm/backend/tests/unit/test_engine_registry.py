@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Tests for the unified engine registry and read-replica session routing
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from engine_registry import EngineRegistry
+from models import Base, KhachHang
+from sqlalchemy import func, select
+
+
+def _database(path, name):
+    url = f"sqlite:///{path}"
+    registry = EngineRegistry(database_url=url, replica_urls=[])
+    Base.metadata.create_all(bind=registry.primary)
+    with registry.session() as db:
+        db.add(KhachHang(ho_ten=name, email=f"{name}@fado.vn"))
+        db.commit()
+    registry.dispose()
+    return url
+
+
+@pytest.fixture
+def registry(tmp_path):
+    # Moi DB co 1 khach hang khac ten de biet query chay o dau
+    primary = _database(tmp_path / "primary.db", "primary")
+    replicas = [_database(tmp_path / f"replica{i}.db", f"replica{i}") for i in range(2)]
+    registry = EngineRegistry(database_url=primary, replica_urls=replicas)
+    yield registry
+    registry.dispose()
+    asyncio.run(registry.dispose_async())
+
+
+def _names(db):
+    return [k.ho_ten for k in db.scalars(select(KhachHang))]
+
+
+def test_default_sessions_use_primary(registry):
+    with registry.session() as db:
+        assert _names(db) == ["primary"]
+
+
+def test_replica_purposes_round_robin(registry):
+    seen = []
+    for purpose in ("analytics", "export", "search"):
+        with registry.session(purpose) as db:
+            seen.extend(_names(db))
+    assert seen == ["replica0", "replica1", "replica0"]
+
+
+def test_request_reads_stay_on_primary_with_replicas(registry):
+    # GET thong thuong can read-after-write -> khong doc replica co do tre
+    assert registry.engine_for("read") is registry.primary
+    with registry.session("read") as db:
+        assert _names(db) == ["primary"]
+
+    async def _names_async():
+        async with registry.async_sessionmaker("read")() as db:
+            return (await db.scalars(select(KhachHang.ho_ten))).all()
+
+    assert asyncio.run(_names_async()) == ["primary"]
+
+
+def test_session_pins_to_primary_after_write(registry):
+    with registry.session("analytics") as db:
+        assert _names(db) == ["replica0"]
+        db.add(KhachHang(ho_ten="moi", email="moi@fado.vn"))
+        db.commit()
+        # Read-after-write: doc lai tu primary, khong doi replica bat kip
+        assert sorted(_names(db)) == ["moi", "primary"]
+
+
+def test_async_sessions_route_to_replicas(registry):
+    async def _count(purpose):
+        async with registry.async_sessionmaker(purpose)() as db:
+            return (await db.scalars(select(KhachHang.ho_ten))).all()
+
+    assert asyncio.run(_count("primary")) == ["primary"]
+    assert asyncio.run(_count("analytics")) == ["replica0"]
+
+
+def test_without_replicas_everything_uses_primary(tmp_path):
+    registry = EngineRegistry(database_url=_database(tmp_path / "solo.db", "solo"), replica_urls=[])
+    assert registry.replica() is registry.primary
+    with registry.session("analytics") as db:
+        assert db.scalar(select(func.count(KhachHang.id))) == 1
+    registry.dispose()
+
+
+def test_connection_budget_is_split_across_pools(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "24")
+    urls = [f"postgresql://db{i}/fado" for i in range(3)]
+    registry = EngineRegistry(database_url="postgresql://primary/fado", replica_urls=urls)
+    # primary + 3 replica, moi cai sync + async = 8 pool
+    pool_size, max_overflow = registry.pool_limits()
+    assert (pool_size, max_overflow) == (1, 3)
+    assert 8 * (pool_size + max_overflow) <= 12 + 24
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Tests for ETag / If-None-Match / Cache-Control on read endpoints
+
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database
+import database_pool
+import main_working
+from models import Base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'http_cache_test.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(_create())
+
+    async def _override_db():
+        async with session_factory() as db:
+            yield db
+
+    main_working.app.dependency_overrides[database.get_async_db] = _override_db
+    main_working.app.dependency_overrides[database_pool.get_async_request_db] = _override_db
+    client = TestClient(main_working.app)
+    client.post("/khach-hang/", json={"ho_ten": "Nguyen Van A", "email": "a@fado.vn"})
+    client.post("/san-pham/", json={"ten_san_pham": "SP 1", "gia_ban": 100.0})
+    yield client
+    main_working.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+@pytest.mark.parametrize("path", ["/khach-hang/1", "/san-pham/", "/dashboard"])
+def test_matching_etag_returns_304_without_body(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"]
+
+    again = client.get(path, headers={"If-None-Match": f'"other", {etag}'})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_etag_changes_when_row_changes(client):
+    etag = client.get("/khach-hang/1").headers["etag"]
+    client.put("/khach-hang/1", json={"so_dien_thoai": "0901234567"})
+
+    r = client.get("/khach-hang/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["so_dien_thoai"] == "0901234567"
+    assert r.headers["etag"] != etag
+
+
+def test_list_etag_depends_on_query(client):
+    etag = client.get("/san-pham/").headers["etag"]
+    r = client.get("/san-pham/?limit=1", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+
+    client.post("/san-pham/", json={"ten_san_pham": "SP 2", "gia_ban": 50.0})
+    r = client.get("/san-pham/", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and len(r.json()) == 2
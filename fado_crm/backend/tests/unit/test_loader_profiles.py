@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Tests for eager-loading profiles and the per-request query counter
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import schemas
+from loader_profiles import loader_options
+from models import Base, ChiTietDonHang, DonHang, KhachHang, SanPham
+from query_counter import count_queries
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for i in range(5):
+        customer = KhachHang(ho_ten=f"KH {i}", email=f"kh{i}@fado.vn")
+        order = DonHang(ma_don_hang=f"FADO{i}", khach_hang=customer)
+        for j in range(2):
+            product = SanPham(ten_san_pham=f"SP {i}-{j}")
+            order.chi_tiet_list.append(ChiTietDonHang(san_pham=product, so_luong=1))
+        session.add(order)
+    session.commit()
+    session.expunge_all()
+    yield session
+    session.close()
+
+
+def _serialize(orders):
+    return [schemas.DonHang.model_validate(o).model_dump() for o in orders]
+
+
+def test_lazy_loading_is_n_plus_one(db):
+    with count_queries() as counter:
+        _serialize(db.query(DonHang).all())
+    # 1 (orders) + 5 (khach hang) + 5 (chi tiet) + 10 (san pham)
+    assert counter.count == 21
+
+
+def test_order_list_profile_uses_constant_queries(db):
+    with count_queries() as counter:
+        data = _serialize(db.query(DonHang).options(*loader_options("order_list")).all())
+    assert counter.count == 4
+    assert all(len(o["chi_tiet_list"]) == 2 and o["khach_hang"] for o in data)
+
+
+def test_unknown_profile_rejected():
+    with pytest.raises(ValueError):
+        loader_options("does_not_exist")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Tests for single-transaction order creation, detail replacement and bulk import
+
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database
+import database_pool
+import main_working
+from models import Base
+from query_counter import count_queries
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'orders_test.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(_create())
+
+    async def _override_db():
+        async with session_factory() as db:
+            yield db
+
+    main_working.app.dependency_overrides[database.get_async_db] = _override_db
+    main_working.app.dependency_overrides[database_pool.get_async_request_db] = _override_db
+    client = TestClient(main_working.app)
+    client.post("/khach-hang/", json={"ho_ten": "Nguyen Van A", "email": "a@fado.vn"})
+    for i, gia in enumerate([100.0, 250.0, 40.0], start=1):
+        client.post("/san-pham/", json={"ten_san_pham": f"SP {i}", "gia_ban": gia})
+    yield client
+    main_working.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def _order(khach_hang_id=1, *lines, **fees):
+    return {
+        "khach_hang_id": khach_hang_id,
+        "chi_tiet_list": [{"san_pham_id": sp, "so_luong": qty} for sp, qty in lines],
+        **fees,
+    }
+
+
+def test_create_order_uses_constant_queries(client):
+    with count_queries() as small:
+        r = client.post("/don-hang/", json=_order(1, (1, 1), phi_van_chuyen=10))
+    assert r.status_code == 200
+    with count_queries() as large:
+        client.post("/don-hang/", json=_order(1, (1, 2), (2, 1), (3, 5)))
+    # So query khong tang theo so dong chi tiet
+    assert large.count == small.count
+
+    data = client.get(f"/don-hang/{r.json()['id']}").json()
+    assert data["tong_tien"] == 110.0
+    assert [ct["gia_mua"] for ct in data["chi_tiet_list"]] == [100.0]
+
+
+def test_create_order_with_missing_product_returns_404(client):
+    r = client.post("/don-hang/", json=_order(1, (1, 1), (98, 1), (99, 1)))
+    assert r.status_code == 404
+    assert "98, 99" in r.json()["detail"]
+    assert client.get("/don-hang/").json() == []
+
+
+def test_replace_order_details_recomputes_totals(client):
+    order_id = client.post("/don-hang/", json=_order(1, (1, 1), phi_mua_ho=5)).json()["id"]
+    r = client.put(
+        f"/don-hang/{order_id}/chi-tiet",
+        json={
+            "chi_tiet_list": [{"san_pham_id": 2, "so_luong": 2}, {"san_pham_id": 3, "so_luong": 1}]
+        },
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert sorted(ct["san_pham"]["id"] for ct in data["chi_tiet_list"]) == [2, 3]
+    assert data["tong_tien"] == 545.0
+
+
+def test_bulk_import_is_all_or_nothing(client):
+    payload = {"don_hang_list": [_order(1, (1, 1)), _order(42, (2, 1)), _order(1, (77, 1))]}
+    r = client.post("/don-hang/bulk", json=payload)
+    assert r.status_code == 422
+    assert [e["index"] for e in r.json()["detail"]["errors"]] == [1, 2]
+    assert client.get("/don-hang/").json() == []
+
+    r = client.post("/don-hang/bulk", json=payload, params={"skip_invalid": True})
+    assert r.status_code == 200
+    assert r.json()["created"] == 1 and r.json()["failed"] == 2
+    orders = client.get("/don-hang/").json()
+    assert [o["ma_don_hang"] for o in orders] == r.json()["ma_don_hang_list"]
+    assert len(orders[0]["chi_tiet_list"]) == 1
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# Tests for the in-process columnar order snapshot (needs numpy)
+
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models import ChiTietDonHang, DonHang, KhachHang, LoaiKhachHang, SanPham, TrangThaiDonHang
+from order_snapshot import OrderSnapshot
+from sqlalchemy import delete
+
+NOW = datetime(2025, 3, 15, 12)
+
+
+@pytest.fixture
+def db(memory_session, make_order):
+    session = memory_session
+    session.add_all(
+        [
+            KhachHang(id=1, ho_ten="An", email="an@fado.vn", loai_khach=LoaiKhachHang.VIP),
+            KhachHang(id=2, ho_ten="Binh", email="binh@fado.vn", loai_khach=LoaiKhachHang.MOI),
+            SanPham(id=1, ten_san_pham="Son", danh_muc="my_pham"),
+            SanPham(id=2, ten_san_pham="Tui", danh_muc="thoi_trang"),
+            SanPham(id=3, ten_san_pham="Khac"),
+        ]
+    )
+    orders = [
+        # id, khach, ngay, trang thai, chi tiet (san pham, so luong, gia)
+        (1, 1, NOW, TrangThaiDonHang.DA_NHAN, [(1, 2, 100.0), (2, 1, 50.0)]),
+        (2, 2, NOW - timedelta(days=1), TrangThaiDonHang.CHO_XAC_NHAN, [(1, 1, 100.0)]),
+        (3, 1, NOW - timedelta(days=40), TrangThaiDonHang.DA_NHAN, [(2, 3, 20.0), (3, 1, 5.0)]),
+        (4, 2, NOW - timedelta(days=40), TrangThaiDonHang.HUY, [(1, 9, 100.0)]),
+    ]
+    for id, khach_hang_id, ngay_tao, trang_thai, lines in orders:
+        session.add(make_order(id, khach_hang_id, ngay_tao, lines, trang_thai))
+    session.commit()
+    return session
+
+
+def _expected_by_category_month_tier(db):
+    expected = defaultdict(lambda: {"orders": set(), "revenue": 0.0, "units": 0})
+    for line in db.query(ChiTietDonHang).all():
+        order = line.don_hang
+        if order.trang_thai == TrangThaiDonHang.HUY:
+            continue
+        key = (
+            line.san_pham.danh_muc or "",
+            order.ngay_tao.strftime("%Y-%m"),
+            order.khach_hang.loai_khach.value,
+        )
+        expected[key]["orders"].add(order.id)
+        expected[key]["revenue"] += line.so_luong * line.gia_mua
+        expected[key]["units"] += line.so_luong
+    return {
+        key: {"orders": len(v["orders"]), "revenue": v["revenue"], "units": v["units"]}
+        for key, v in expected.items()
+    }
+
+
+def _slice(snapshot, **kwargs):
+    rows = snapshot.group_by(
+        by=("category", "month", "tier"), metrics=("orders", "revenue", "units"), **kwargs
+    )
+    return {
+        (r["category"], r["month"], r["tier"]): {k: r[k] for k in ("orders", "revenue", "units")}
+        for r in rows
+    }
+
+
+def test_group_by_category_month_tier_matches_orm(db):
+    snapshot = OrderSnapshot()
+    assert snapshot.refresh(db)["full"] is True
+    assert _slice(snapshot) == _expected_by_category_month_tier(db)
+
+    # Cap don: revenue = tong_tien (gom phi), units = tong so luong cua don
+    by_status = snapshot.group_by(
+        by=("status",), metrics=("orders", "revenue", "units", "customers"), exclude_cancelled=False
+    )
+    assert {r["status"]: (r["orders"], r["revenue"], r["units"]) for r in by_status} == {
+        "da_nhan": (2, 260.0 + 75.0, 7),
+        "cho_xac_nhan": (1, 110.0, 1),
+        "huy": (1, 910.0, 9),
+    }
+    # 2 don da_nhan deu cua khach 1
+    assert [r["customers"] for r in by_status] == [1, 1, 1]
+
+    # Loc theo chieu va theo ngay
+    recent = snapshot.group_by(
+        by=(),
+        metrics=("orders", "revenue"),
+        since=(NOW - timedelta(days=7)).date(),
+        where={"tier": ["vip"]},
+    )
+    assert recent == [{"orders": 1, "revenue": 260.0}]
+    assert snapshot.group_by(by=("category",), where={"category": ["khong_co"]}) == []
+
+
+def test_incremental_refresh_follows_watermark_and_reloads_on_drift(db, make_order):
+    snapshot = OrderSnapshot()
+    snapshot.refresh(db)
+
+    db.add(make_order(5, 1, NOW, [(2, 2, 30.0)], TrangThaiDonHang.DA_NHAN))
+    order = db.get(DonHang, 2)
+    order.trang_thai = TrangThaiDonHang.DA_NHAN
+    order.chi_tiet_list[0].so_luong = 4
+    db.get(KhachHang, 2).loai_khach = LoaiKhachHang.THAN_THIET
+    db.commit()
+
+    stats = snapshot.refresh(db)
+    assert stats["full"] is False and snapshot.full_loads == 1
+    assert _slice(snapshot) == _expected_by_category_month_tier(db)
+
+    # Xoa hang loat khong qua ORM: so dong lech -> nap lai toan bo
+    db.execute(delete(ChiTietDonHang).where(ChiTietDonHang.don_hang_id == 3))
+    db.execute(delete(DonHang).where(DonHang.id == 3))
+    db.commit()
+    assert snapshot.refresh(db)["full"] is True and snapshot.full_loads == 2
+    assert _slice(snapshot) == _expected_by_category_month_tier(db)
+
+
+def test_unknown_dimension_or_metric_is_rejected(db):
+    snapshot = OrderSnapshot()
+    with pytest.raises(RuntimeError):
+        snapshot.group_by()
+    snapshot.refresh(db)
+    with pytest.raises(ValueError):
+        snapshot.group_by(by=("region",))
+    with pytest.raises(ValueError):
+        snapshot.group_by(metrics=("margin",))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Tests for keyset (cursor) pagination helpers
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(TEST_DIR, "..", "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.models import Base, KhachHang
+from backend.pagination import (
+    InvalidCursorError,
+    apply_keyset,
+    apply_offset,
+    build_page,
+    decode_cursor,
+    encode_cursor,
+    ensure_keyset_columns,
+)
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    base = datetime(2024, 1, 1)
+    # 3 khach cung ngay_tao de kiem tra tie-break theo id
+    for i in range(25):
+        ngay_tao = base if i < 3 else base + timedelta(minutes=i)
+        session.add(KhachHang(ho_ten=f"KH {i}", email=f"kh{i}@fado.vn", ngay_tao=ngay_tao))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _page(db, cursor=None, limit=10):
+    query, direction = apply_keyset(
+        db.query(KhachHang), KhachHang.ngay_tao, KhachHang.id, cursor, limit
+    )
+    return build_page(
+        query.all(), "ngay_tao", "id", limit, direction, has_previous=cursor is not None
+    )
+
+
+def test_cursor_round_trip():
+    ts = datetime(2024, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor(ts, 42, "prev")) == (ts, 42, "prev")
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_walks_forward_and_back_without_gaps(db):
+    expected = [
+        c.id for c in db.query(KhachHang).order_by(KhachHang.ngay_tao.desc(), KhachHang.id.desc())
+    ]
+
+    pages = [_page(db)]
+    while pages[-1]["next_cursor"]:
+        pages.append(_page(db, pages[-1]["next_cursor"]))
+
+    assert [len(p["items"]) for p in pages] == [10, 10, 5]
+    assert [c.id for p in pages for c in p["items"]] == expected
+    assert pages[0]["prev_cursor"] is None
+
+    back = _page(db, pages[2]["prev_cursor"])
+    assert [c.id for c in back["items"]] == [c.id for c in pages[1]["items"]]
+    assert back["prev_cursor"] is not None and back["next_cursor"] is not None
+
+
+def test_offset_page_shares_keyset_ordering(db):
+    query, direction = apply_offset(db.query(KhachHang), KhachHang.ngay_tao, KhachHang.id, 10, 10)
+    offset_page = build_page(query.all(), "ngay_tao", "id", 10, direction, has_previous=True)
+    keyset_page = _page(db, _page(db)["next_cursor"])
+    assert [c.id for c in offset_page["items"]] == [c.id for c in keyset_page["items"]]
+    assert offset_page["next_cursor"] == keyset_page["next_cursor"]
+
+
+def test_keyset_page_uses_sort_index(db):
+    db.execute(text("CREATE INDEX idx_khach_hang_keyset ON khach_hang (ngay_tao, id)"))
+    cursor = _page(db)["next_cursor"]
+    statements = []
+
+    def capture(conn, cursor_, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection.engine, "before_cursor_execute", capture)
+    try:
+        _page(db, cursor)
+    finally:
+        event.remove(connection.engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    plan = " ".join(
+        row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    )
+    assert "idx_khach_hang_keyset" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_ensure_keyset_columns_backfills_legacy_nulls():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE khach_hang (id INTEGER PRIMARY KEY, ngay_tao DATETIME)"))
+        conn.execute(
+            text("INSERT INTO khach_hang (id, ngay_tao) VALUES (1, NULL), (2, '2024-01-01')")
+        )
+    ensure_keyset_columns(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, ngay_tao FROM khach_hang ORDER BY id")).all()
+    assert rows[0][1].startswith("1970-01-01")
+    assert rows[1][1] == "2024-01-01"
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Tests for off-loop password hashing and rehash-on-login
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import auth
+from models import Base, NguoiDung
+from password_hasher import HasherBusyError, PasswordHasher, build_context
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+def test_verify_runs_off_the_event_loop_thread():
+    hasher = PasswordHasher(build_context(1000), workers=2)
+    hashed = hasher.context.hash("secret")
+    threads = []
+
+    def verify(password, stored):
+        threads.append(threading.current_thread().name)
+        return hasher.context.verify(password, stored)
+
+    async def scenario():
+        return await hasher._run(verify, "secret", hashed), await hasher.verify("nope", hashed)
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert threads[0].startswith("password-hash")
+    assert hasher.stats()["completed"] == 2
+
+
+def test_full_queue_is_rejected_not_queued():
+    hasher = PasswordHasher(build_context(1000), workers=1, queue_limit=0)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HasherBusyError):
+            await hasher.verify("secret", "x")
+        release.set()
+        return await blocked
+
+    assert asyncio.run(scenario()) is True
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_login_rehashes_when_rounds_change(monkeypatch):
+    old_hash = build_context(1000).hash("secret")
+    context = build_context(2000)
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(context, workers=1))
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(NguoiDung(email="an@fado.vn", ho_ten="An", mat_khau_hash=old_hash))
+            await db.commit()
+        async with factory() as db:
+            await auth.login_user_async(db, "an@fado.vn", "secret")
+        async with factory() as db:
+            stored = (await db.get(NguoiDung, 1)).mat_khau_hash
+        await engine.dispose()
+        return stored
+
+    stored = asyncio.run(scenario())
+    assert stored != old_hash and stored.startswith("$pbkdf2-sha256$2000$")
+    assert context.verify("secret", stored)
+
+
+def test_busy_pool_maps_to_503(monkeypatch):
+    class BusyHasher:
+        async def verify_and_update(self, password, hashed):
+            raise HasherBusyError()
+
+    monkeypatch.setattr(auth, "password_hasher", BusyHasher())
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(NguoiDung(email="an@fado.vn", ho_ten="An", mat_khau_hash="x"))
+            await db.commit()
+        try:
+            async with factory() as db:
+                await auth.authenticate_user_async(db, "an@fado.vn", "secret")
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(auth.ServiceBusyError) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 503 and exc.value.headers["Retry-After"] == "1"
@@ -73,3 +73,5 @@ def test_performance_metrics_endpoint():
     assert r.status_code == 200
     # Should be text/plain even if Prometheus not available
     assert r.headers.get("content-type", "").startswith("text/plain")
+    # Cache metrics theo prefix luon co, ke ca khi khong co prometheus_client
+    assert "# TYPE fado_cache_hits_total counter" in r.text
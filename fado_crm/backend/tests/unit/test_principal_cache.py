@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Tests for the authenticated-principal cache used by get_current_user
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import auth
+import cache_invalidation
+from cache import LRUCache
+from models import Base, NguoiDung, VaiTro
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+def lru(monkeypatch):
+    lru = LRUCache(max_entries=100)
+    monkeypatch.setattr(auth, "cache", lru)
+    monkeypatch.setattr(cache_invalidation, "_caches", [lru])
+    monkeypatch.setattr(auth, "PRINCIPAL_CACHE_TTL", 60)
+    return lru
+
+
+def _run(scenario):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        queries = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(
+                NguoiDung(
+                    email="an@fado.vn", ho_ten="An", mat_khau_hash="x", vai_tro=VaiTro.MANAGER
+                )
+            )
+            await db.commit()
+        try:
+            return await scenario(factory, queries)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_second_lookup_skips_query(lru):
+    async def scenario(factory, queries):
+        async with factory() as db:
+            first = await auth.get_principal(db, "an@fado.vn")
+        queries.clear()
+        async with factory() as db:
+            second = await auth.get_principal(db, "an@fado.vn")
+        return first, second, list(queries)
+
+    first, second, queries = _run(scenario)
+    assert queries == []
+    assert (second.id, second.email, second.vai_tro) == (first.id, "an@fado.vn", VaiTro.MANAGER)
+    # Khong dua hash mat khau vao cache
+    assert "mat_khau_hash" not in lru.get("principal:an@fado.vn")
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_deactivation_commit_revokes_cached_principal(lru, bulk):
+    async def scenario(factory, queries):
+        async with factory() as db:
+            user = await auth.get_principal(db, "an@fado.vn")
+        async with factory() as db:
+            if bulk:
+                await db.execute(update(NguoiDung).values(is_active=False))
+            else:
+                (await db.get(NguoiDung, user.id)).is_active = False
+            await db.commit()
+        async with factory() as db:
+            return await auth.get_principal(db, "an@fado.vn")
+
+    assert _run(scenario) is None
+    assert lru.get("principal:an@fado.vn") is None
+
+
+def test_login_timestamp_does_not_evict_principals(lru):
+    async def scenario(factory, queries):
+        async with factory() as db:
+            db.add(NguoiDung(email="binh@fado.vn", ho_ten="Binh", mat_khau_hash="x"))
+            await db.commit()
+            await auth.get_principal(db, "an@fado.vn")
+        # Login cua user khac va cua chinh user do chi ghi lan_dang_nhap_cuoi
+        async with factory() as db:
+            for user in (await db.execute(select(NguoiDung))).scalars():
+                user.lan_dang_nhap_cuoi = datetime.utcnow()
+            await db.commit()
+
+    _run(scenario)
+    assert lru.get("principal:an@fado.vn") is not None
+
+
+def test_fill_racing_deactivation_is_not_cached(lru, monkeypatch):
+    load = auth.get_active_user_by_email
+
+    async def scenario(factory, queries):
+        async def racing_load(db, email):
+            user = await load(db, email)
+            # Admin khoa tai khoan giua luc doc DB va ghi cache
+            async with factory() as other:
+                (await other.get(NguoiDung, user.id)).is_active = False
+                await other.commit()
+            return user
+
+        monkeypatch.setattr(auth, "get_active_user_by_email", racing_load)
+        async with factory() as db:
+            assert await auth.get_principal(db, "an@fado.vn") is not None
+        monkeypatch.setattr(auth, "get_active_user_by_email", load)
+        async with factory() as db:
+            return await auth.get_principal(db, "an@fado.vn")
+
+    assert _run(scenario) is None
+    assert lru.get("principal:an@fado.vn") is None
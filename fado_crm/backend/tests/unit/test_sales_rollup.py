@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Tests for the incrementally maintained daily_sales_rollup table
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import order_service
+import schemas
+from analytics_service import AdvancedAnalytics
+from models import Base, DailySalesRollup, DonHang, KhachHang, SanPham, TrangThaiDonHang
+from sales_rollup import ALL_CATEGORIES, rebuild_daily_sales_rollup
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+ROLLUP_COLUMNS = (
+    "ngay",
+    "trang_thai",
+    "danh_muc",
+    "order_count",
+    "revenue",
+    "units",
+    "unique_customers",
+)
+
+
+@pytest.fixture
+def session(memory_session):
+    memory_session.add_all(
+        [
+            KhachHang(id=1, ho_ten="An", email="an@fado.vn"),
+            KhachHang(id=2, ho_ten="Binh", email="binh@fado.vn"),
+            SanPham(id=1, ten_san_pham="Son", danh_muc="my_pham"),
+            SanPham(id=2, ten_san_pham="Tui", danh_muc="thoi_trang"),
+            SanPham(id=3, ten_san_pham="Khac"),
+        ]
+    )
+    memory_session.commit()
+    return memory_session
+
+
+@pytest.fixture
+def rollup(incremental_table):
+    return incremental_table(DailySalesRollup.__table__, ROLLUP_COLUMNS, rebuild_daily_sales_rollup)
+
+
+def test_order_writes_keep_rollup_equal_to_rebuild(session, make_order, rollup):
+    today = datetime.utcnow().replace(hour=12)
+    yesterday = today - timedelta(days=1)
+    session.add_all(
+        [
+            make_order(1, 1, today, [(1, 2, 100.0), (2, 1, 50.0)]),
+            make_order(2, 2, today, [(1, 1, 100.0), (3, 3, 5.0)]),
+            make_order(3, 1, yesterday, [(2, 1, 70.0)], TrangThaiDonHang.DA_NHAN),
+        ]
+    )
+    session.commit()
+    rows = rollup.assert_matches_rebuild(session)
+    total = next(r for r in rows if r[0] == today.date() and r[2] == ALL_CATEGORIES)
+    # 2 don, 260 + 125 (gom phi 10/don), 7 san pham, 2 khach
+    assert total[3:] == (2, 385.0, 7, 2)
+    my_pham = next(r for r in rows if r[0] == today.date() and r[2] == "my_pham")
+    assert my_pham[3:] == (2, 300.0, 3, 2)
+    assert any(r[2] == "" for r in rows)
+
+    # Doi trang thai, doi ngay, sua chi tiet, xoa don
+    order = session.get(DonHang, 1)
+    order.trang_thai = TrangThaiDonHang.HUY
+    session.get(DonHang, 3).ngay_tao = today
+    session.commit()
+    rollup.assert_matches_rebuild(session)
+
+    line = session.get(DonHang, 2).chi_tiet_list[0]
+    line.so_luong = 5
+    session.commit()
+    rollup.assert_matches_rebuild(session)
+
+    session.delete(session.get(DonHang, 2).chi_tiet_list[1])
+    session.delete(session.get(DonHang, 3))
+    session.commit()
+    assert rollup.assert_matches_rebuild(session)
+
+
+def test_order_service_bulk_lines_keep_rollup_equal_to_rebuild(tmp_path, rollup):
+    # order_service ghi chi tiet bang insert()/delete() hang loat, khong qua flush
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rollup.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    def lines(*items):
+        return [schemas.ChiTietDonHangCreate(san_pham_id=sp, so_luong=qty) for sp, qty in items]
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add_all(
+                [
+                    KhachHang(id=1, ho_ten="An", email="an@fado.vn"),
+                    SanPham(id=1, ten_san_pham="Son", danh_muc="my_pham", gia_ban=100.0),
+                    SanPham(id=2, ten_san_pham="Tui", danh_muc="thoi_trang", gia_ban=50.0),
+                ]
+            )
+            await db.commit()
+
+            payload = schemas.DonHangCreate(khach_hang_id=1, chi_tiet_list=lines((1, 3)))
+            order = await order_service.create_order(db, payload)
+            created = await db.run_sync(rollup.assert_matches_rebuild)
+
+            await order_service.replace_order_details(db, order.id, lines((2, 1), (2, 1)))
+            replaced = await db.run_sync(rollup.assert_matches_rebuild)
+        await engine.dispose()
+        return created, replaced
+
+    created, replaced = asyncio.run(scenario())
+    assert [r[2:6] for r in created] == [(ALL_CATEGORIES, 1, 300.0, 3), ("my_pham", 1, 300.0, 3)]
+    assert [r[2:6] for r in replaced] == [
+        (ALL_CATEGORIES, 1, 100.0, 2),
+        ("thoi_trang", 1, 100.0, 2),
+    ]
+
+
+def test_time_series_readers_use_rollup(session, make_order):
+    today = datetime.utcnow().replace(hour=12)
+    session.add_all(
+        [
+            make_order(1, 1, today, [(1, 1, 100.0)]),
+            make_order(2, 2, today - timedelta(days=2), [(2, 1, 40.0)]),
+            make_order(3, 2, today, [(2, 1, 999.0)], TrangThaiDonHang.HUY),
+        ]
+    )
+    session.commit()
+
+    queries = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: queries.append(a[2]))
+    analytics = AdvancedAnalytics(session)
+    trend = analytics.get_daily_revenue_trend(7)
+    monthly = analytics.get_monthly_comparison(1)
+
+    assert all("don_hang" not in sql for sql in queries)
+    assert trend[-1] == {
+        "date": today.strftime("%Y-%m-%d"),
+        "revenue": 110.0,
+        "orders": 1,
+        "avg_order_value": 110.0,
+    }
+    assert sum(day["orders"] for day in trend) == 2
+    assert sum(month["revenue"] for month in monthly) == 160.0
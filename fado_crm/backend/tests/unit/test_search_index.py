@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Tests for the FTS5-backed universal search and its write-time sync triggers
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models import Base, DonHang, KhachHang, SanPham
+from search_index import ensure_search_index, fts5_query, search_ids
+from search_service import universal_search
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _seed(session):
+    an = KhachHang(
+        ho_ten="Nguyễn Văn An", email="an@fado.vn", dia_chi="Hà Nội", so_dien_thoai="0901234567"
+    )
+    binh = KhachHang(ho_ten="Trần Bình", email="binh@fado.vn", dia_chi="12 Nguyễn Trãi")
+    session.add_all(
+        [
+            DonHang(ma_don_hang="FADO20240101AAA111", khach_hang=an),
+            DonHang(ma_don_hang="FADO20240102BBB222", khach_hang=binh),
+            SanPham(
+                ten_san_pham="Nike Air Max", gia_ban=3e6, danh_muc="Giay dep", quoc_gia_nguon="USA"
+            ),
+            SanPham(
+                ten_san_pham="Apple Watch",
+                gia_ban=9e6,
+                mo_ta="Dong ho thong minh",
+                danh_muc="Dong ho",
+            ),
+        ]
+    )
+    session.commit()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    # Du lieu co san truoc khi tao index -> phai duoc nap vao index
+    _seed(session)
+    assert ensure_search_index(engine)
+    yield session
+    session.close()
+
+
+def _titles(results, key):
+    return [item["title"] for item in results[key]]
+
+
+def test_query_is_sanitized():
+    assert fts5_query('nike" OR *') == '"nike"* "or"*'
+    assert fts5_query("  ") is None
+
+
+def test_search_ignores_diacritics_and_ranks_name_first(db):
+    results = universal_search(db, "nguyen")
+    # Ten khop (trong so cao) dung truoc dia chi khop
+    assert _titles(results, "customers") == ["Nguyễn Văn An", "Trần Bình"]
+    assert _titles(results, "products") == []
+
+
+def test_prefix_search_across_entities(db):
+    assert _titles(universal_search(db, "nik ai"), "products") == ["Nike Air Max"]
+    assert _titles(universal_search(db, "dong ho"), "products") == ["Apple Watch"]
+    assert _titles(universal_search(db, "FADO20240102"), "orders") == [
+        "Don hang FADO20240102BBB222"
+    ]
+    # Don hang cung khop theo ten khach hang
+    orders = universal_search(db, "tran binh")["orders"]
+    assert [o["subtitle"] for o in orders] == ["Trần Bình"]
+
+
+def test_code_and_phone_match_mid_string(db):
+    # Doan giua ma don / so dien thoai (prefix FTS khong bat duoc)
+    assert _titles(universal_search(db, "0102BBB"), "orders") == ["Don hang FADO20240102BBB222"]
+    assert _titles(universal_search(db, "234567"), "customers") == ["Nguyễn Văn An"]
+    # Qua ngan cho trigram -> khong quet giua chuoi
+    assert search_ids(db, "customers", "67", 10) == []
+
+
+def test_index_follows_writes(db):
+    customer = db.query(KhachHang).filter_by(email="binh@fado.vn").one()
+    customer.ho_ten = "Lê Cường"
+    db.add(KhachHang(ho_ten="Phạm Dũng", email="dung@fado.vn"))
+    db.commit()
+    assert _titles(universal_search(db, "cuong"), "customers") == ["Lê Cường"]
+    assert _titles(universal_search(db, "dung"), "customers") == ["Phạm Dũng"]
+    assert _titles(universal_search(db, "tran"), "customers") == []
+
+    db.delete(db.query(SanPham).filter_by(ten_san_pham="Apple Watch").one())
+    db.commit()
+    assert _titles(universal_search(db, "apple"), "products") == []
+
+
+def test_falls_back_to_like_without_index():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    _seed(session)
+    assert search_ids(session, "customers", "an", 10) is None
+    assert _titles(universal_search(session, "Bình"), "customers") == ["Trần Bình"]
+    session.close()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Tests for the in-process system settings snapshot
+
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from cache import LRUCache
+from models import Base, SystemSetting
+from settings_snapshot import SettingsSnapshot
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def env():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(SystemSetting(key="app_name", value="FADO"))
+        db.commit()
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    return factory, LRUCache(max_entries=100), queries
+
+
+def _upsert(factory, snapshot, key, value):
+    with factory() as db:
+        row = db.get(SystemSetting, key) or SystemSetting(key=key)
+        row.value = value
+        db.add(row)
+        db.commit()
+        snapshot.apply(row)
+
+
+def test_reads_are_served_without_queries(env):
+    factory, shared, queries = env
+    snapshot = SettingsSnapshot(factory, shared, check_interval=60)
+    snapshot.load()
+    queries.clear()
+
+    assert snapshot.get("app_name") == "FADO"
+    assert snapshot.public() == {"app_name": "FADO"}
+    assert snapshot.row("missing") is None and snapshot.get("missing", "x") == "x"
+    assert queries == []
+
+
+def test_upsert_propagates_to_other_worker_via_version(env):
+    factory, shared, queries = env
+    worker_a = SettingsSnapshot(factory, shared, check_interval=0)
+    worker_b = SettingsSnapshot(factory, shared, check_interval=0)
+    worker_a.load()
+    worker_b.load()
+
+    queries.clear()
+    assert worker_b.get("app_name") == "FADO"
+    # Version khong doi -> chi so sanh version, khong nap lai bang
+    assert queries == []
+
+    _upsert(factory, worker_a, "app_name", "FADO PRO")
+    queries.clear()
+    assert worker_a.get("app_name") == "FADO PRO" and queries == []
+    assert worker_b.get("app_name") == "FADO PRO"
+    assert [r["key"] for r in worker_b.rows()] == ["app_name"]
+
+
+def test_concurrent_writes_force_reload(env):
+    factory, shared, _ = env
+    worker_a = SettingsSnapshot(factory, shared, check_interval=0)
+    worker_b = SettingsSnapshot(factory, shared, check_interval=0)
+    worker_a.load()
+    worker_b.load()
+
+    _upsert(factory, worker_b, "currency", "VND")
+    # A ghi sau B: version nhay 2 buoc -> A phai nap lai de thay thay doi cua B
+    _upsert(factory, worker_a, "app_name", "FADO PRO")
+    assert worker_a.get("currency") == "VND"
+    assert worker_b.get("app_name") == "FADO PRO"
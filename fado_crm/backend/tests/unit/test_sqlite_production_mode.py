@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Tests for SQLite production mode (WAL, PRAGMA tuning, read-only reader pool)
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, "..", ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from database_pool import DatabasePoolManager
+from engine_registry import EngineRegistry
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'prod.db'}")
+    monkeypatch.setenv("SQLITE_PRODUCTION_MODE", "true")
+    monkeypatch.setenv("SQLITE_READER_POOL_SIZE", "2")
+    manager = DatabasePoolManager(EngineRegistry())
+    with manager.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO item (name) VALUES ('a')"))
+    yield manager
+    manager.registry.dispose()
+
+
+def test_writer_enables_wal_and_pragmas(manager):
+    with manager.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+    assert manager.engine.pool.size() == 1
+
+
+def test_readers_are_read_only_and_not_blocked_by_writer(manager):
+    with manager.engine.connect() as writer:
+        writer.execute(text("INSERT INTO item (name) VALUES ('b')"))
+        # Writer dang giu transaction chua commit: reader van doc duoc snapshot cu
+        with manager.read_engine.connect() as reader:
+            assert reader.execute(text("SELECT COUNT(*) FROM item")).scalar() == 1
+            with pytest.raises(OperationalError):
+                reader.execute(text("INSERT INTO item (name) VALUES ('c')"))
+        writer.commit()
+
+    with manager.read_engine.connect() as reader:
+        assert reader.execute(text("SELECT COUNT(*) FROM item")).scalar() == 2
+
+
+def test_read_sessions_use_reader_pool(manager):
+    registry = manager.registry
+    assert registry.engine_for("read") is registry.reader() is manager.read_engine
+    with manager.ReadSessionLocal() as db:
+        assert db.get_bind() is registry.reader()
+        assert db.execute(text("SELECT COUNT(*) FROM item")).scalar() == 1
+
+
+def test_memory_database_falls_back_to_single_engine(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    monkeypatch.setenv("SQLITE_PRODUCTION_MODE", "true")
+    manager = DatabasePoolManager(EngineRegistry())
+    assert not manager.sqlite_tuned
+    assert manager.read_engine is manager.engine
+
+
+def test_async_engines_mirror_writer_and_reader_setup(manager):
+    async def scenario():
+        registry = manager.registry
+        async with registry.async_primary.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert registry.async_replica() is registry.async_reader()
+        async with registry.async_reader().connect() as reader:
+            assert (await reader.execute(text("SELECT COUNT(*) FROM item"))).scalar() == 1
+            with pytest.raises(OperationalError):
+                await reader.execute(text("INSERT INTO item (name) VALUES ('c')"))
+        # Writer async la connection ghi thu 2 (engine rieng), cung 1 connection
+        assert registry.async_primary.pool.size() == 1
+        await registry.dispose_async()
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Dashboard sections benchmark
+So sanh get_advanced_dashboard_data chay tuan tu tren 1 session voi ban song song (moi section
+1 session tu pool) tren SQLite tam co N don hang. In thoi gian tong va thoi gian tung section:
+ban song song nen gan section cham nhat thay vi tong ca 6 (khi co du CPU / DB server).
+
+    python loadtests/bench_dashboard_sections.py --orders 1000000 --repeat 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+import analytics_service  # noqa: E402
+from analytics_service import run_dashboard_sections  # noqa: E402
+from bench_sales_overview import seed  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+
+def measure(name: str, db, date_range: int, repeat: int) -> dict:
+    timings, sections = [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, errors, sections = run_dashboard_sections(db, date_range, timeout=600)
+        timings.append(time.perf_counter() - start)
+        assert not errors, errors
+    return {
+        "variant": name,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "slowest_section_ms": max(sections.values()),
+        "sum_sections_ms": round(sum(sections.values()), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--date-range", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fado-bench-"), "dashboard.db")
+    engine = create_engine(f"sqlite:///{path}", pool_size=len(analytics_service.DASHBOARD_SECTIONS))
+    start = time.perf_counter()
+    seed(engine, args.orders, args.days)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    db = sessionmaker(bind=engine)()
+    workers = analytics_service.ANALYTICS_SECTION_WORKERS
+    try:
+        analytics_service.ANALYTICS_SECTION_WORKERS = 0
+        print(measure("sequential", db, args.date_range, args.repeat))
+        analytics_service.ANALYTICS_SECTION_WORKERS = workers or 6
+        print(measure("parallel", db, args.date_range, args.repeat))
+    finally:
+        analytics_service.ANALYTICS_SECTION_WORKERS = workers
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
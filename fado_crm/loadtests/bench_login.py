@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Login throughput benchmark
+Ban N lan /auth/login dong thoi vao main_working (in-process, SQLite tam), so sanh hash mat khau
+ngay tren event loop (--workers 0, hanh vi cu) voi thread pool. Do them do tre event loop:
+1 coroutine ngu 10ms lien tuc, do tre vuot qua = thoi gian loop bi chan.
+
+    python loadtests/bench_login.py --logins 200 --concurrency 50 --workers 0 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="fado-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("CACHE_WARMUP_ENABLED", "false")
+
+import auth  # noqa: E402
+import database  # noqa: E402
+import main_working  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from models import NguoiDung, VaiTro  # noqa: E402
+from password_hasher import PasswordHasher  # noqa: E402
+
+EMAIL = "bench@fado.vn"
+PASSWORD = "bench-password"
+
+
+def seed():
+    database.create_tables()
+    with database.SessionLocal() as db:
+        if not db.query(NguoiDung).filter(NguoiDung.email == EMAIL).first():
+            db.add(
+                NguoiDung(
+                    email=EMAIL,
+                    ho_ten="Bench",
+                    mat_khau_hash=auth.pwd_context.hash(PASSWORD),
+                    vai_tro=VaiTro.STAFF,
+                )
+            )
+            db.commit()
+
+
+async def _loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+
+async def run(logins: int, concurrency: int, workers: int) -> dict:
+    auth.password_hasher = PasswordHasher(auth.pwd_context, workers=workers)
+    transport = ASGITransport(app=main_working.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses, lag = [], [], []
+    stop = asyncio.Event()
+
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                r = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                latencies.append(time.perf_counter() - start)
+                statuses.append(r.status_code)
+
+        ticker = asyncio.create_task(_loop_lag(stop, lag))
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await ticker
+
+    auth.password_hasher.shutdown()
+    latencies.sort()
+    return {
+        "workers": workers,
+        "logins_per_s": round(logins / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "max_loop_lag_ms": round(max(lag, default=0) * 1000, 1),
+        "ok": statuses.count(200),
+        "busy_503": statuses.count(503),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    args = parser.parse_args()
+
+    seed()
+    for workers in args.workers:
+        print(asyncio.run(run(args.logins, args.concurrency, workers)))
+
+
+if __name__ == "__main__":
+    main()
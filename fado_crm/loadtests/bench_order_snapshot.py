@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Columnar order snapshot benchmark
+Slice danh_muc x thang x loai khach: GROUP BY tren SQLite vs group_by tren OrderSnapshot (NumPy).
+In thoi gian nap toan bo, refresh tang dan (1% don moi/doi trang thai) va median moi lan slice.
+
+    python loadtests/bench_order_snapshot.py --orders 1000000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+from models import Base, LoaiKhachHang, TrangThaiDonHang  # noqa: E402
+from order_snapshot import OrderSnapshot  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+CATEGORIES = ["my_pham", "thoi_trang", "dien_tu", "gia_dung", "thuc_pham", None]
+
+SQL_SLICE = text(
+    """
+    SELECT COALESCE(sp.danh_muc, '') AS category, strftime('%Y-%m', dh.ngay_tao) AS month,
+           kh.loai_khach AS tier, COUNT(DISTINCT dh.id) AS orders,
+           SUM(ct.so_luong * ct.gia_mua) AS revenue, SUM(ct.so_luong) AS units
+    FROM chi_tiet_don_hang ct
+    JOIN don_hang dh ON dh.id = ct.don_hang_id
+    LEFT JOIN san_pham sp ON sp.id = ct.san_pham_id
+    LEFT JOIN khach_hang kh ON kh.id = dh.khach_hang_id
+    WHERE dh.trang_thai != 'HUY'
+    GROUP BY 1, 2, 3
+    """
+)
+
+
+def seed(engine, orders: int, customers: int, products: int, days: int):
+    Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    statuses = [s.name for s in TrangThaiDonHang]
+    tiers = [t.name for t in LoaiKhachHang]
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.executemany(
+            "INSERT INTO khach_hang (id, ho_ten, email, loai_khach) VALUES (?, ?, ?, ?)",
+            [(i, f"KH{i}", f"kh{i}@fado.vn", rng.choice(tiers)) for i in range(1, customers + 1)],
+        )
+        cursor.executemany(
+            "INSERT INTO san_pham (id, ten_san_pham, danh_muc) VALUES (?, ?, ?)",
+            [(i, f"SP{i}", rng.choice(CATEGORIES)) for i in range(1, products + 1)],
+        )
+        order_rows, line_rows, line_id = [], [], 0
+        for i in range(1, orders + 1):
+            created = now - timedelta(seconds=rng.randrange(days * 86400))
+            total = 0.0
+            for _ in range(rng.randint(1, 3)):
+                line_id += 1
+                qty, price = rng.randint(1, 4), rng.uniform(5, 200)
+                total += qty * price
+                line_rows.append((line_id, i, rng.randint(1, products), qty, price))
+            order_rows.append(
+                (
+                    i,
+                    f"DH{i}",
+                    rng.randint(1, customers),
+                    total,
+                    rng.choice(statuses),
+                    created,
+                    created,
+                )
+            )
+            if len(order_rows) == 50000:
+                _flush(cursor, order_rows, line_rows)
+        _flush(cursor, order_rows, line_rows)
+        # Nhu database_optimization: nap lai chi tiet cua don thay doi can index nay
+        cursor.execute(
+            "CREATE INDEX idx_chi_tiet_don_hang_don_hang_id ON chi_tiet_don_hang (don_hang_id)"
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _flush(cursor, order_rows, line_rows):
+    cursor.executemany(
+        "INSERT INTO don_hang (id, ma_don_hang, khach_hang_id, tong_tien, trang_thai, ngay_tao,"
+        " ngay_cap_nhat) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        order_rows,
+    )
+    cursor.executemany(
+        "INSERT INTO chi_tiet_don_hang (id, don_hang_id, san_pham_id, so_luong, gia_mua)"
+        " VALUES (?, ?, ?, ?, ?)",
+        line_rows,
+    )
+    order_rows.clear()
+    line_rows.clear()
+
+
+def median_ms(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 1), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fado-bench-"), "snapshot.db")
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    seed(engine, args.orders, args.customers, args.products, args.days)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    db = sessionmaker(bind=engine)()
+    snapshot = OrderSnapshot()
+    print({"full_load": snapshot.refresh(db, full=True)})
+
+    # 1% don doi trang thai + 1% don moi, roi refresh tang dan
+    changed = max(1, args.orders // 100)
+    db.execute(
+        text("UPDATE don_hang SET trang_thai = 'DA_NHAN', ngay_cap_nhat = :now WHERE id <= :n"),
+        {"now": datetime.utcnow(), "n": changed},
+    )
+    db.execute(
+        text(
+            "INSERT INTO don_hang (id, ma_don_hang, khach_hang_id, tong_tien, trang_thai, ngay_tao,"
+            " ngay_cap_nhat) SELECT id + :max, 'N' || id, khach_hang_id, tong_tien, trang_thai,"
+            " ngay_tao, ngay_cap_nhat FROM don_hang WHERE id <= :n"
+        ),
+        {"max": args.orders, "n": changed},
+    )
+    db.commit()
+    print({"incremental": snapshot.refresh(db)})
+
+    sql_ms, sql_rows = median_ms(lambda: db.execute(SQL_SLICE).all(), args.repeat)
+    snap_ms, snap_rows = median_ms(
+        lambda: snapshot.group_by(
+            by=("category", "month", "tier"), metrics=("orders", "revenue", "units")
+        ),
+        args.repeat,
+    )
+    print({"variant": "sql_group_by", "median_ms": sql_ms, "groups": len(sql_rows)})
+    print({"variant": "snapshot_group_by", "median_ms": snap_ms, "groups": len(snap_rows)})
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
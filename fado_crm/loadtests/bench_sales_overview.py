@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+FADO CRM - Sales overview scan benchmark
+So sanh get_sales_overview kieu cu (4 query rieng tren cung khoang don_hang) voi ban 1 lan quet
+(conditional aggregate) tren SQLite tam co N don hang. Dem so cau SQL (= so lan quet bang) va
+thoi gian, thu ca nhanh FILTER (WHERE ...) lan SUM(CASE ...).
+
+    python loadtests/bench_sales_overview.py --orders 1000000 --repeat 5
+"""
+
+import argparse
+import inspect
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+import analytics_service  # noqa: E402
+from analytics_service import AdvancedAnalytics  # noqa: E402
+from models import Base, DonHang, TrangThaiDonHang  # noqa: E402
+from sqlalchemy import create_engine, event, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+
+def seed(engine, orders: int, days: int):
+    Base.metadata.create_all(engine)
+    statuses = [s.name for s in TrangThaiDonHang]
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        batch = []
+        for i in range(1, orders + 1):
+            created = now - timedelta(seconds=rng.randrange(days * 86400))
+            batch.append((i, f"DH{i}", rng.uniform(10, 500), rng.choice(statuses), created))
+            if len(batch) == 50000:
+                cursor.executemany(
+                    "INSERT INTO don_hang (id, ma_don_hang, tong_tien, trang_thai, ngay_tao)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                "INSERT INTO don_hang (id, ma_don_hang, tong_tien, trang_thai, ngay_tao)"
+                " VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_don_hang_ngay_tao ON don_hang (ngay_tao)")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def legacy_overview(db, date_range: int) -> dict:
+    """get_sales_overview truoc khi gop: 4 query tren cung khoang ngay"""
+    start_date = datetime.utcnow() - timedelta(days=date_range)
+    prev_start = start_date - timedelta(days=date_range)
+    revenue = (
+        db.query(func.sum(DonHang.tong_tien))
+        .filter(DonHang.ngay_tao >= start_date, DonHang.trang_thai != TrangThaiDonHang.HUY)
+        .scalar()
+        or 0
+    )
+    orders = db.query(DonHang).filter(DonHang.ngay_tao >= start_date).count()
+    completed = (
+        db.query(DonHang)
+        .filter(DonHang.ngay_tao >= start_date, DonHang.trang_thai == TrangThaiDonHang.DA_NHAN)
+        .count()
+    )
+    prev_revenue = (
+        db.query(func.sum(DonHang.tong_tien))
+        .filter(
+            DonHang.ngay_tao >= prev_start,
+            DonHang.ngay_tao < start_date,
+            DonHang.trang_thai != TrangThaiDonHang.HUY,
+        )
+        .scalar()
+        or 0
+    )
+    return {
+        "total_revenue": float(revenue),
+        "total_orders": orders,
+        "completed_orders": completed,
+        "prev_revenue": float(prev_revenue),
+    }
+
+
+def measure(name: str, fn, queries: list, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        queries.clear()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "variant": name,
+        "queries": len(queries),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "total_orders": result["total_orders"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--date-range", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fado-bench-"), "overview.db")
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    seed(engine, args.orders, args.days)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+    db = sessionmaker(bind=engine)()
+    analytics = AdvancedAnalytics(db)
+    real_support = analytics_service.supports_aggregate_filter
+    # Ban khong qua memo: lan lap thu 2 tro di se tra ket qua memo (0 query, ~0 ms)
+    sales_overview = inspect.unwrap(AdvancedAnalytics.get_sales_overview)
+
+    def single_pass(use_filter: bool):
+        analytics_service.supports_aggregate_filter = lambda dialect: use_filter
+        try:
+            return sales_overview(analytics, args.date_range)
+        finally:
+            analytics_service.supports_aggregate_filter = real_support
+
+    print(
+        measure(
+            "legacy_4_queries", lambda: legacy_overview(db, args.date_range), queries, args.repeat
+        )
+    )
+    print(measure("single_pass_filter", lambda: single_pass(True), queries, args.repeat))
+    print(measure("single_pass_case", lambda: single_pass(False), queries, args.repeat))
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()